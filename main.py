@@ -1,24 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, APIRouter
 from sqlalchemy.sql import text
-from src.core.database import get_db_mysql
+from src.core.database import get_db_mysql, close_db_async
 from sqlalchemy.orm import Session
 from src.routers.models.consultas import consulta_get
 from fastapi.middleware.cors import CORSMiddleware
-from src.core.init_db import create_db_tcc
+from src.core.migrations import garantir_schema
+from starlette.concurrency import run_in_threadpool
+from src.core.gpt_client import init_gpt_client, close_gpt_client
 # IMPORTAÇÃO DOS ROUTERS
 from src.routers.router import router
 from src.routers.apis.usuario import cadastro
 from src.routers.apis.dieta import dieta
-from src.routers.apis.gpt import gpt, gpt_dieta
-from src.routers.apis.treino import listagem, treino_usuario
+from src.routers.apis.gpt import gpt, gpt_dieta, jobs_gpt
+from src.routers.apis.treino import catalogo, listagem, treino_usuario
+from src.routers.apis.metricas.metricas import router_metricas
 ## ----------------------------------------------
 # from starlette.middleware.base import BaseHTTPMiddleware
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(garantir_schema)
+    await run_in_threadpool(catalogo.carregar_catalogo)
+    init_gpt_client()
+    await jobs_gpt.fila_jobs.iniciar()
+    yield
+    await jobs_gpt.fila_jobs.parar()
+    await close_gpt_client()
+    await close_db_async()
 
-create_db_tcc()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(router)
+app.include_router(router_metricas)
 
 origins = [
     "http://localhost:4200",
@@ -32,4 +47,5 @@ app.add_middleware(
     # allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
\ No newline at end of file
@@ -9,9 +9,64 @@ class Settings(BaseSettings):
     MYSQL_PORT: str
     MYSQL_USER: str
     MYSQL_PASSWORD: str
+    # leituras com engine assíncrono (aiomysql); False volta ao engine síncrono em threads
+    MYSQL_ASYNC: bool = True
+    # aplica as migrações de expansão pendentes no lifespan (opt-in); desligado, a API não
+    # sobe com o schema atrasado e pede para rodar o comando. Um erro na migração também impede a API de subir
+    DB_MIGRAR_NA_INICIALIZACAO: bool = False
+    # grava também nome, equipamento e grupo muscular em EXERCICIO_TREINO, lidos pelas
+    # instâncias anteriores ao catálogo; desligue em todas as instâncias antes da contração
+    DB_GRAVAR_TEXTOS_EXERCICIO_TREINO: bool = True
+    # paginação por cursor das listagens
+    PAGINACAO_LIMITE_PADRAO: int = 50
+    PAGINACAO_LIMITE_MAXIMO: int = 200
+    # cache read-through das listagens de treino e dieta (invalidado pelas escritas). O backend
+    # padrão é em memória por processo: só ligue com um único worker, senão uma escrita em um
+    # worker não invalida o cache dos outros
+    CACHE_LEITURA_ATIVO: bool = False
+    CACHE_LEITURA_MAX_ITENS: int = 10_000
+    CACHE_LEITURA_TTL_SEGUNDOS: int = 600
 
 
 class SettingsAuth(BaseSettings):
     load_dotenv()
     SECRET_KEY: str
-    ALGORITHM: str
\ No newline at end of file
+    ALGORITHM: str
+
+class SettingsGPT(BaseSettings):
+    load_dotenv()
+    OPENAI_API_KEY: str | None = None
+    OPENAI_MODEL: str = "ft:gpt-4o-mini-2024-07-18:tcc:teste2:CbGGCMeu"
+    # permite apontar para um servidor compatível com a API da OpenAI (ex.: fake local)
+    OPENAI_BASE_URL: str | None = None
+    OPENAI_TIMEOUT: float = 120.0
+    OPENAI_MAX_CONNECTIONS: int = 200
+    OPENAI_MAX_KEEPALIVE: int = 50
+    # cache de planos gerados (memória com TTL + camada opcional em SQLite)
+    GPT_CACHE_MAX_ITENS: int = 512
+    GPT_CACHE_TTL_SEGUNDOS: int = 7 * 24 * 3600
+    GPT_CACHE_SQLITE_PATH: str | None = None
+    # fila de geração assíncrona (modo job)
+    GPT_JOBS_SQLITE_PATH: str = "gpt_jobs.sqlite3"
+    GPT_JOBS_WORKERS: int = 4
+    GPT_JOBS_MAX_POR_USUARIO: int = 2
+    GPT_JOBS_RETENCAO_SEGUNDOS: int = 24 * 3600
+    # hosts aceitos no callbackUrl dos jobs; vazio aceita qualquer host https de IP público
+    GPT_JOBS_CALLBACK_HOSTS: list[str] = []
+    # orçamento de tokens de entrada dos prompts de ajuste
+    GPT_MAX_TOKENS_ENTRADA: int = 6000
+    # agendador de chamadas ao modelo (limites do provedor e fila de espera)
+    GPT_LIMITE_RPM: int = 500
+    GPT_LIMITE_TPM: int = 200_000
+    GPT_FILA_MAX: int = 100
+    GPT_TOKENS_SAIDA_ESTIMADOS: int = 2500
+    GPT_TENTATIVAS_429: int = 3
+    # prazos, hedge e circuit breaker das chamadas ao modelo
+    GPT_PRAZO_PADRAO_SEGUNDOS: float = 90.0
+    GPT_HEDGE_ATIVO: bool = True
+    GPT_HEDGE_PERCENTIL: float = 0.95
+    GPT_HEDGE_AMOSTRAS_MINIMAS: int = 20
+    GPT_BREAKER_FALHAS: int = 5
+    GPT_BREAKER_ABERTO_SEGUNDOS: float = 30.0
+    # fração das respostas geradas registradas no log (resumo do plano)
+    GPT_LOG_AMOSTRAGEM: float = 0.05
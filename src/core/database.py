@@ -1,6 +1,7 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm.session import Session
 
 from src.core.config import Settings
@@ -10,6 +11,22 @@ uri = f'{sett.MYSQL_USER}:{sett.MYSQL_PASSWORD}@{sett.MYSQL_HOST}:{sett.MYSQL_PO
 
 engine = create_engine(f'mysql+pymysql://{uri}', pool_size=10, max_overflow=2, pool_timeout=30, pool_recycle=3600)
 
+url_async = f'mysql+aiomysql://{uri}'
+_async_engine: AsyncEngine | None = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Engine assíncrono, criado no primeiro uso (já dentro do event loop do servidor)
+    e não na importação do módulo; `close_db_async` o descarta no fim do lifespan.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            url_async, pool_size=20, max_overflow=10, pool_timeout=30, pool_recycle=3600
+        )
+    return _async_engine
+
 
 def get_db_mysql() -> Generator[Session, None, None]:
     """Criação de sessão de banco de dados."""
@@ -18,3 +35,21 @@ def get_db_mysql() -> Generator[Session, None, None]:
             yield session
     except Exception as e:
         raise e
+
+
+async def get_db_async() -> AsyncGenerator[AsyncSession, None]:
+    """Criação de sessão assíncrona de banco de dados (requer MYSQL_ASYNC)."""
+    async with AsyncSession(get_async_engine()) as session:
+        yield session
+
+
+async def close_db_async() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+# dependência dos endpoints de leitura: sessão assíncrona ou, com MYSQL_ASYNC=false,
+# a sessão síncrona de sempre (as consultas então rodam no pool de threads)
+get_db_leitura = get_db_async if sett.MYSQL_ASYNC else get_db_mysql
@@ -0,0 +1,61 @@
+from typing import TYPE_CHECKING
+
+import httpx
+from fastapi import HTTPException
+
+from src.core.config import SettingsGPT
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+sett_gpt = SettingsGPT()
+
+_client: "AsyncOpenAI | None" = None
+
+
+def init_gpt_client(transport: httpx.AsyncBaseTransport | None = None) -> "AsyncOpenAI | None":
+    """
+    Cria o cliente assíncrono compartilhado da OpenAI (chamado no lifespan da aplicação).
+    `transport` substitui a camada HTTP (servidor fake nos testes).
+    """
+    global _client
+    if _client is not None:
+        return _client
+    if not sett_gpt.OPENAI_API_KEY:
+        return None
+    # o SDK da OpenAI é pesado de importar; só carrega quando o cliente é criado
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(sett_gpt.OPENAI_TIMEOUT, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=sett_gpt.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=sett_gpt.OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=60.0,
+        ),
+    )
+    _client = AsyncOpenAI(
+        api_key=sett_gpt.OPENAI_API_KEY,
+        base_url=sett_gpt.OPENAI_BASE_URL,
+        http_client=http_client,
+        # as retentativas de 429 ficam a cargo do agendador (scheduler_gpt)
+        max_retries=0,
+    )
+    return _client
+
+
+async def close_gpt_client() -> None:
+    """Fecha o pool de conexões HTTP do cliente compartilhado."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_gpt_client() -> "AsyncOpenAI":
+    """Retorna o cliente compartilhado, criando-o se o lifespan ainda não o fez."""
+    client = _client or init_gpt_client()
+    if client is None:
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY não configurada")
+    return client
@@ -0,0 +1,145 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+# buckets padrão de latência (segundos), cobrindo desde consultas ao banco até chamadas ao modelo
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+Rotulos = tuple[str, ...]
+Amostra = tuple[dict[str, str], float]
+
+
+def _formatar_rotulos(rotulos: dict[str, str]) -> str:
+    if not rotulos:
+        return ""
+    pares = []
+    for nome, valor in rotulos.items():
+        valor = str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pares.append(f'{nome}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def _formatar_valor(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class Contador:
+    """Contador monotônico com rótulos, no formato `counter` do Prometheus."""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Rotulos = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores: dict[Rotulos, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, valor: float = 1, **rotulos: str) -> None:
+        chave = tuple(str(rotulos[nome]) for nome in self.rotulos)
+        with self._lock:
+            self._valores[chave] += valor
+
+    def exportar(self) -> Iterator[str]:
+        with self._lock:
+            valores = list(self._valores.items())
+        for chave, valor in valores:
+            yield f"{self.nome}{_formatar_rotulos(dict(zip(self.rotulos, chave)))} {_formatar_valor(valor)}"
+
+
+class Histograma:
+    """Histograma cumulativo com rótulos, no formato `histogram` do Prometheus."""
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Rotulos = (), buckets: tuple[float, ...] = BUCKETS_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = tuple(sorted(buckets))
+        # por série: contagem por bucket (+Inf no fim), soma e total
+        self._series: dict[Rotulos, list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, **rotulos: str) -> None:
+        chave = tuple(str(rotulos[nome]) for nome in self.rotulos)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def cronometrar(self, **rotulos: str) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def exportar(self) -> Iterator[str]:
+        with self._lock:
+            series = [(chave, list(serie[0]), serie[1], serie[2]) for chave, serie in self._series.items()]
+        for chave, contagens, soma, total in series:
+            rotulos = dict(zip(self.rotulos, chave))
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                yield (
+                    f"{self.nome}_bucket{_formatar_rotulos({**rotulos, 'le': _formatar_valor(limite)})} {acumulado}"
+                )
+            yield f"{self.nome}_sum{_formatar_rotulos(rotulos)} {_formatar_valor(soma)}"
+            yield f"{self.nome}_count{_formatar_rotulos(rotulos)} {total}"
+
+
+class RegistroMetricas:
+    """
+    Registro central das métricas da aplicação.
+
+    Além de contadores e histogramas, aceita coletores: funções chamadas a cada
+    exportação que leem o estado de componentes que já mantêm seus próprios
+    números (cache, agendador etc.) e os expõem, por padrão como `gauge`.
+    """
+
+    def __init__(self):
+        self._metricas: dict[str, Contador | Histograma] = {}
+        self._coletores: list[tuple[str, str, str, Callable[[], list[Amostra]]]] = []
+
+    def contador(self, nome: str, ajuda: str, rotulos: Rotulos = ()) -> Contador:
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome: str, ajuda: str, rotulos: Rotulos = (), buckets: tuple[float, ...] = BUCKETS_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nome, ajuda, rotulos, buckets))
+
+    def coletor(self, nome: str, ajuda: str, funcao: Callable[[], list[Amostra]], tipo: str = "gauge") -> None:
+        self._coletores.append((nome, ajuda, tipo, funcao))
+
+    def exportar(self) -> str:
+        linhas: list[str] = []
+        for metrica in self._metricas.values():
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.exportar())
+        for nome, ajuda, tipo, funcao in self._coletores:
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, valor in funcao():
+                linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {_formatar_valor(valor)}")
+        return "\n".join(linhas) + "\n"
+
+    def _registrar(self, metrica):
+        if metrica.nome in self._metricas:
+            raise ValueError(f"Métrica já registrada: {metrica.nome}")
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+
+registro_metricas = RegistroMetricas()
@@ -0,0 +1,254 @@
+"""
+Migrações versionadas do schema TCC.
+
+Cada migração roda uma única vez e fica registrada em TCC.SCHEMA_VERSAO. No MySQL
+cada DDL faz commit implícito, então uma migração interrompida no meio é aplicada de
+novo do início: cada passo confere o information_schema antes de rodar e pula o
+que já existe. Para aplicar as pendentes:
+
+    python -m src.core.migrations
+
+Mudanças que removem dados seguem expansão/contração: a expansão cria e preenche a
+estrutura nova sem apagar nada, e a contração (marcada como destrutiva) só roda com
+`--contrair`, depois que todas as instâncias da API já usam a estrutura nova.
+"""
+import argparse
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from src.core.config import Settings
+from src.core.database import engine
+from src.routers.models.query_db import (
+    gerar_senha,
+    queries_calorias_dieta,
+    queries_catalogo_exercicios,
+    queries_contracao_catalogo,
+    queries_db,
+    queries_indices_leitura,
+    queries_qtd_exercicios_treino,
+    query_usuario_primario,
+)
+
+logger = logging.getLogger(__name__)
+
+sett = Settings()
+
+# trava nomeada do MySQL: com vários workers, só um aplica as migrações por vez
+NOME_TRAVA = "tcc_migracoes"
+SCHEMA = "TCC"
+
+
+@dataclass(frozen=True)
+class Migracao:
+    versao: int
+    descricao: str
+    aplicar: Callable[[Session], None]
+    # contração: apaga dados, nunca roda na inicialização
+    destrutiva: bool = False
+
+
+def _existe(session: Session, consulta: str, **params) -> bool:
+    return session.execute(text(consulta), {"schema": SCHEMA, **params}).scalar() > 0
+
+
+def _existe_coluna(session: Session, tabela: str, coluna: str) -> bool:
+    return _existe(
+        session,
+        "SELECT COUNT(*) FROM information_schema.COLUMNS"
+        " WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :tabela AND COLUMN_NAME = :coluna",
+        tabela=tabela, coluna=coluna,
+    )
+
+
+def _existe_tabela(session: Session, tabela: str) -> bool:
+    return _existe(
+        session,
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :tabela",
+        tabela=tabela,
+    )
+
+
+def _existe_constraint(session: Session, tabela: str, constraint: str) -> bool:
+    return _existe(
+        session,
+        "SELECT COUNT(*) FROM information_schema.TABLE_CONSTRAINTS"
+        " WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :tabela AND CONSTRAINT_NAME = :constraint",
+        tabela=tabela, constraint=constraint,
+    )
+
+
+def _existe_indice(session: Session, indice: str) -> bool:
+    return _existe(
+        session,
+        "SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = :schema AND INDEX_NAME = :indice",
+        indice=indice,
+    )
+
+
+def _schema_inicial(session: Session) -> None:
+    # CREATE TABLE IF NOT EXISTS e o INSERT ... WHERE NOT EXISTS já consultam o catálogo
+    for query in queries_db.values():
+        session.execute(text(query))
+    session.execute(text(query_usuario_primario), {"senha": gerar_senha("tcc1234")})
+
+
+def _indices_leitura(session: Session) -> None:
+    for indice, query in queries_indices_leitura.items():
+        if not _existe_indice(session, indice):
+            session.execute(text(query))
+
+
+def _calorias_dieta(session: Session) -> None:
+    if not _existe_coluna(session, "DIETA", "calorias_total"):
+        session.execute(text(queries_calorias_dieta["coluna"]))
+    # recalcula a partir das refeições: repetir o passo não muda o resultado
+    session.execute(text(queries_calorias_dieta["preenchimento"]))
+
+
+def _qtd_exercicios_treino(session: Session) -> None:
+    if not _existe_coluna(session, "TREINO", "qtd_exercicios"):
+        session.execute(text(queries_qtd_exercicios_treino["coluna"]))
+    session.execute(text(queries_qtd_exercicios_treino["preenchimento"]))
+
+
+def _vinculo_catalogo(session: Session) -> None:
+    # sem as colunas de texto (contração já aplicada à mão) não há o que copiar
+    if _existe_coluna(session, "EXERCICIO_TREINO", "nome_exercicio"):
+        session.execute(text(queries_catalogo_exercicios["preenchimento_catalogo"]))
+        session.execute(text(queries_catalogo_exercicios["vinculo"]))
+
+
+def _catalogo_exercicios(session: Session) -> None:
+    # nada aqui impede o INSERT só com texto das instâncias que ainda não conhecem o catálogo
+    if not _existe_tabela(session, "EXERCICIO"):
+        session.execute(text(queries_catalogo_exercicios["tabela"]))
+    if not _existe_coluna(session, "EXERCICIO_TREINO", "id_exercicio"):
+        session.execute(text(queries_catalogo_exercicios["coluna"]))
+    if _existe_coluna(session, "EXERCICIO_TREINO", "nome_exercicio"):
+        session.execute(text(queries_catalogo_exercicios["textos_opcionais"]))
+    _vinculo_catalogo(session)
+
+
+def _contracao_catalogo(session: Session) -> None:
+    # linhas gravadas só com texto por instâncias antigas depois da expansão
+    _vinculo_catalogo(session)
+    if not _existe_constraint(session, "EXERCICIO_TREINO", "fk_exercicio_treino_catalogo"):
+        session.execute(text(queries_contracao_catalogo["chave_estrangeira"]))
+    for coluna, query in queries_contracao_catalogo["remocao_textos"].items():
+        if _existe_coluna(session, "EXERCICIO_TREINO", coluna):
+            session.execute(text(query))
+
+
+MIGRACOES: list[Migracao] = [
+    Migracao(1, "tabelas iniciais e usuário administrador", _schema_inicial),
+    Migracao(2, "índices compostos das consultas de leitura", _indices_leitura),
+    Migracao(3, "total de calorias na tabela DIETA", _calorias_dieta),
+    Migracao(4, "quantidade de exercícios na tabela TREINO", _qtd_exercicios_treino),
+    Migracao(5, "catálogo de exercícios referenciado por EXERCICIO_TREINO", _catalogo_exercicios),
+    Migracao(
+        6, "vínculo obrigatório ao catálogo; remove nome, equipamento e grupo muscular de EXERCICIO_TREINO",
+        _contracao_catalogo, destrutiva=True,
+    ),
+]
+
+# versão que a API exige para subir: a última antes de qualquer contração pendente
+VERSAO_EXIGIDA = max(migracao.versao for migracao in MIGRACOES if not migracao.destrutiva)
+
+
+def versao_schema(session: Session) -> int:
+    """Versão aplicada no banco; 0 se a tabela de controle ainda não existe."""
+    try:
+        versao = session.execute(text("SELECT MAX(versao) FROM TCC.SCHEMA_VERSAO")).scalar()
+    except DBAPIError:
+        session.rollback()
+        return 0
+    return versao or 0
+
+
+def aplicar_migracoes(session: Session, contrair: bool = False) -> list[int]:
+    """
+    Aplica as migrações pendentes em ordem e retorna as versões aplicadas. Sem
+    `contrair`, para antes da primeira migração destrutiva.
+    """
+    # a trava pertence à conexão, então fica em uma conexão própria (a sessão
+    # devolve a sua ao pool a cada commit)
+    with engine.connect() as conexao_trava:
+        if not conexao_trava.execute(text("SELECT GET_LOCK(:nome, 60)"), {"nome": NOME_TRAVA}).scalar():
+            raise RuntimeError("Não foi possível obter a trava de migrações")
+        try:
+            return _aplicar_pendentes(session, contrair)
+        finally:
+            conexao_trava.execute(text("SELECT RELEASE_LOCK(:nome)"), {"nome": NOME_TRAVA})
+
+
+def _aplicar_pendentes(session: Session, contrair: bool) -> list[int]:
+    session.execute(text("CREATE DATABASE IF NOT EXISTS TCC"))
+    session.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS TCC.SCHEMA_VERSAO (
+            versao INT PRIMARY KEY,
+            descricao VARCHAR(255) NOT NULL,
+            aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    ))
+    session.commit()
+
+    aplicadas = []
+    atual = versao_schema(session)
+    for migracao in MIGRACOES:
+        if migracao.versao <= atual:
+            continue
+        if migracao.destrutiva and not contrair:
+            logger.info("Migração %d é destrutiva: rode com --contrair para aplicá-la", migracao.versao)
+            break
+        logger.info("Aplicando migração %d: %s", migracao.versao, migracao.descricao)
+        migracao.aplicar(session)
+        session.execute(
+            text("INSERT INTO TCC.SCHEMA_VERSAO (versao, descricao) VALUES (:versao, :descricao)"),
+            {"versao": migracao.versao, "descricao": migracao.descricao},
+        )
+        session.commit()
+        aplicadas.append(migracao.versao)
+    return aplicadas
+
+
+def garantir_schema() -> None:
+    """
+    Chamado no lifespan: com o schema na versão exigida custa uma única consulta.
+    Se estiver atrasado, aplica as migrações de expansão quando
+    DB_MIGRAR_NA_INICIALIZACAO está ligado (as destrutivas nunca rodam aqui) e,
+    caso contrário, recusa subir. Um erro aqui interrompe a inicialização, em vez
+    de subir a API sobre um schema incompleto.
+    """
+    try:
+        with Session(engine) as session:
+            versao = versao_schema(session)
+            if versao >= VERSAO_EXIGIDA:
+                return
+            if not sett.DB_MIGRAR_NA_INICIALIZACAO:
+                raise RuntimeError(
+                    f"Schema na versão {versao}, esperada {VERSAO_EXIGIDA}: rode `python -m src.core.migrations`"
+                )
+            aplicar_migracoes(session)
+    except Exception:
+        logger.exception("Erro ao verificar ou migrar o schema do banco")
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica as migrações pendentes do schema TCC")
+    parser.add_argument(
+        "--contrair", action="store_true", help="aplica também as migrações destrutivas (contração)"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        aplicadas = aplicar_migracoes(session, contrair=args.contrair)
+        versao = versao_schema(session)
+    print(f"Migrações aplicadas: {aplicadas}" if aplicadas else f"Nenhuma migração aplicada (versão {versao})")
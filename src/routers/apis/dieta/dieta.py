@@ -1,36 +1,49 @@
-from fastapi import Depends, HTTPException, Query
+from fastapi import Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from src.routers.router import router
-from src.core.database import get_db_mysql
-from src.routers.models.consultas import consulta_get
+from src.core.database import get_db_leitura, sett
+from src.routers.models.consultas import decodificar_cursor, pagina_keyset
+from src.routers.models.cache_leitura import consulta_get_cache
+
+# página de /dietas_usuario: total de calorias já gravado na DIETA e keyset por id_dieta
+QUERY_DIETAS_USUARIO = """
+SELECT d.id_dieta, d.nome, d.descricao, d.calorias_total AS calorias
+FROM TCC.DIETA d
+WHERE d.id_usuario = :id_usuario AND d.id_dieta > :ultimo_id
+ORDER BY d.id_dieta
+LIMIT :limite;
+"""
 
 @router.get("/dietas_usuario")
-def listar_dietas_usuario(
+async def listar_dietas_usuario(
+    response: Response,
     id_usuario: int = Query(..., alias="idUsuario", description="ID do usuário"),
-    session: Session = Depends(get_db_mysql)
+    cursor: str | None = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limite: int = Query(sett.PAGINACAO_LIMITE_PADRAO, ge=1, le=sett.PAGINACAO_LIMITE_MAXIMO),
+    session: AsyncSession | Session = Depends(get_db_leitura)
 ):
-    """Retorna as dietas associadas a um usuário.
+    """Retorna as dietas associadas a um usuário, paginadas por `id_dieta`.
     
     Args:
         id_usuario (int): ID do usuário.
+        cursor (str | None): Cursor recebido no cabeçalho `X-Next-Cursor` da página anterior.
+        limite (int): Quantidade máxima de dietas na página.
         session (Session): Sessão do banco de dados.
     Returns:
         dict: Dicionário contendo a lista de dietas do usuário.
     """
-    query = """
-    SELECT d.id_dieta, d.nome, d.descricao, c.calorias
-    FROM TCC.DIETA d
-    LEFT JOIN (SELECT id_dieta, SUM(calorias) as calorias FROM TCC.REFEICOES GROUP BY id_dieta) c ON c.id_dieta = d.id_dieta
-    WHERE ID_USUARIO = :id_usuario;
-    """
-    return consulta_get(query, session, {"id_usuario": id_usuario})
+    ultimo = decodificar_cursor(cursor, 1)
+    params = {"id_usuario": id_usuario, "ultimo_id": ultimo[0] if ultimo else 0, "limite": limite + 1}
+    linhas = await consulta_get_cache("dietas_usuario", id_usuario, QUERY_DIETAS_USUARIO, session, params)
+    return pagina_keyset(linhas, limite, ("id_dieta",), response)
 
 @router.get("/refeicoes_dieta")
-def refeicoes_dieta(
+async def refeicoes_dieta(
     id_dieta: int = Query(..., alias="idDieta", description="ID da dieta"),
-    session: Session = Depends(get_db_mysql)
+    session: AsyncSession | Session = Depends(get_db_leitura)
 ):
     """Retorna as refeições de uma dieta específica.
     
@@ -46,4 +59,4 @@ def refeicoes_dieta(
     LEFT JOIN TCC.REFEICOES r ON r.id_dieta = d.id_dieta
     WHERE d.ID_DIETA = :id_dieta;
     """
-    return consulta_get(query, session, {"id_dieta": id_dieta})
\ No newline at end of file
+    return await consulta_get_cache("refeicoes_dieta", id_dieta, query, session, {"id_dieta": id_dieta})
\ No newline at end of file
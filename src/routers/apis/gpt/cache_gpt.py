@@ -0,0 +1,157 @@
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import TypeVar
+
+from pydantic import BaseModel
+
+from src.core.gpt_client import sett_gpt
+
+ModeloAnamnese = TypeVar("ModeloAnamnese", bound=BaseModel)
+
+# os planos em cache não pertencem a ninguém; são validados como se fossem deste usuário
+USUARIO_VALIDACAO = 1
+
+
+class CachePlanos:
+    """
+    Cache de planos gerados pela IA, endereçado pelo hash do prompt normalizado.
+
+    Camada em memória (LRU limitada a `max_itens`, com TTL) e camada opcional em
+    SQLite, que sobrevive a reinícios. Os planos são copiados na entrada e na saída
+    para que nenhum chamador altere o valor armazenado.
+    """
+
+    def __init__(self, max_itens: int, ttl_segundos: int, caminho_sqlite: str | None = None):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self.caminho_sqlite = caminho_sqlite
+        self._itens: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._conexao: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirados = 0
+
+    def get(self, chave: str) -> dict | None:
+        agora = time.time()
+        item = self._itens.get(chave)
+        if item is not None:
+            criado_em, plano = item
+            if agora - criado_em <= self.ttl_segundos:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return copy.deepcopy(plano)
+            del self._itens[chave]
+            self.expirados += 1
+
+        item = self._get_disco(chave, agora)
+        if item is not None:
+            criado_em, plano = item
+            self._guardar_memoria(chave, criado_em, plano)
+            self.hits += 1
+            return copy.deepcopy(plano)
+
+        self.misses += 1
+        return None
+
+    def set(self, chave: str, plano: dict) -> None:
+        criado_em = time.time()
+        plano = copy.deepcopy(plano)
+        self._guardar_memoria(chave, criado_em, plano)
+        self._set_disco(chave, criado_em, plano)
+
+    def stats(self) -> dict:
+        return {
+            "itens": len(self._itens),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirados": self.expirados,
+        }
+
+    def _guardar_memoria(self, chave: str, criado_em: float, plano: dict) -> None:
+        self._itens[chave] = (criado_em, plano)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self.evictions += 1
+
+    def _db(self) -> sqlite3.Connection | None:
+        if not self.caminho_sqlite:
+            return None
+        if self._conexao is None:
+            self._conexao = sqlite3.connect(self.caminho_sqlite, check_same_thread=False)
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS planos (chave TEXT PRIMARY KEY, plano TEXT NOT NULL, criado_em REAL NOT NULL)"
+            )
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_planos_criado_em ON planos (criado_em)")
+            self._conexao.commit()
+        return self._conexao
+
+    def _get_disco(self, chave: str, agora: float) -> tuple[float, dict] | None:
+        conexao = self._db()
+        if conexao is None:
+            return None
+        linha = conexao.execute(
+            "SELECT criado_em, plano FROM planos WHERE chave = ? AND criado_em >= ?",
+            (chave, agora - self.ttl_segundos),
+        ).fetchone()
+        if linha is None:
+            return None
+        return linha[0], json.loads(linha[1])
+
+    def _set_disco(self, chave: str, criado_em: float, plano: dict) -> None:
+        conexao = self._db()
+        if conexao is None:
+            return
+        conexao.execute(
+            "INSERT OR REPLACE INTO planos (chave, plano, criado_em) VALUES (?, ?, ?)",
+            (chave, json.dumps(plano, ensure_ascii=False), criado_em),
+        )
+        expirados = conexao.execute(
+            "DELETE FROM planos WHERE criado_em < ?", (criado_em - self.ttl_segundos,)
+        ).rowcount
+        self.expirados += max(expirados, 0)
+        conexao.commit()
+
+
+cache_planos = CachePlanos(
+    max_itens=sett_gpt.GPT_CACHE_MAX_ITENS,
+    ttl_segundos=sett_gpt.GPT_CACHE_TTL_SEGUNDOS,
+    caminho_sqlite=sett_gpt.GPT_CACHE_SQLITE_PATH,
+)
+
+
+def _normalizar_texto(valor: str) -> str:
+    return re.sub(r"\s+", " ", valor).strip().casefold()
+
+
+def normalizar_anamnese(anamnese: ModeloAnamnese) -> ModeloAnamnese:
+    """
+    Retorna uma cópia da anamnese usada apenas para compor a chave do cache:
+    textos sem diferença de caixa/espaços, listas ordenadas, idade em faixas de
+    5 anos e sem o ID do usuário (o plano é reatribuído ao usuário no retorno).
+    """
+    valores: dict = {}
+    for campo, valor in anamnese:
+        if isinstance(valor, str):
+            valores[campo] = _normalizar_texto(valor)
+        elif isinstance(valor, list):
+            valores[campo] = sorted({_normalizar_texto(v) for v in valor if isinstance(v, str)})
+
+    if "usuario_id" in type(anamnese).model_fields:
+        valores["usuario_id"] = 0
+    idade = getattr(anamnese, "idade", None)
+    if isinstance(idade, int):
+        valores["idade"] = idade // 5 * 5
+
+    return anamnese.model_copy(update=valores)
+
+
+def chave_cache(prompt_normalizado: str) -> str:
+    return hashlib.sha256(f"{sett_gpt.OPENAI_MODEL}\n{prompt_normalizado}".encode("utf-8")).hexdigest()
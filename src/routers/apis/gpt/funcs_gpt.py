@@ -4,41 +4,238 @@ from sqlalchemy import text
 from src.routers.router import router
 from src.core.database import get_db_mysql
 from src.routers.models.anamnesemodel import PostAnamnese
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from src.core.gpt_client import get_gpt_client, sett_gpt
+from src.routers.apis.gpt.stream_json import ExtratorItensJSON, RelatorioReparo, parse_json_tolerante
+from src.routers.apis.gpt.cache_gpt import cache_planos
+from src.routers.apis.gpt.singleflight import SingleFlight
+from src.routers.apis.gpt.tokens_gpt import contar_tokens, registrar_uso
+from src.routers.apis.gpt.scheduler_gpt import PRIORIDADE_NOVO_PLANO, agendador_gpt
+from src.routers.apis.gpt.hedge_gpt import executor_hedge
+from src.routers.apis.gpt.metricas_gpt import (
+    chamadas_modelo,
+    classe_erro,
+    erros_modelo,
+    fallbacks_json,
+    formatos_saida,
+    latencia_modelo,
+    registrar_reparo_json,
+)
+from src.core.metricas import registro_metricas
+import copy
+import time
+import hashlib
 import json
+import logging
+import unicodedata
+from collections.abc import AsyncIterator, Callable
+from dataclasses import asdict
 from typing import Any
 from pydantic import BaseModel, Field
 
-def gpt_response(prompt: str) -> dict:
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY não configurada")
+logger = logging.getLogger(__name__)
 
-    client = OpenAI(api_key=api_key)
+# chamadas ao modelo em andamento, indexadas pelo hash do prompt
+chamadas_gpt = SingleFlight()
 
-    response = client.responses.create(
-        model="ft:gpt-4o-mini-2024-07-18:tcc:teste2:CbGGCMeu",
-        input=prompt
-    )
+registro_metricas.coletor(
+    "gpt_singleflight",
+    "Chamadas ao modelo executadas e coalescidas por prompt idêntico",
+    lambda: [({"estatistica": nome}, valor) for nome, valor in chamadas_gpt.stats().items()],
+)
 
-    raw_text = parse_response_output(response)
+
+async def gpt_response(
+    prompt: str,
+    chave_cache: str | None = None,
+    usar_cache: bool = True,
+    endpoint: str = "/gpt",
+    prioridade: int = PRIORIDADE_NOVO_PLANO,
+    validar: Callable[[dict], None] | None = None,
+) -> dict:
+    """
+    Gera o plano a partir do prompt. Com `chave_cache`, consulta o cache de planos
+    antes de chamar o modelo (a menos que `usar_cache` seja False) e guarda o resultado
+    se ele foi lido sem reparos e passou por `validar` (sem `validar`, nada é guardado).
+    Chamadas simultâneas com o mesmo prompt compartilham uma única chamada ao modelo.
+    `endpoint` identifica a origem da chamada no registro de uso de tokens e define
+    o prazo da geração (ver `PRAZOS_POR_ENDPOINT`); `prioridade` é a classe da
+    chamada na fila do agendador.
+    """
+    if chave_cache and usar_cache:
+        plano = cache_planos.get(chave_cache)
+        if plano is not None:
+            chamadas_modelo.inc(endpoint=endpoint, resultado="cache")
+            return plano
+
+    chave_prompt = hashlib.sha256(f"{sett_gpt.OPENAI_MODEL}\n{prompt}".encode("utf-8")).hexdigest()
+    return await chamadas_gpt.executar(chave_prompt, lambda: _gerar_plano(prompt, chave_cache, endpoint, prioridade, validar))
+
+
+def _tokens_estimados(prompt: str) -> int:
+    return contar_tokens(prompt) + sett_gpt.GPT_TOKENS_SAIDA_ESTIMADOS
+
+
+async def _gerar_plano(
+    prompt: str,
+    chave_cache: str | None,
+    endpoint: str,
+    prioridade: int,
+    validar: Callable[[dict], None] | None,
+) -> dict:
+    client = get_gpt_client()
+    tokens_estimados = _tokens_estimados(prompt)
+
+    async def tentativa(ao_admitir: Callable[[], None]) -> tuple[dict, RelatorioReparo]:
+        def chamar():
+            # o hedge mede a latência a partir daqui, sem a espera na fila do agendador
+            ao_admitir()
+            return client.responses.create(
+                model=sett_gpt.OPENAI_MODEL,
+                input=prompt
+            )
+
+        response = await agendador_gpt.executar(prioridade, tokens_estimados, chamar)
+        registrar_uso(endpoint, getattr(response, "usage", None))
+        raw_text = parse_response_output(response)
+        return parse_plan_text(raw_text, endpoint)
+
+    inicio = time.perf_counter()
+    try:
+        # a primeira tentativa que devolver um plano válido vence
+        plano, relatorio = await executor_hedge.executar(endpoint, tentativa)
+    except Exception as exc:
+        chamadas_modelo.inc(endpoint=endpoint, resultado="erro")
+        erros_modelo.inc(endpoint=endpoint, classe=classe_erro(exc))
+        raise
+    latencia_modelo.observar(time.perf_counter() - inicio, endpoint=endpoint)
+    chamadas_modelo.inc(endpoint=endpoint, resultado="ok")
+    if chave_cache and _pode_guardar(plano, relatorio, validar, endpoint):
+        cache_planos.set(chave_cache, plano)
+    return plano
+
+
+def _pode_guardar(plano: dict, relatorio: RelatorioReparo, validar: Callable[[dict], None] | None, endpoint: str) -> bool:
+    """
+    O cache serve o mesmo plano a todas as anamneses equivalentes por dias, então só
+    entram planos lidos sem reparo (nunca um plano truncado recuperado) e aprovados
+    por `validar`, que recebe uma cópia.
+    """
+    if validar is None or relatorio.reparado:
+        return False
+    try:
+        validar(copy.deepcopy(plano))
+    except HTTPException as exc:
+        logger.warning("Plano inválido não guardado no cache endpoint=%s: %s", endpoint, exc.detail)
+        return False
+    return True
+
+
+def parse_plan_text(raw_text: str, endpoint: str = "/gpt") -> tuple[dict, RelatorioReparo]:
+    """Decodifica o plano e retorna junto o relatório de reparos (vazio quando o JSON veio íntegro)."""
     if not raw_text:
         raise HTTPException(status_code=502, detail="Resposta vazia do modelo")
 
     try:
-        return json.loads(raw_text)
+        return json.loads(raw_text), RelatorioReparo()
     except json.JSONDecodeError:
-        try:
-            json_payload = extract_json_payload(raw_text)
-            return json.loads(json_payload)
-        except json.JSONDecodeError as exc:
-            raise HTTPException(status_code=502, detail=f"Falha ao decodificar JSON da IA: {exc}") from exc
-        
+        pass
+
+    fallbacks_json.inc(endpoint=endpoint)
+    try:
+        # corta apenas entre treinos/refeições inteiros (profundidade 2 do plano)
+        plano, relatorio = parse_json_tolerante(raw_text, profundidade_corte=2)
+    except json.JSONDecodeError as exc:
+        raise HTTPException(status_code=502, detail=f"Falha ao decodificar JSON da IA: {exc}") from exc
+
+    if not isinstance(plano, dict) or not plano:
+        raise HTTPException(status_code=502, detail="Falha ao decodificar JSON da IA: objeto vazio")
+
+    if relatorio.reparado:
+        registrar_reparo_json(endpoint, relatorio)
+        logger.warning("JSON da IA reparado endpoint=%s: %s", endpoint, asdict(relatorio))
+    return plano, relatorio
+
+
+async def gpt_stream(prompt: str) -> AsyncIterator[str]:
+    """Gera os pedaços de texto da resposta do modelo conforme chegam."""
+    client = get_gpt_client()
+    executor_hedge.breaker.verificar()
+
+    # o breaker precisa do desfecho, senão a chamada de teste (meio-aberto) nunca é liberada
+    try:
+        stream = await agendador_gpt.executar(
+            PRIORIDADE_NOVO_PLANO,
+            _tokens_estimados(prompt),
+            lambda: client.responses.create(
+                model=sett_gpt.OPENAI_MODEL,
+                input=prompt,
+                stream=True,
+            ),
+        )
+        # fecha a resposta HTTP mesmo se o cliente SSE desconectar (GeneratorExit), senão
+        # a conexão só volta ao pool do cliente compartilhado quando o GC a recolher
+        async with stream:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+    except BaseException as exc:
+        executor_hedge.registrar_erro(exc)
+        raise
+    executor_hedge.breaker.sucesso()
+
+
+def normalizar_busca(texto: str) -> str:
+    """Texto sem acentos e em minúsculas, para comparar pedidos do usuário com o plano."""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def sse_event(evento: str, dados: Any) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+async def stream_plan_sse(
+    prompt: str,
+    campo_lista: str,
+    evento_item: str,
+    validar: Callable[[dict], None],
+    endpoint: str,
+) -> AsyncIterator[str]:
+    """
+    Transmite a geração do plano como server-sent events.
+
+    Cada item de `campo_lista` (ex.: `treinos`, `refeicoes`) é enviado como um evento
+    `evento_item` assim que o objeto fecha no fluxo do modelo; o último evento (`plano`)
+    traz o plano completo já validado, ou `erro` caso a resposta seja inválida.
+    """
+    extrator = ExtratorItensJSON(campo_lista)
+    inicio = time.perf_counter()
+    try:
+        async for pedaco in gpt_stream(prompt):
+            itens = extrator.feed(pedaco)
+            primeiro_indice = extrator.itens_emitidos - len(itens)
+            for deslocamento, item in enumerate(itens):
+                yield sse_event(evento_item, {"indice": primeiro_indice + deslocamento, evento_item: item})
+
+        plano, _ = parse_plan_text(extrator.buffer, endpoint)
+        validar(plano)
+    except Exception as exc:
+        chamadas_modelo.inc(endpoint=endpoint, resultado="erro")
+        erros_modelo.inc(endpoint=endpoint, classe=classe_erro(exc))
+        if isinstance(exc, HTTPException):
+            yield sse_event("erro", {"status": exc.status_code, "detail": exc.detail})
+        else:
+            yield sse_event("erro", {"status": 502, "detail": f"Falha na geração do plano: {exc}"})
+        return
+
+    latencia_modelo.observar(time.perf_counter() - inicio, endpoint=endpoint)
+    chamadas_modelo.inc(endpoint=endpoint, resultado="ok")
+    yield sse_event("plano", {"message": "Plano gerado com sucesso", "plano": plano})
+
+
 def parse_response_output(response: Any) -> str:
     if hasattr(response, "output_text") and response.output_text:
+        formatos_saida.inc(formato="output_text")
         return response.output_text
 
     text_chunks: list[str] = []
@@ -55,25 +252,5 @@ def parse_response_output(response: Any) -> str:
                 text_value = getattr(content, "text", None) or getattr(content, "value", None)
                 if text_value:
                     text_chunks.append(text_value)
+    formatos_saida.inc(formato="output" if text_chunks else "vazia")
     return "".join(text_chunks)
-
-
-def extract_json_payload(raw_text: str) -> str:
-    if not raw_text:
-        return ""
-
-    cleaned = raw_text.strip()
-
-    if cleaned.startswith("```"):
-        cleaned = cleaned.strip("`")
-        newline_index = cleaned.find("\n")
-        if newline_index != -1:
-            cleaned = cleaned[newline_index + 1 :].strip()
-
-    first_brace = cleaned.find("{")
-    last_brace = cleaned.rfind("}")
-
-    if first_brace != -1 and last_brace != -1 and last_brace >= first_brace:
-        return cleaned[first_brace : last_brace + 1]
-
-    return cleaned
\ No newline at end of file
@@ -1,14 +1,37 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from src.routers.router import router
-from src.core.database import get_db_mysql
+from src.core.database import get_db_mysql, sett
 from src.routers.models.anamnesemodel import PostAnamnese
-from src.routers.apis.gpt.funcs_gpt import gpt_response
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from src.routers.models.plano_model import (
+    GrupoMuscular,
+    PlanoTreino,
+    normalizar_grupo_muscular,
+    validar_plano_treino,
+)
+from src.routers.models.consultas import inserir_em_lote
+from src.routers.models.cache_leitura import invalidar_cache_leitura
+from src.routers.apis.treino.catalogo import indice_exercicios, resolver_exercicios_catalogo
+from src.routers.apis.gpt.funcs_gpt import gpt_response, normalizar_busca, stream_plan_sse
+from src.routers.apis.gpt.cache_gpt import USUARIO_VALIDACAO, chave_cache, normalizar_anamnese
+from fastapi.responses import StreamingResponse
+from src.routers.apis.gpt.jobs_gpt import fila_jobs, resposta_job_enfileirado
+from src.routers.apis.gpt.tokens_gpt import (
+    MAPA_CHAVES_TREINO,
+    NIVEIS_RESUMO_TREINO,
+    compactar_no_orcamento,
+    compactar_plano,
+    expandir_chaves,
+    legenda_chaves,
+    registrar_partes_prompt,
+)
+from src.core.gpt_client import sett_gpt
+from src.routers.apis.gpt.scheduler_gpt import PRIORIDADE_AJUSTE
+from src.routers.apis.gpt.metricas_gpt import instrumentar_persistencia, log_plano_amostrado
+import asyncio
 import json
+import re
 from typing import Any
 from pydantic import BaseModel, Field
 
@@ -75,7 +98,7 @@ ANAMNESE DO USUÁRIO
 
 ADJUSTMENT_SUFFIX_TEMPLATE = """
 
-PLANO ATUAL EM JSON:
+PLANO ATUAL EM JSON (chaves abreviadas: {legenda}):
 {plano_atual}
 
 ALTERAÇÕES SOLICITADAS PELO USUÁRIO:
@@ -85,7 +108,112 @@ Produza um NOVO plano de treino seguindo todas as regras anteriores e aplicando
 """
 
 
-def build_prompt(anamnese: PostAnamnese) -> str:
+TREINO_DIA_TEMPLATE = """
+Você é uma IA de prescrição de treinos. Sua única tarefa é gerar UM ÚNICO treino de um programa semanal de musculação, a partir das respostas de anamnese descritas abaixo. Leia todo o enunciado antes de responder.
+
+REQUISITOS OBRIGATÓRIOS
+1. A resposta deve ser EXCLUSIVAMENTE um JSON bem formatado, sem comentários, cabeçalhos, explicações ou texto adicional.
+2. O foco é EXCLUSIVAMENTE musculação tradicional em academia (máquinas, pesos livres, cabos ou peso corporal).
+3. Siga exatamente o esquema:
+
+{
+  "nome": "string obrigatória",
+  "descricao": "string obrigatória",
+  "idUsuario": inteiro >= 1,
+  "duracaoMinutos": inteiro >= 10,
+  "dificuldade": "iniciante" | "intermediario" | "avancado",
+  "exercicios": [
+    {
+      "nomeExercicio": "nome do exercício de musculação",
+      "equipamento": "equipamento necessário para o exercício",
+      "grupoMuscular": "um dos valores permitidos: Peito, Costas, Ombro, Braço, Perna, Glúteo ou Abdômen",
+      "idExercicio": inteiro >= 1,
+      "series": inteiro >= 1,
+      "repeticoes": inteiro >= 1,
+      "descansoSegundos": inteiro >= 15
+    }
+  ]
+}
+
+4. Use apenas números inteiros para campos numéricos e defina de 4 a 8 exercícios conforme o tempo disponível e o nível.
+5. Trabalhe APENAS os grupos musculares do foco deste dia; os demais grupos são cobertos nos outros dias da semana.
+6. O nome deve seguir o padrão "Treino <<<NUMERO>>> - <foco do dia> <ênfase>" e a descrição deve mencionar objetivo do dia, intensidade e recomendações rápidas.
+7. Se houver lesões ou limitações, adapte a seleção de exercícios e descreva isso no campo `descricao`.
+
+PROGRAMA: <<<PROGRAMA>>>
+TREINO <<<NUMERO>>> DE <<<TOTAL>>> - FOCO: <<<FOCO>>> (grupos musculares: <<<GRUPOS>>>)
+OUTROS TREINOS DA SEMANA: <<<OUTROS_DIAS>>>
+<<<INSTRUCOES_EXTRAS>>>
+ANAMNESE DO USUÁRIO
+<<<RESPOSTAS_ANAMNESE>>>
+"""
+
+GRUPOS_SUPERIORES = {GrupoMuscular.PEITO, GrupoMuscular.COSTAS, GrupoMuscular.OMBRO, GrupoMuscular.BRACO}
+GRUPOS_INFERIORES = {GrupoMuscular.PERNA, GrupoMuscular.GLUTEO}
+
+# divisão semanal por quantidade de dias: (foco do treino, grupos musculares trabalhados)
+DIVISOES_SEMANAIS: dict[int, list[tuple[str, list[str]]]] = {
+    1: [("Full Body", ["Peito", "Costas", "Ombro", "Braço", "Perna", "Glúteo", "Abdômen"])],
+    2: [
+        ("Membros Superiores", ["Peito", "Costas", "Ombro", "Braço"]),
+        ("Membros Inferiores e Core", ["Perna", "Glúteo", "Abdômen"]),
+    ],
+    3: [
+        ("Peito, Ombros e Tríceps", ["Peito", "Ombro", "Braço"]),
+        ("Costas e Bíceps", ["Costas", "Braço"]),
+        ("Pernas e Glúteos", ["Perna", "Glúteo", "Abdômen"]),
+    ],
+    4: [
+        ("Superiores - Peito e Costas", ["Peito", "Costas", "Abdômen"]),
+        ("Inferiores - Ênfase Quadríceps", ["Perna", "Glúteo"]),
+        ("Superiores - Ombros e Braços", ["Ombro", "Braço", "Abdômen"]),
+        ("Inferiores - Ênfase Posteriores e Glúteos", ["Perna", "Glúteo"]),
+    ],
+    5: [
+        ("Peito e Tríceps", ["Peito", "Braço"]),
+        ("Costas e Bíceps", ["Costas", "Braço"]),
+        ("Pernas - Ênfase Quadríceps", ["Perna", "Abdômen"]),
+        ("Ombros e Abdômen", ["Ombro", "Abdômen"]),
+        ("Glúteos e Posteriores", ["Glúteo", "Perna"]),
+    ],
+    6: [
+        ("Push - Peito, Ombros e Tríceps", ["Peito", "Ombro", "Braço"]),
+        ("Pull - Costas e Bíceps", ["Costas", "Braço"]),
+        ("Legs - Pernas e Glúteos", ["Perna", "Glúteo", "Abdômen"]),
+        ("Push - Ombros, Peito e Tríceps", ["Ombro", "Peito", "Braço"]),
+        ("Pull - Costas, Bíceps e Abdômen", ["Costas", "Braço", "Abdômen"]),
+        ("Legs - Glúteos e Posteriores", ["Glúteo", "Perna"]),
+    ],
+    7: [
+        ("Push - Peito, Ombros e Tríceps", ["Peito", "Ombro", "Braço"]),
+        ("Pull - Costas e Bíceps", ["Costas", "Braço"]),
+        ("Legs - Pernas e Glúteos", ["Perna", "Glúteo", "Abdômen"]),
+        ("Push - Ombros, Peito e Tríceps", ["Ombro", "Peito", "Braço"]),
+        ("Pull - Costas, Bíceps e Abdômen", ["Costas", "Braço", "Abdômen"]),
+        ("Legs - Glúteos e Posteriores", ["Glúteo", "Perna"]),
+        ("Full Body Leve", ["Peito", "Costas", "Ombro", "Perna", "Abdômen"]),
+    ],
+}
+
+AJUSTE_TREINO_TEMPLATE = """
+TREINO ATUAL EM JSON (chaves abreviadas: {legenda}):
+{treino_atual}
+
+ALTERAÇÕES SOLICITADAS PELO USUÁRIO:
+{ajustes}
+
+Produza uma NOVA versão apenas deste treino, aplicando as alterações que se referem a ele e mantendo todo o restante como está. As alterações solicitadas têm prioridade sobre o foco indicado acima. Responda com as chaves completas do esquema.
+"""
+
+DIAS_SEMANA = ("segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo")
+TERMOS_PLANO_INTEIRO = (
+    "todos os treinos", "todo o plano", "plano inteiro", "plano todo", "programa inteiro",
+    "todo o programa", "todos os dias", "semana toda", "semana inteira",
+)
+RAIZES_GRUPOS = ("peito", "costa", "ombro", "bicep", "tricep", "braco", "perna", "quadricep", "posterior", "gluteo", "abdom")
+
+
+def build_anamnese_text(anamnese: PostAnamnese) -> str:
     objetivos_text = ", ".join(anamnese.objetivos) if anamnese.objetivos else "não especificado"
     equipamentos_text = anamnese.equipamentos or "não informado"
 
@@ -105,27 +233,264 @@ def build_prompt(anamnese: PostAnamnese) -> str:
         f"Exercícios que não gosta: {anamnese.exercicio_nao_gosta or 'nenhum'}\n"
         f"Equipamentos disponíveis: {equipamentos_text}"
     )
-    return PROMPT_TEMPLATE.replace("<<<RESPOSTAS_ANAMNESE>>>", anamnese_text)
+    return anamnese_text
+
+
+def build_prompt(anamnese: PostAnamnese) -> str:
+    return PROMPT_TEMPLATE.replace("<<<RESPOSTAS_ANAMNESE>>>", build_anamnese_text(anamnese))
 
 
 def build_adjustment_prompt(anamnese: PostAnamnese, plano_atual: dict, ajustes: str) -> str:
-    base_prompt = build_prompt(anamnese)
-    plano_json = json.dumps(plano_atual, ensure_ascii=False, indent=2)
+    anamnese_text = build_anamnese_text(anamnese)
+    base_prompt = PROMPT_TEMPLATE.replace("<<<RESPOSTAS_ANAMNESE>>>", anamnese_text)
     ajustes_texto = ajustes.strip() or "Sem ajustes adicionais fornecidos."
-    return base_prompt + ADJUSTMENT_SUFFIX_TEMPLATE.format(
-        plano_atual=plano_json,
-        ajustes=ajustes_texto,
+    legenda = legenda_chaves(MAPA_CHAVES_TREINO)
+
+    def renderizar(plano_json: str) -> str:
+        return base_prompt + ADJUSTMENT_SUFFIX_TEMPLATE.format(
+            legenda=legenda,
+            plano_atual=plano_json,
+            ajustes=ajustes_texto,
+        )
+
+    # o orçamento vale para o prompt inteiro como será enviado, não só para o plano
+    plano_json = compactar_no_orcamento(
+        plano_atual,
+        MAPA_CHAVES_TREINO,
+        NIVEIS_RESUMO_TREINO,
+        renderizar,
+        sett_gpt.GPT_MAX_TOKENS_ENTRADA,
     )
+    registrar_partes_prompt("/gpt/ajustar", {
+        "template": PROMPT_TEMPLATE + ADJUSTMENT_SUFFIX_TEMPLATE,
+        "anamnese": anamnese_text,
+        "plano_atual": plano_json,
+        "ajustes": ajustes_texto,
+    })
+    return renderizar(plano_json)
+
 
+def dias_selecionados(anamnese: PostAnamnese) -> list[str]:
+    """
+    Dias da semana citados no texto livre `dias_semana` (ex.: "segunda, quarta e sexta",
+    "Seg/Qua/Sex"), na ordem da semana. Vazio quando a anamnese traz só a quantidade.
+    """
+    texto = normalizar_busca(anamnese.dias_semana or "")
+    return [dia for dia in DIAS_SEMANA if re.search(rf"\b{dia[:3]}(?:{dia[3:]})?\b", texto)]
 
 
+def dias_por_semana(anamnese: PostAnamnese) -> int:
+    """Quantidade de dias de `dias_semana`: os dias citados ou o número informado (ex.: "4", "4 dias")."""
+    selecionados = dias_selecionados(anamnese)
+    if selecionados:
+        return len(selecionados)
+    encontrado = re.search(r"\d+", anamnese.dias_semana or "")
+    dias = int(encontrado.group()) if encontrado else 3
+    return min(max(dias, 1), 7)
 
-def persist_workout_plan(plan: dict, session: Session) -> dict:
-    programa = plan.get("programaTreino")
-    treinos = plan.get("treinos")
 
-    if not isinstance(programa, dict) or not isinstance(treinos, list) or not treinos:
-        raise HTTPException(status_code=400, detail="Estrutura do plano inválida")
+def planejar_programa(anamnese: PostAnamnese) -> dict:
+    """Define localmente o nome, a descrição e a divisão semanal do programa."""
+    divisao = DIVISOES_SEMANAIS[dias_por_semana(anamnese)]
+    objetivos_text = ", ".join(anamnese.objetivos) if anamnese.objetivos else "condicionamento geral"
+    focos = " / ".join(foco for foco, _ in divisao)
+    return {
+        "programaTreino": {
+            "nomePrograma": f"Programa {len(divisao)}x por Semana - {objetivos_text.title()}"[:100],
+            "descricaoPrograma": f"Divisão semanal: {focos}."[:255],
+        },
+        "divisao": divisao,
+    }
+
+
+def build_day_prompt(
+    anamnese: PostAnamnese,
+    programa: dict,
+    divisao: list[tuple[str, list[str]]],
+    indice: int,
+    instrucoes_extras: str = "",
+) -> str:
+    foco, grupos = divisao[indice]
+    outros = "; ".join(
+        f"Treino {i + 1:02d} - {outro_foco}" for i, (outro_foco, _) in enumerate(divisao) if i != indice
+    )
+    return (
+        TREINO_DIA_TEMPLATE
+        .replace("<<<PROGRAMA>>>", f"{programa['nomePrograma']} - {programa['descricaoPrograma']}")
+        .replace("<<<NUMERO>>>", f"{indice + 1:02d}")
+        .replace("<<<TOTAL>>>", f"{len(divisao):02d}")
+        .replace("<<<FOCO>>>", foco)
+        .replace("<<<GRUPOS>>>", ", ".join(grupos))
+        .replace("<<<OUTROS_DIAS>>>", outros or "nenhum")
+        .replace("<<<INSTRUCOES_EXTRAS>>>", instrucoes_extras)
+        .replace("<<<RESPOSTAS_ANAMNESE>>>", build_anamnese_text(anamnese))
+    )
+
+
+def extrair_treino(resposta: dict) -> dict:
+    """Aceita o treino puro ou embrulhado em `treino`/`treinos` pelo modelo."""
+    if isinstance(resposta.get("treinos"), list) and resposta["treinos"]:
+        return resposta["treinos"][0]
+    if isinstance(resposta.get("treino"), dict):
+        return resposta["treino"]
+    return resposta
+
+
+def verificar_equilibrio(treinos: list[dict]) -> None:
+    """
+    Garante que a semana trabalhe membros superiores e inferiores (regra 11 do prompt).
+    O grupo vem como o modelo escreveu ("peitoral", "Quadríceps"), então é normalizado
+    para o grupo do catálogo antes da classificação.
+    """
+    grupos = {
+        normalizar_grupo_muscular(exercicio.get("grupoMuscular"))
+        for treino in treinos
+        for exercicio in treino.get("exercicios") or []
+        if isinstance(exercicio, dict)
+    }
+    if len(treinos) > 1 and (not grupos & GRUPOS_SUPERIORES or not grupos & GRUPOS_INFERIORES):
+        raise HTTPException(status_code=502, detail="Plano gerado desequilibrado entre membros superiores e inferiores")
+
+
+async def gerar_plano_por_dia(anamnese: PostAnamnese, usar_cache: bool = True) -> dict:
+    """
+    Gera o programa com uma chamada ao modelo por treino, todas em paralelo.
+    A divisão semanal é decidida localmente, então a latência total fica próxima
+    à do treino mais lento em vez da soma de todos.
+    """
+    planejamento = planejar_programa(anamnese)
+    programa = planejamento["programaTreino"]
+    divisao = planejamento["divisao"]
+    anamnese_normalizada = normalizar_anamnese(anamnese)
+
+    respostas = await asyncio.gather(*(
+        gpt_response(
+            build_day_prompt(anamnese, programa, divisao, indice),
+            chave_cache=chave_cache(build_day_prompt(anamnese_normalizada, programa, divisao, indice)),
+            usar_cache=usar_cache,
+            endpoint="/gpt/dia",
+            validar=lambda resposta: validar_plano_gerado(
+                {"programaTreino": programa, "treinos": [extrair_treino(resposta)]}
+            ),
+        )
+        for indice in range(len(divisao))
+    ))
+
+    treinos = [extrair_treino(resposta) for resposta in respostas]
+    verificar_equilibrio(treinos)
+    return {"programaTreino": programa, "treinos": treinos}
+
+
+def treinos_afetados(plano_atual: dict, ajustes: str, dias_treino: list[str] | None = None) -> list[int]:
+    """
+    Identifica quais treinos do plano o pedido de ajuste menciona: pelo número
+    ("treino 2"), pela letra ("Treino B"), pelo dia da semana, por um exercício do
+    treino ou pelo grupo muscular do nome do treino.
+    `dias_treino` são os dias escolhidos na anamnese (`dias_selecionados`): os treinos
+    seguem a ordem da divisão semanal, então o n-º dia escolhido é o n-º treino. Sem
+    os dias na anamnese, a menção a um dia da semana não aponta para nenhum treino.
+    Lista vazia significa que o plano inteiro deve ser regenerado.
+    """
+    treinos = plano_atual.get("treinos")
+    if not isinstance(treinos, list) or not treinos:
+        return []
+
+    texto = normalizar_busca(ajustes)
+    if any(termo in texto for termo in TERMOS_PLANO_INTEIRO):
+        return []
+
+    afetados: set[int] = set()
+    for numero in re.findall(r"\btreino\s*(?:n[o°º.]*\s*)?(\d{1,2})\b", texto):
+        afetados.add(int(numero) - 1)
+    for letra in re.findall(r"\b[Tt]reino\s+([A-G])\b", ajustes):
+        afetados.add(ord(letra) - ord("A"))
+    for dia in re.findall(r"\b(" + "|".join(DIAS_SEMANA) + r")\b", texto):
+        if dias_treino and dia in dias_treino:
+            afetados.add(dias_treino.index(dia))
+
+    grupos_citados = [raiz for raiz in RAIZES_GRUPOS if raiz in texto]
+    for indice, treino in enumerate(treinos):
+        if not isinstance(treino, dict):
+            continue
+        nome_treino = normalizar_busca(treino.get("nome") or "")
+        if any(raiz in nome_treino for raiz in grupos_citados):
+            afetados.add(indice)
+        for exercicio in treino.get("exercicios") or []:
+            nome_exercicio = normalizar_busca(exercicio.get("nomeExercicio") or "") if isinstance(exercicio, dict) else ""
+            if len(nome_exercicio) >= 4 and nome_exercicio in texto:
+                afetados.add(indice)
+
+    return sorted(i for i in afetados if 0 <= i < len(treinos))
+
+
+async def ajustar_treinos(anamnese: PostAnamnese, plano_atual: dict, indices: list[int], ajustes: str) -> dict:
+    """
+    Regenera apenas os treinos em `indices`, em paralelo; os demais treinos e o
+    programa são devolvidos exatamente como vieram.
+    """
+    treinos = plano_atual["treinos"]
+    programa_atual = plano_atual.get("programaTreino") or {}
+    programa = {
+        "nomePrograma": programa_atual.get("nomePrograma") or "Programa de treino",
+        "descricaoPrograma": programa_atual.get("descricaoPrograma") or "",
+    }
+    divisao = [
+        (
+            treino.get("nome") or f"Treino {indice + 1:02d}",
+            sorted({e.get("grupoMuscular") for e in treino.get("exercicios") or [] if isinstance(e, dict) and e.get("grupoMuscular")}),
+        )
+        for indice, treino in enumerate(treinos)
+    ]
+
+    respostas = await asyncio.gather(*(
+        gpt_response(
+            build_day_prompt(
+                anamnese, programa, divisao, indice,
+                instrucoes_extras=AJUSTE_TREINO_TEMPLATE.format(
+                    legenda=legenda_chaves(MAPA_CHAVES_TREINO),
+                    treino_atual=compactar_plano(treinos[indice], MAPA_CHAVES_TREINO),
+                    ajustes=ajustes.strip(),
+                ),
+            ),
+            endpoint="/gpt/ajustar",
+            prioridade=PRIORIDADE_AJUSTE,
+        )
+        for indice in indices
+    ))
+
+    novos_treinos = list(treinos)
+    for indice, resposta in zip(indices, respostas):
+        novos_treinos[indice] = extrair_treino(expandir_chaves(resposta, MAPA_CHAVES_TREINO))
+    return {**plano_atual, "treinos": novos_treinos}
+
+
+def atribuir_usuario_plano(plan: dict, usuario_id: int) -> dict:
+    """Garante que todos os treinos do plano pertençam ao usuário da anamnese."""
+    for treino in plan.get("treinos") or []:
+        if isinstance(treino, dict):
+            treino["idUsuario"] = usuario_id
+    return plan
+
+
+def validate_workout_plan(plan: dict) -> None:
+    """Valida a estrutura do plano de treino gerado, sem tocar no banco."""
+    validar_plano_treino(plan)
+
+
+def validar_plano_gerado(plan: dict) -> None:
+    """
+    Valida o plano como saiu do modelo, antes de ir para o cache. O plano em cache
+    não pertence a ninguém (o usuário é atribuído no retorno), então a validação usa
+    um usuário provisório.
+    """
+    validate_workout_plan(atribuir_usuario_plano(expandir_chaves(plan, MAPA_CHAVES_TREINO), USUARIO_VALIDACAO))
+
+
+@instrumentar_persistencia("treino")
+def persist_workout_plan(plan: PlanoTreino, session: Session) -> dict:
+    """Grava o plano já validado; nenhuma validação acontece entre os INSERTs."""
+    programa = plan.programa_treino
+    treinos = plan.treinos
 
     insert_programa_sql = text(
         """
@@ -134,32 +499,15 @@ def persist_workout_plan(plan: dict, session: Session) -> dict:
         """
     )
 
-    insert_treino_sql = text(
-        """
-        INSERT INTO TCC.TREINO (nome, descricao, id_usuario, id_programa_treino, duracao, dificuldade)
-        VALUES (:nome, :descricao, :id_usuario, :id_programa_treino, :duracao, :dificuldade)
-        """
-    )
-
-    insert_exercicio_treino_sql = text(
+    select_treinos_programa_sql = text(
         """
-        INSERT INTO TCC.EXERCICIO_TREINO (nome_exercicio, equipamento, grupo_muscular, id_treino, descanso, series, reps)
-        VALUES (:nome_exercicio, :equipamento, :grupo_muscular, :id_treino, :descanso, :series, :reps)
+        SELECT id FROM TCC.TREINO WHERE id_programa_treino = :id_programa_treino ORDER BY id
         """
     )
 
-    treinos_inseridos: list[int] = []
-
-    nome_programa = programa.get("nomePrograma")
-    descricao_programa = programa.get("descricaoPrograma")
-
-    if not nome_programa or not descricao_programa:
-        raise HTTPException(status_code=400, detail="Dados do programa incompletos")
-
-    try:
-        usuario_programa_id = int(treinos[0].get("idUsuario"))
-    except (TypeError, ValueError):
-        raise HTTPException(status_code=400, detail="ID de usuário inválido no plano gerado")
+    nome_programa = programa.nome_programa
+    descricao_programa = programa.descricao_programa
+    usuario_programa_id = treinos[0].id_usuario
 
     programa_result = session.execute(
         insert_programa_sql,
@@ -173,78 +521,52 @@ def persist_workout_plan(plan: dict, session: Session) -> dict:
     if not programa_id:
         raise HTTPException(status_code=500, detail="Falha ao inserir programa de treino")
 
-    for treino in treinos:
-        try:
-            id_usuario = int(treino.get("idUsuario"))
-            duracao = int(treino.get("duracaoMinutos"))
-        except (TypeError, ValueError):
-            raise HTTPException(status_code=400, detail="Campos numéricos inválidos no treino gerado")
-
-        if id_usuario < 1 or duracao < 10:
-            raise HTTPException(status_code=400, detail="Valores inconsistentes no treino gerado")
-
-        if id_usuario != usuario_programa_id:
-            raise HTTPException(status_code=400, detail="Todos os treinos do programa devem pertencer ao mesmo usuário")
-
-        nome_treino = treino.get("nome")
-        descricao_treino = treino.get("descricao")
-        dificuldade = treino.get("dificuldade")
-
-        if not nome_treino or not descricao_treino or not dificuldade:
-            raise HTTPException(status_code=400, detail="Dados obrigatórios do treino ausentes")
-
-        result_treino = session.execute(
-            insert_treino_sql,
-            {
-                "nome": nome_treino,
-                "descricao": descricao_treino,
-                "id_usuario": id_usuario,
-                "id_programa_treino": programa_id,
-                "duracao": duracao,
-                "dificuldade": dificuldade.lower(),
-            }
-        )
-        treino_id = result_treino.lastrowid
-        if not treino_id:
-            raise HTTPException(status_code=500, detail="Falha ao inserir treino")
-
-        treinos_inseridos.append(treino_id)
-
-        exercicios = treino.get("exercicios") or []
-        if not exercicios:
-            raise HTTPException(status_code=400, detail="Treino gerado sem exercícios")
-
-        for exercicio in exercicios:
-            try:
-                nome = exercicio.get("nomeExercicio")
-                equipamento = exercicio.get("equipamento")
-                grupo_muscular = exercicio.get("grupoMuscular")
-                if not nome or not equipamento or not grupo_muscular:
-                    raise HTTPException(status_code=400, detail="Dados obrigatórios do exercício ausentes")
-                series_total = int(exercicio.get("series"))
-                repeticoes = int(exercicio.get("repeticoes"))
-                descanso = int(exercicio.get("descansoSegundos"))
-            except (TypeError, ValueError):
-                raise HTTPException(status_code=400, detail="Campos numéricos inválidos nos exercícios gerados")
-
-            if series_total < 1 or repeticoes < 1 or descanso < 15:
-                raise HTTPException(status_code=400, detail="Valores inconsistentes nos exercícios gerados")
-
-            result_ex_treino = session.execute(
-                insert_exercicio_treino_sql,
-                {
-                    "nome_exercicio": nome,
-                    "equipamento": equipamento,
-                    "grupo_muscular": grupo_muscular,
-                    "series": series_total,
-                    "reps": repeticoes,
-                    "id_treino": treino_id,
-                    "descanso": descanso,
-                }
+    # um INSERT de várias linhas para os treinos; os ids saem em ordem crescente,
+    # na mesma ordem das linhas, e são lidos de volta em uma única consulta
+    treinos_gravados = inserir_em_lote(session, "TCC.TREINO", [
+        {
+            "nome": treino.nome,
+            "descricao": treino.descricao,
+            "id_usuario": treino.id_usuario,
+            "id_programa_treino": programa_id,
+            "duracao": treino.duracao_minutos,
+            "dificuldade": treino.dificuldade.value,
+            "qtd_exercicios": len(treino.exercicios),
+        }
+        for treino in treinos
+    ])
+    treinos_inseridos = list(
+        session.execute(select_treinos_programa_sql, {"id_programa_treino": programa_id}).scalars()
+    )
+    if treinos_gravados != len(treinos) or len(treinos_inseridos) != len(treinos):
+        raise HTTPException(status_code=500, detail="Falha ao inserir treino")
+
+    exercicios_treino = [
+        (treino_id, exercicio)
+        for treino, treino_id in zip(treinos, treinos_inseridos)
+        for exercicio in treino.exercicios
+    ]
+    # nome, equipamento e grupo muscular ficam no catálogo; cada exercício do treino só o referencia
+    ids_catalogo, catalogo_novo = resolver_exercicios_catalogo(session, [exercicio for _, exercicio in exercicios_treino])
+    exercicios = []
+    for (treino_id, exercicio), id_exercicio in zip(exercicios_treino, ids_catalogo):
+        linha = {
+            "id_exercicio": id_exercicio,
+            "id_treino": treino_id,
+            "descanso": exercicio.descanso_segundos,
+            "series": exercicio.series,
+            "reps": exercicio.repeticoes,
+        }
+        if sett.DB_GRAVAR_TEXTOS_EXERCICIO_TREINO:
+            # até a contração, as instâncias anteriores ao catálogo ainda leem o texto
+            linha.update(
+                nome_exercicio=exercicio.nome_exercicio,
+                equipamento=exercicio.equipamento,
+                grupo_muscular=exercicio.grupo_muscular.value,
             )
-            id_ex_treino = result_ex_treino.lastrowid
-            if not id_ex_treino:
-                raise HTTPException(status_code=500, detail="Falha ao inserir exercício do treino")
+        exercicios.append(linha)
+    if inserir_em_lote(session, "TCC.EXERCICIO_TREINO", exercicios) != len(exercicios):
+        raise HTTPException(status_code=500, detail="Falha ao inserir exercício do treino")
 
     if not treinos_inseridos:
         raise HTTPException(status_code=500, detail="Nenhum treino foi inserido para o programa")
@@ -256,12 +578,20 @@ def persist_workout_plan(plan: dict, session: Session) -> dict:
             "descricao": descricao_programa,
         },
         "treinos_inseridos": treinos_inseridos,
-        "plano": plan,
+        "catalogo_novo": catalogo_novo,
+        "plano": plan.model_dump(by_alias=True, exclude_none=True),
     }
 
 
 class PlanPayload(BaseModel):
-    plano: dict
+    plano: PlanoTreino
+
+
+fila_jobs.registrar_tipo(
+    "treino",
+    lambda plan, usuario_id: atribuir_usuario_plano(expandir_chaves(plan, MAPA_CHAVES_TREINO), usuario_id),
+    validar=validar_plano_gerado,
+)
 
 
 class AdjustmentPayload(BaseModel):
@@ -271,28 +601,91 @@ class AdjustmentPayload(BaseModel):
 
 
 @router.post("/gpt")
-def gpt(anamnese: PostAnamnese):
+async def gpt(
+    anamnese: PostAnamnese,
+    sem_cache: bool = Query(False, alias="semCache", description="Ignora planos em cache e força nova geração"),
+    job: bool = Query(False, description="Enfileira a geração e retorna o ID do job imediatamente"),
+    callback_url: str | None = Query(None, alias="callbackUrl", description="URL notificada quando o job terminar"),
+    por_dia: bool = Query(False, alias="porDia", description="Gera cada treino da semana em uma chamada paralela"),
+):
     """
     Gera um plano de treino personalizado usando GPT com base na anamnese fornecida.
     Args:
         anamnese (PostAnamnese): Dados da anamnese do usuário.
+        sem_cache (bool): Se verdadeiro, não reaproveita planos já gerados.
+        job (bool): Se verdadeiro, responde 202 com o ID do job em vez de aguardar o plano.
+        callback_url (str | None): URL que recebe o resultado do job via POST.
+        por_dia (bool): Se verdadeiro, gera os treinos da semana em paralelo, um por chamada.
         Returns:
             dict: Resposta com mensagem de sucesso e o plano gerado.
         """
+    if por_dia:
+        if job:
+            raise HTTPException(status_code=400, detail="O modo porDia não pode ser usado com job")
+        plano = await gerar_plano_por_dia(anamnese, usar_cache=not sem_cache)
+        atribuir_usuario_plano(plano, anamnese.usuario_id)
+        log_plano_amostrado("/gpt/dia", plano, anamnese.usuario_id)
+        return {
+            "message": "Plano gerado com sucesso",
+            "plano": plano,
+        }
+
     prompt = build_prompt(anamnese)
-    plano = gpt_response(prompt)
-    print(plano)
+    chave = chave_cache(build_prompt(normalizar_anamnese(anamnese)))
+    if job:
+        job_id = await fila_jobs.enviar(
+            "treino", anamnese.usuario_id, prompt,
+            chave_cache=chave, usar_cache=not sem_cache, callback_url=callback_url,
+        )
+        return resposta_job_enfileirado(job_id)
+
+    plano = await gpt_response(prompt, chave_cache=chave, usar_cache=not sem_cache, validar=validar_plano_gerado)
+    atribuir_usuario_plano(plano, anamnese.usuario_id)
+    log_plano_amostrado("/gpt", plano, anamnese.usuario_id)
     return {
         "message": "Plano gerado com sucesso",
         "plano": plano,
     }
 
 
+@router.post("/gpt/stream")
+async def gpt_stream_plano(anamnese: PostAnamnese):
+    """
+    Gera o plano de treino transmitindo o resultado via server-sent events.
+    Cada treino é enviado no evento `treino` assim que termina de ser gerado;
+    o evento final `plano` traz o plano completo validado (ou `erro`).
+    Args:
+        anamnese (PostAnamnese): Dados da anamnese do usuário.
+    Returns:
+        StreamingResponse: Fluxo `text/event-stream` com os eventos da geração.
+    """
+    prompt = build_prompt(anamnese)
+    return StreamingResponse(
+        stream_plan_sse(prompt, "treinos", "treino", validate_workout_plan, "/gpt/stream"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/gpt/ajustar")
-def ajustar_plano(payload: AdjustmentPayload):
-    prompt = build_adjustment_prompt(payload.anamnese, payload.plano_atual, payload.ajustes)
-    plano = gpt_response(prompt)
-    print(plano)
+async def ajustar_plano(
+    payload: AdjustmentPayload,
+    job: bool = Query(False, description="Enfileira a geração e retorna o ID do job imediatamente"),
+    callback_url: str | None = Query(None, alias="callbackUrl", description="URL notificada quando o job terminar"),
+):
+    if job:
+        prompt = build_adjustment_prompt(payload.anamnese, payload.plano_atual, payload.ajustes)
+        job_id = await fila_jobs.enviar("treino", payload.anamnese.usuario_id, prompt, callback_url=callback_url)
+        return resposta_job_enfileirado(job_id)
+
+    indices = treinos_afetados(payload.plano_atual, payload.ajustes, dias_selecionados(payload.anamnese))
+    if indices:
+        plano = await ajustar_treinos(payload.anamnese, payload.plano_atual, indices, payload.ajustes)
+    else:
+        prompt = build_adjustment_prompt(payload.anamnese, payload.plano_atual, payload.ajustes)
+        plano = await gpt_response(prompt, endpoint="/gpt/ajustar", prioridade=PRIORIDADE_AJUSTE)
+        plano = expandir_chaves(plano, MAPA_CHAVES_TREINO)
+    log_plano_amostrado("/gpt/ajustar", plano, payload.anamnese.usuario_id)
     return {
         "message": "Plano ajustado com sucesso",
         "plano": plano,
@@ -319,6 +712,15 @@ def confirmar_plano(payload: PlanPayload, session: Session = Depends(get_db_mysq
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao salvar treino: {exc}") from exc
 
+    # só depois do commit: a próxima leitura já encontra o programa gravado
+    invalidar_cache_leitura(
+        ("programas", payload.plano.treinos[0].id_usuario),
+        ("arvore_programas", payload.plano.treinos[0].id_usuario),
+        ("treinos_programa", resultado["programa"]["id_programa_treino"]),
+        *(("exercicios_treino", id_treino) for id_treino in resultado["treinos_inseridos"]),
+    )
+    indice_exercicios.adicionar(resultado["catalogo_novo"])
+
     return {
         "message": "Plano gerado e salvo com sucesso",
         "programa": resultado["programa"],
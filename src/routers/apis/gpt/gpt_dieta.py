@@ -1,14 +1,33 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from src.routers.router import router
 from src.core.database import get_db_mysql
 from src.routers.models.anamnesemodel import PostAnamneseDieta
-from src.routers.apis.gpt.funcs_gpt import gpt_response
-from src.routers.models.consultas import consulta_get
+from src.routers.models.plano_model import PlanoDieta, validar_plano_dieta
+from src.routers.apis.gpt.funcs_gpt import gpt_response, normalizar_busca, stream_plan_sse
+from src.routers.apis.gpt.cache_gpt import USUARIO_VALIDACAO, chave_cache, normalizar_anamnese
+from fastapi.responses import StreamingResponse
+from src.routers.apis.gpt.jobs_gpt import fila_jobs, resposta_job_enfileirado
+from src.routers.apis.gpt.tokens_gpt import (
+    MAPA_CHAVES_DIETA,
+    NIVEIS_RESUMO_DIETA,
+    compactar_no_orcamento,
+    compactar_plano,
+    expandir_chaves,
+    legenda_chaves,
+    registrar_partes_prompt,
+)
+from src.core.gpt_client import sett_gpt
+from src.routers.apis.gpt.scheduler_gpt import PRIORIDADE_AJUSTE
+from src.routers.apis.gpt.metricas_gpt import instrumentar_persistencia, log_plano_amostrado
+from src.routers.models.consultas import inserir_em_lote
+from src.routers.models.cache_leitura import invalidar_cache_leitura
 from pydantic import BaseModel, Field
 from typing import Any
+import asyncio
 import json
+import re
 
 PROMPT_TEMPLATE = """
 Você é uma IA de prescrição de dietas. Sua única tarefa é gerar, a partir das respostas de anamnese descritas abaixo, um JSON válido que represente um plano alimentar completo. Leia todo o enunciado antes de responder.
@@ -76,7 +95,7 @@ ANAMNESE DO USUÁRIO
 
 ADJUSTMENT_SUFFIX_TEMPLATE = """
 
-PLANO ATUAL EM JSON:
+PLANO ATUAL EM JSON (chaves abreviadas: {legenda}):
 {plano_atual}
 
 ALTERAÇÕES SOLICITADAS PELO USUÁRIO:
@@ -85,8 +104,41 @@ ALTERAÇÕES SOLICITADAS PELO USUÁRIO:
 Produza um NOVO plano alimentar seguindo todas as instruções anteriores, ajustando exatamente o que foi solicitado e mantendo o formato JSON especificado. Garanta consistência calórica, variedade equilibrada e quantidades detalhadas por alimento, com no mínimo 3 itens por refeição.
 """
 
+AJUSTE_REFEICAO_TEMPLATE = """
+Você é uma IA de prescrição de dietas. Sua única tarefa é reescrever UMA refeição de um plano alimentar existente, aplicando as alterações solicitadas pelo usuário. Leia todo o enunciado antes de responder.
 
-def build_prompt(anamnese: PostAnamneseDieta) -> str:
+REQUISITOS OBRIGATÓRIOS
+
+A resposta deve ser EXCLUSIVAMENTE um JSON bem formatado, sem comentários, cabeçalhos, explicações ou texto adicional, no esquema:
+
+{
+"calorias": inteiro >= 0 (calorias estimadas para a refeição, coerentes com a soma dos alimentos listados),
+"alimentos": "string obrigatória: lista de pelo menos 3 alimentos no formato 'Nome Do Alimento - Quantidade Detalhada - Breve Preparação/Observação', sempre com a primeira letra de cada palavra em maiúsculo e separados por ponto e vírgula ';'",
+"tipoRefeicao": "Café da manhã" | "Almoço" | "Jantar" | "Lanche" | "Ceia"
+}
+
+Mantenha o mesmo tipo de refeição e calorias próximas de <<<CALORIAS>>> kcal, a menos que a alteração peça explicitamente outra coisa. Respeite as preferências e restrições da anamnese.
+
+PLANO ATUAL: <<<PLANO>>>
+
+REFEIÇÃO ATUAL EM JSON (chaves abreviadas: <<<LEGENDA>>>; responda com as chaves completas do esquema):
+<<<REFEICAO>>>
+
+ALTERAÇÕES SOLICITADAS PELO USUÁRIO:
+<<<AJUSTES>>>
+
+ANAMNESE DO USUÁRIO
+<<<RESPOSTAS_ANAMNESE>>>
+"""
+
+TERMOS_PLANO_INTEIRO = (
+    "todas as refeicoes", "todo o plano", "plano inteiro", "plano todo", "dieta inteira",
+    "toda a dieta", "dieta toda", "o dia todo",
+)
+TIPOS_REFEICAO = ("cafe da manha", "almoco", "jantar", "lanche", "ceia")
+
+
+def build_anamnese_text(anamnese: PostAnamneseDieta) -> str:
 
     anamnese_text = (
     f"ID do usuário: {anamnese.usuario_id}\n"
@@ -114,19 +166,143 @@ def build_prompt(anamnese: PostAnamneseDieta) -> str:
     f"Usa suplementos: {'sim' if anamnese.uso_suplementos else 'não'}"
 )
 
-    return PROMPT_TEMPLATE.replace("<<<RESPOSTAS_ANAMNESE>>>", anamnese_text)
+    return anamnese_text
+
+
+def build_prompt(anamnese: PostAnamneseDieta) -> str:
+    return PROMPT_TEMPLATE.replace("<<<RESPOSTAS_ANAMNESE>>>", build_anamnese_text(anamnese))
 
 
 def build_adjustment_prompt(anamnese: PostAnamneseDieta, plano_atual: dict, ajustes: str) -> str:
-    base_prompt = build_prompt(anamnese)
-    plano_json = json.dumps(plano_atual, ensure_ascii=False, indent=2)
+    anamnese_text = build_anamnese_text(anamnese)
+    base_prompt = PROMPT_TEMPLATE.replace("<<<RESPOSTAS_ANAMNESE>>>", anamnese_text)
     ajustes_texto = ajustes.strip() or "Sem ajustes adicionais fornecidos"
-    return base_prompt + ADJUSTMENT_SUFFIX_TEMPLATE.format(
-        plano_atual=plano_json,
-        ajustes=ajustes_texto,
+    legenda = legenda_chaves(MAPA_CHAVES_DIETA)
+
+    def renderizar(plano_json: str) -> str:
+        return base_prompt + ADJUSTMENT_SUFFIX_TEMPLATE.format(
+            legenda=legenda,
+            plano_atual=plano_json,
+            ajustes=ajustes_texto,
+        )
+
+    # o orçamento vale para o prompt inteiro como será enviado, não só para o plano
+    plano_json = compactar_no_orcamento(
+        plano_atual,
+        MAPA_CHAVES_DIETA,
+        NIVEIS_RESUMO_DIETA,
+        renderizar,
+        sett_gpt.GPT_MAX_TOKENS_ENTRADA,
+    )
+    registrar_partes_prompt("/gpt/dieta/ajustar", {
+        "template": PROMPT_TEMPLATE + ADJUSTMENT_SUFFIX_TEMPLATE,
+        "anamnese": anamnese_text,
+        "plano_atual": plano_json,
+        "ajustes": ajustes_texto,
+    })
+    return renderizar(plano_json)
+
+
+def build_meal_adjustment_prompt(anamnese: PostAnamneseDieta, plano_atual: dict, refeicao: dict, ajustes: str) -> str:
+    return (
+        AJUSTE_REFEICAO_TEMPLATE
+        .replace("<<<CALORIAS>>>", str(refeicao.get("calorias") or 0))
+        .replace("<<<PLANO>>>", f"{plano_atual.get('nome') or ''} - {plano_atual.get('descricao') or ''}")
+        .replace("<<<LEGENDA>>>", legenda_chaves(MAPA_CHAVES_DIETA))
+        .replace("<<<REFEICAO>>>", compactar_plano(refeicao, MAPA_CHAVES_DIETA))
+        .replace("<<<AJUSTES>>>", ajustes.strip())
+        .replace("<<<RESPOSTAS_ANAMNESE>>>", build_anamnese_text(anamnese))
     )
 
 
+def refeicoes_afetadas(plano_atual: dict, ajustes: str) -> list[int]:
+    """
+    Identifica quais refeições o pedido de ajuste menciona: pelo tipo ("almoço",
+    "lanche"), pela posição ("refeição 2") ou por um alimento da refeição.
+    Lista vazia significa que o plano inteiro deve ser regenerado.
+    """
+    refeicoes = plano_atual.get("refeicoes")
+    if not isinstance(refeicoes, list) or not refeicoes:
+        return []
+
+    texto = normalizar_busca(ajustes)
+    if any(termo in texto for termo in TERMOS_PLANO_INTEIRO):
+        return []
+
+    afetadas: set[int] = set()
+    for numero in re.findall(r"\brefeicao\s*(?:n[o°º.]*\s*)?(\d{1,2})\b", texto):
+        afetadas.add(int(numero) - 1)
+    for numero in re.findall(r"\b(\d{1,2})\s*[aª]?\s*refeicao\b", texto):
+        afetadas.add(int(numero) - 1)
+
+    tipos_citados = [tipo for tipo in TIPOS_REFEICAO if tipo in texto]
+    for indice, refeicao in enumerate(refeicoes):
+        if not isinstance(refeicao, dict):
+            continue
+        tipo_refeicao = normalizar_busca(refeicao.get("tipoRefeicao") or "")
+        if any(tipo in tipo_refeicao for tipo in tipos_citados):
+            afetadas.add(indice)
+        for alimento in str(refeicao.get("alimentos") or "").split(";"):
+            nome_alimento = normalizar_busca(alimento.split(" - ")[0]).strip()
+            if len(nome_alimento) >= 4 and nome_alimento in texto:
+                afetadas.add(indice)
+
+    return sorted(i for i in afetadas if 0 <= i < len(refeicoes))
+
+
+async def ajustar_refeicoes(anamnese: PostAnamneseDieta, plano_atual: dict, indices: list[int], ajustes: str) -> dict:
+    """
+    Regenera apenas as refeições em `indices`, em paralelo; as demais refeições e
+    os dados do plano são devolvidos exatamente como vieram.
+    """
+    refeicoes = plano_atual["refeicoes"]
+    respostas = await asyncio.gather(*(
+        gpt_response(
+            build_meal_adjustment_prompt(anamnese, plano_atual, refeicoes[indice], ajustes),
+            endpoint="/gpt/dieta/ajustar",
+            prioridade=PRIORIDADE_AJUSTE,
+        )
+        for indice in indices
+    ))
+
+    novas_refeicoes = list(refeicoes)
+    for indice, resposta in zip(indices, respostas):
+        resposta = expandir_chaves(resposta, MAPA_CHAVES_DIETA)
+        if isinstance(resposta.get("refeicoes"), list) and resposta["refeicoes"]:
+            resposta = resposta["refeicoes"][0]
+        elif isinstance(resposta.get("refeicao"), dict):
+            resposta = resposta["refeicao"]
+        novas_refeicoes[indice] = resposta
+    return {**plano_atual, "refeicoes": novas_refeicoes}
+
+
+def atribuir_usuario_plano(plano: dict, usuario_id: int) -> dict:
+    """Garante que o plano de dieta pertença ao usuário da anamnese."""
+    plano["usuario"] = usuario_id
+    return plano
+
+
+def validate_diet_plan(plano: dict) -> None:
+    """Valida a estrutura do plano de dieta gerado, sem tocar no banco."""
+    validar_plano_dieta(plano)
+
+
+def validar_plano_gerado(plano: dict) -> None:
+    """Valida o plano como saiu do modelo, antes de ir para o cache, com um usuário provisório."""
+    validate_diet_plan(atribuir_usuario_plano(expandir_chaves(plano, MAPA_CHAVES_DIETA), USUARIO_VALIDACAO))
+
+
+fila_jobs.registrar_tipo(
+    "dieta",
+    lambda plano, usuario_id: atribuir_usuario_plano(expandir_chaves(plano, MAPA_CHAVES_DIETA), usuario_id),
+    validar=validar_plano_gerado,
+)
+
+
+class DietPlanPayload(BaseModel):
+    plano: PlanoDieta
+
+
 class AdjustmentPayload(BaseModel):
     anamnese: PostAnamneseDieta
     plano_atual: dict = Field(..., alias="planoAtual")
@@ -134,28 +310,80 @@ class AdjustmentPayload(BaseModel):
 
 
 @router.post("/gpt/dieta")
-def gpt_dieta(anamnese: PostAnamneseDieta):
+async def gpt_dieta(
+    anamnese: PostAnamneseDieta,
+    sem_cache: bool = Query(False, alias="semCache", description="Ignora planos em cache e força nova geração"),
+    job: bool = Query(False, description="Enfileira a geração e retorna o ID do job imediatamente"),
+    callback_url: str | None = Query(None, alias="callbackUrl", description="URL notificada quando o job terminar"),
+):
     """
     Gera um plano de dieta personalizado usando GPT com base na anamnese fornecida.
     Args:
         anamnese (PostAnamneseDieta): Dados da anamnese do usuário.
+        sem_cache (bool): Se verdadeiro, não reaproveita planos já gerados.
+        job (bool): Se verdadeiro, responde 202 com o ID do job em vez de aguardar o plano.
+        callback_url (str | None): URL que recebe o resultado do job via POST.
     Returns:
         dict: Resposta contendo o plano de dieta gerado.
     """
     prompt = build_prompt(anamnese)
-    plano = gpt_response(prompt)
-    print(plano)
+    chave = chave_cache(build_prompt(normalizar_anamnese(anamnese)))
+    if job:
+        job_id = await fila_jobs.enviar(
+            "dieta", anamnese.usuario_id, prompt,
+            chave_cache=chave, usar_cache=not sem_cache, callback_url=callback_url,
+        )
+        return resposta_job_enfileirado(job_id)
+
+    plano = await gpt_response(
+        prompt, chave_cache=chave, usar_cache=not sem_cache, endpoint="/gpt/dieta", validar=validar_plano_gerado,
+    )
+    atribuir_usuario_plano(plano, anamnese.usuario_id)
+    log_plano_amostrado("/gpt/dieta", plano, anamnese.usuario_id)
     return {
         "message": "Plano gerado com sucesso",
         "plano": plano,
     }
 
 
+@router.post("/gpt/dieta/stream")
+async def gpt_dieta_stream(anamnese: PostAnamneseDieta):
+    """
+    Gera o plano de dieta transmitindo o resultado via server-sent events.
+    Cada refeição é enviada no evento `refeicao` assim que termina de ser gerada;
+    o evento final `plano` traz o plano completo validado (ou `erro`).
+    Args:
+        anamnese (PostAnamneseDieta): Dados da anamnese do usuário.
+    Returns:
+        StreamingResponse: Fluxo `text/event-stream` com os eventos da geração.
+    """
+    prompt = build_prompt(anamnese)
+    return StreamingResponse(
+        stream_plan_sse(prompt, "refeicoes", "refeicao", validate_diet_plan, "/gpt/dieta/stream"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/gpt/dieta/ajustar")
-def ajustar_dieta(payload: AdjustmentPayload):
-    prompt = build_adjustment_prompt(payload.anamnese, payload.plano_atual, payload.ajustes)
-    plano = gpt_response(prompt)
-    print(plano)
+async def ajustar_dieta(
+    payload: AdjustmentPayload,
+    job: bool = Query(False, description="Enfileira a geração e retorna o ID do job imediatamente"),
+    callback_url: str | None = Query(None, alias="callbackUrl", description="URL notificada quando o job terminar"),
+):
+    if job:
+        prompt = build_adjustment_prompt(payload.anamnese, payload.plano_atual, payload.ajustes)
+        job_id = await fila_jobs.enviar("dieta", payload.anamnese.usuario_id, prompt, callback_url=callback_url)
+        return resposta_job_enfileirado(job_id)
+
+    indices = refeicoes_afetadas(payload.plano_atual, payload.ajustes)
+    if indices:
+        plano = await ajustar_refeicoes(payload.anamnese, payload.plano_atual, indices, payload.ajustes)
+    else:
+        prompt = build_adjustment_prompt(payload.anamnese, payload.plano_atual, payload.ajustes)
+        plano = await gpt_response(prompt, endpoint="/gpt/dieta/ajustar", prioridade=PRIORIDADE_AJUSTE)
+        plano = expandir_chaves(plano, MAPA_CHAVES_DIETA)
+    log_plano_amostrado("/gpt/dieta/ajustar", plano, payload.anamnese.usuario_id)
     return {
         "message": "Plano de dieta ajustado com sucesso",
         "plano": plano,
@@ -163,17 +391,17 @@ def ajustar_dieta(payload: AdjustmentPayload):
 
 
 @router.post("/gpt/dieta/confirm")
-def confirmar_dieta(payload: dict, session: Session = Depends(get_db_mysql)):
+def confirmar_dieta(payload: DietPlanPayload, session: Session = Depends(get_db_mysql)):
     """
     Confirma e persiste o plano de dieta gerado pelo GPT no banco de dados.
     Args:
-        payload (dict): Dados contendo o plano de dieta a ser salvo.
+        payload (DietPlanPayload): Dados contendo o plano de dieta a ser salvo.
         session (Session): Sessão do banco de dados.
     Returns:
         dict: Resposta indicando o sucesso da operação e detalhes do plano salvo.
     """
     try:
-        resultado = persist_diet_plan(payload['plano'], session)
+        resultado = persist_diet_plan(payload.plano, session)
         session.commit()
     except HTTPException:
         session.rollback()
@@ -182,51 +410,60 @@ def confirmar_dieta(payload: dict, session: Session = Depends(get_db_mysql)):
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao salvar treino: {exc}") from exc
 
+    # só depois do commit: a próxima leitura já encontra a dieta gravada
+    invalidar_cache_leitura(
+        ("dietas_usuario", payload.plano.usuario),
+        ("refeicoes_dieta", resultado["id_dieta"]),
+    )
+
     return {
         "message": "Plano gerado e salvo com sucesso",
         "programa": resultado["programa"],
+        "dietaId": resultado["id_dieta"],
         "treinosIds": resultado["treinos_inseridos"],
         "plano": resultado["plano"],
     }
 
-def persist_diet_plan(plano: dict, session: Session) -> dict:
+@instrumentar_persistencia("dieta")
+def persist_diet_plan(plano: PlanoDieta, session: Session) -> dict:
+    """Grava o plano de dieta já validado."""
     try:
         insert_dieta_query = text("""
-        INSERT INTO TCC.DIETA (nome, descricao, id_usuario)
-        VALUES (:nome, :descricao, :usuario);
+        INSERT INTO TCC.DIETA (nome, descricao, id_usuario, calorias_total)
+        VALUES (:nome, :descricao, :usuario, :calorias_total);
         """)
 
-        get_last_dieta_id_query = """
-        SELECT id_dieta AS last_id from TCC.DIETA WHERE id_usuario = :usuario ORDER BY id_dieta DESC LIMIT 1;
-        """
-
-        insert_refeicoes_query = text("""
-        INSERT INTO TCC.REFEICOES (id_dieta, tipo_refeicao, alimentos, calorias)
-        VALUES (:id_dieta, :tipo_refeicao, :alimentos, :calorias);
-        """)
-
-        session.execute(insert_dieta_query, {
-            "nome": plano["nome"],
-            "descricao": plano["descricao"],
-            "usuario": plano["usuario"],
-        })
-
-        last_dieta_id = consulta_get(get_last_dieta_id_query, session, {"usuario": plano["usuario"]})[0]["last_id"]
-
-        refeicoes_inseridas = []
-        for refeicao in plano["refeicoes"]:
-            session.execute(insert_refeicoes_query, {
-                "id_dieta": last_dieta_id,
-                "tipo_refeicao": refeicao["tipoRefeicao"],
-                "alimentos": refeicao["alimentos"],
-                "calorias": refeicao["calorias"],
-            })
-            refeicoes_inseridas.append(refeicao)
+        # o id vem do próprio INSERT (por conexão), então confirmações simultâneas
+        # do mesmo usuário não trocam as refeições de dieta
+        id_dieta = session.execute(insert_dieta_query, {
+            "nome": plano.nome,
+            "descricao": plano.descricao,
+            "usuario": plano.usuario,
+            # gravado na mesma transação das refeições, então não diverge delas
+            "calorias_total": sum(refeicao.calorias for refeicao in plano.refeicoes),
+        }).lastrowid
+        if not id_dieta:
+            raise HTTPException(status_code=500, detail="Falha ao inserir plano de dieta")
+
+        refeicoes = [
+            {
+                "id_dieta": id_dieta,
+                "tipo_refeicao": refeicao.tipo_refeicao,
+                "alimentos": refeicao.alimentos,
+                "calorias": refeicao.calorias,
+            }
+            for refeicao in plano.refeicoes
+        ]
+        if inserir_em_lote(session, "TCC.REFEICOES", refeicoes) != len(refeicoes):
+            raise HTTPException(status_code=500, detail="Falha ao inserir refeições da dieta")
 
         return {
-            "programa": plano["nome"],
-            "treinos_inseridos": refeicoes_inseridas,
-            "plano": plano,
+            "programa": plano.nome,
+            "id_dieta": id_dieta,
+            "treinos_inseridos": [refeicao.model_dump(by_alias=True) for refeicao in plano.refeicoes],
+            "plano": plano.model_dump(by_alias=True),
         }
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Erro ao persistir plano de dieta: {exc}") from exc
\ No newline at end of file
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import math
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+import httpx
+from fastapi import HTTPException
+
+from src.core.gpt_client import sett_gpt
+from src.routers.apis.gpt.scheduler_gpt import agendador_gpt
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# prazo total (segundos) que cada endpoint aceita esperar pelo modelo
+PRAZOS_POR_ENDPOINT: dict[str, float] = {
+    "/gpt": 90.0,
+    "/gpt/dia": 45.0,
+    "/gpt/ajustar": 60.0,
+    "/gpt/dieta": 90.0,
+    "/gpt/dieta/ajustar": 60.0,
+    "/gpt/jobs/treino": 180.0,
+    "/gpt/jobs/dieta": 180.0,
+}
+
+
+class HistogramaLatencia:
+    """Janela móvel das últimas latências observadas, para calcular percentis."""
+
+    def __init__(self, tamanho: int = 200):
+        self._amostras: deque[float] = deque(maxlen=tamanho)
+
+    def registrar(self, segundos: float) -> None:
+        self._amostras.append(segundos)
+
+    def __len__(self) -> int:
+        return len(self._amostras)
+
+    def percentil(self, p: float) -> float | None:
+        if not self._amostras:
+            return None
+        ordenadas = sorted(self._amostras)
+        indice = min(len(ordenadas) - 1, max(0, math.ceil(p * len(ordenadas)) - 1))
+        return ordenadas[indice]
+
+
+class CircuitBreaker:
+    """
+    Abre após `limiar_falhas` falhas seguidas e recusa chamadas por `tempo_aberto`
+    segundos; depois deixa passar uma chamada de teste (meio-aberto) e fecha se ela der certo.
+    """
+
+    def __init__(self, limiar_falhas: int, tempo_aberto: float):
+        self.limiar_falhas = limiar_falhas
+        self.tempo_aberto = tempo_aberto
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self._teste_em_andamento = False
+        self.recusadas = 0
+
+    @property
+    def estado(self) -> str:
+        if self.falhas_seguidas < self.limiar_falhas:
+            return "fechado"
+        if time.monotonic() < self.aberto_ate:
+            return "aberto"
+        return "meio-aberto"
+
+    def verificar(self) -> None:
+        estado = self.estado
+        if estado == "fechado":
+            return
+        if estado == "meio-aberto" and not self._teste_em_andamento:
+            self._teste_em_andamento = True
+            return
+        self.recusadas += 1
+        restante = max(1, math.ceil(self.aberto_ate - time.monotonic()))
+        raise HTTPException(
+            status_code=503,
+            detail="Serviço de IA temporariamente indisponível",
+            headers={"Retry-After": str(restante)},
+        )
+
+    def sucesso(self) -> None:
+        self.falhas_seguidas = 0
+        self._teste_em_andamento = False
+
+    def liberar_teste(self) -> None:
+        self._teste_em_andamento = False
+
+    def falha(self) -> None:
+        self.falhas_seguidas += 1
+        self._teste_em_andamento = False
+        if self.falhas_seguidas >= self.limiar_falhas:
+            self.aberto_ate = time.monotonic() + self.tempo_aberto
+            logger.warning("Circuit breaker do modelo aberto por %.0fs", self.tempo_aberto)
+
+
+def _falha_do_provedor(exc: BaseException) -> bool:
+    """
+    Só conta para o breaker o que indica provedor degradado: falha de transporte,
+    timeout e 5xx do provedor. Erros gerados aqui (JSON inválido, fila cheia,
+    cancelamento) não contam; o estouro do prazo do endpoint (504) conta como lentidão.
+    """
+    if isinstance(exc, HTTPException):
+        return exc.status_code == 504
+    if isinstance(exc, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status >= 500
+    if not isinstance(exc, Exception):
+        return False
+    # já importado pelo cliente compartilhado; cobre APITimeoutError
+    from openai import APIConnectionError
+
+    return isinstance(exc, APIConnectionError)
+
+
+class ExecutorHedge:
+    """
+    Executa a chamada ao modelo dentro do prazo do endpoint. Se a primeira tentativa
+    passar do percentil configurado das latências recentes, dispara uma segunda
+    tentativa; a primeira resposta válida vence e a outra é cancelada.
+
+    O tempo do hedge conta a partir de quando o agendador libera a chamada (a
+    tentativa recebe `ao_admitir` e o chama nesse momento), não da espera na fila; e
+    com a fila do agendador ocupada o hedge não é disparado, pois só tomaria a vez
+    de outra requisição.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        percentil: float,
+        amostras_minimas: int,
+        ativo: bool = True,
+        fila_ocupada: Callable[[], bool] = lambda: False,
+    ):
+        self.breaker = breaker
+        self.percentil = percentil
+        self.amostras_minimas = amostras_minimas
+        self.ativo = ativo
+        self.fila_ocupada = fila_ocupada
+        self.histogramas: dict[str, HistogramaLatencia] = defaultdict(HistogramaLatencia)
+        self.hedges = 0
+        self.hedges_vencedores = 0
+        self.hedges_suprimidos = 0
+        self.estouros_prazo = 0
+
+    def limiar_hedge(self, endpoint: str) -> float | None:
+        histograma = self.histogramas[endpoint]
+        if not self.ativo or len(histograma) < self.amostras_minimas:
+            return None
+        return histograma.percentil(self.percentil)
+
+    def registrar_erro(self, exc: BaseException) -> None:
+        """Informa ao breaker o fim com erro de uma chamada que passou por `breaker.verificar`."""
+        if _falha_do_provedor(exc):
+            self.breaker.falha()
+        else:
+            self.breaker.liberar_teste()
+
+    async def executar(self, endpoint: str, tentativa: Callable[[Callable[[], None]], Awaitable[T]]) -> T:
+        self.breaker.verificar()
+
+        inicio = time.monotonic()
+        prazo = inicio + PRAZOS_POR_ENDPOINT.get(endpoint, sett_gpt.GPT_PRAZO_PADRAO_SEGUNDOS)
+        limiar = self.limiar_hedge(endpoint)
+        admitida = asyncio.Event()
+        # momento em que o agendador liberou cada tentativa (a última vez, se houve 429)
+        admissoes: dict[asyncio.Future, float] = {}
+
+        def disparar() -> asyncio.Future:
+            def ao_admitir() -> None:
+                admissoes[tarefa] = time.monotonic()
+                admitida.set()
+
+            tarefa = asyncio.ensure_future(tentativa(ao_admitir))
+            return tarefa
+
+        primeira = disparar()
+        pendentes = {primeira}
+        espera_admissao = asyncio.ensure_future(admitida.wait())
+        ultimo_erro: BaseException | None = None
+        hedge_disparado = limiar is None
+
+        try:
+            while pendentes:
+                agora = time.monotonic()
+                espera = prazo - agora
+                aguardando = set(pendentes)
+                if not hedge_disparado:
+                    if primeira in admissoes:
+                        espera = min(espera, admissoes[primeira] + limiar - agora)
+                    else:
+                        aguardando.add(espera_admissao)
+
+                concluidas, _ = await asyncio.wait(
+                    aguardando, timeout=max(espera, 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                concluidas.discard(espera_admissao)
+                pendentes -= concluidas
+
+                for tarefa in concluidas:
+                    erro = tarefa.exception()
+                    if erro is None:
+                        self.histogramas[endpoint].registrar(time.monotonic() - admissoes.get(tarefa, inicio))
+                        self.breaker.sucesso()
+                        if tarefa is not primeira:
+                            self.hedges_vencedores += 1
+                        return tarefa.result()
+                    ultimo_erro = erro
+
+                if time.monotonic() >= prazo:
+                    self.estouros_prazo += 1
+                    ultimo_erro = HTTPException(status_code=504, detail="Tempo limite de geração do plano excedido")
+                    break
+
+                if (
+                    not hedge_disparado
+                    and primeira in pendentes
+                    and primeira in admissoes
+                    and time.monotonic() >= admissoes[primeira] + limiar
+                ):
+                    hedge_disparado = True
+                    if self.fila_ocupada():
+                        self.hedges_suprimidos += 1
+                    else:
+                        self.hedges += 1
+                        pendentes.add(disparar())
+        except asyncio.CancelledError:
+            self.breaker.liberar_teste()
+            raise
+        finally:
+            espera_admissao.cancel()
+            for tarefa in pendentes:
+                tarefa.cancel()
+
+        self.registrar_erro(ultimo_erro)
+        raise ultimo_erro
+
+    def stats(self) -> dict:
+        return {
+            "hedges": self.hedges,
+            "hedges_vencedores": self.hedges_vencedores,
+            "hedges_suprimidos": self.hedges_suprimidos,
+            "estouros_prazo": self.estouros_prazo,
+            "breaker_estado": self.breaker.estado,
+            "breaker_recusadas": self.breaker.recusadas,
+        }
+
+
+executor_hedge = ExecutorHedge(
+    CircuitBreaker(sett_gpt.GPT_BREAKER_FALHAS, sett_gpt.GPT_BREAKER_ABERTO_SEGUNDOS),
+    percentil=sett_gpt.GPT_HEDGE_PERCENTIL,
+    amostras_minimas=sett_gpt.GPT_HEDGE_AMOSTRAS_MINIMAS,
+    ativo=sett_gpt.GPT_HEDGE_ATIVO,
+    fila_ocupada=lambda: agendador_gpt.profundidade_fila() > 0,
+)
@@ -0,0 +1,345 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from src.routers.router import router
+from src.core.gpt_client import sett_gpt
+from src.routers.apis.gpt.funcs_gpt import gpt_response
+from src.routers.apis.gpt.scheduler_gpt import PRIORIDADE_LOTE
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class JobStore:
+    """
+    Estado persistente dos jobs de geração em SQLite local.
+
+    A conexão é compartilhada entre as threads do pool (os workers chamam os
+    métodos via `asyncio.to_thread`), então todo acesso passa pelo `_lock`.
+    """
+
+    def __init__(self, caminho: str):
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                usuario_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                chave_cache TEXT,
+                usar_cache INTEGER NOT NULL DEFAULT 1,
+                callback_url TEXT,
+                resultado TEXT,
+                erro TEXT,
+                criado_em REAL NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+            """
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_jobs_usuario_status ON jobs (usuario_id, status)")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, atualizado_em)")
+        self._conexao.commit()
+
+    def criar(self, tipo: str, usuario_id: int, prompt: str, chave_cache: str | None,
+              usar_cache: bool, callback_url: str | None, max_ativos: int) -> str | None:
+        """
+        Cria o job se o usuário tiver menos de `max_ativos` jobs na fila ou em execução;
+        None caso contrário. A contagem e o INSERT acontecem na mesma transação
+        (`BEGIN IMMEDIATE`), então envios simultâneos não passam do limite.
+        """
+        job_id = uuid.uuid4().hex
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.execute("BEGIN IMMEDIATE")
+            ativos = self._conexao.execute(
+                "SELECT COUNT(*) FROM jobs WHERE usuario_id = ? AND status IN (?, ?)",
+                (usuario_id, STATUS_QUEUED, STATUS_RUNNING),
+            ).fetchone()[0]
+            if ativos >= max_ativos:
+                return None
+            self._conexao.execute(
+                """
+                INSERT INTO jobs (id, tipo, usuario_id, status, prompt, chave_cache, usar_cache, callback_url, criado_em, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, tipo, usuario_id, STATUS_QUEUED, prompt, chave_cache, int(usar_cache), callback_url, agora, agora),
+            )
+        return job_id
+
+    def obter(self, job_id: str) -> sqlite3.Row | None:
+        with self._lock:
+            return self._conexao.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def reservar(self, job_id: str) -> bool:
+        """Marca o job como em execução; falso se outro worker já o pegou."""
+        with self._lock, self._conexao:
+            cursor = self._conexao.execute(
+                "UPDATE jobs SET status = ?, atualizado_em = ? WHERE id = ? AND status = ?",
+                (STATUS_RUNNING, time.time(), job_id, STATUS_QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def concluir(self, job_id: str, resultado: dict) -> None:
+        self._finalizar(job_id, STATUS_DONE, json.dumps(resultado, ensure_ascii=False), None)
+
+    def falhar(self, job_id: str, erro: str) -> None:
+        self._finalizar(job_id, STATUS_FAILED, None, erro)
+
+    def pendentes(self, limite_execucao: float) -> list[str]:
+        """Jobs a retomar na inicialização: na fila ou presos em execução há mais de `limite_execucao` s."""
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "UPDATE jobs SET status = ?, atualizado_em = ? WHERE status = ? AND atualizado_em < ?",
+                (STATUS_QUEUED, agora, STATUS_RUNNING, agora - limite_execucao),
+            )
+            linhas = self._conexao.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY criado_em", (STATUS_QUEUED,)
+            ).fetchall()
+        return [linha["id"] for linha in linhas]
+
+    def limpar(self, retencao_segundos: int) -> None:
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND atualizado_em < ?",
+                (STATUS_DONE, STATUS_FAILED, time.time() - retencao_segundos),
+            )
+
+    def fechar(self) -> None:
+        with self._lock:
+            self._conexao.close()
+
+    def _finalizar(self, job_id: str, status: str, resultado: str | None, erro: str | None) -> None:
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "UPDATE jobs SET status = ?, resultado = ?, erro = ?, atualizado_em = ? WHERE id = ?",
+                (status, resultado, erro, time.time(), job_id),
+            )
+
+
+class FilaJobs:
+    """
+    Pool limitado de workers que executa `gpt_response` para jobs enfileirados.
+
+    Cada tipo de job (`treino`, `dieta`) registra o pós-processamento do plano
+    (ex.: reatribuir o usuário) e a validação exigida para guardá-lo no cache via
+    `registrar_tipo`. O `JobStore` só é aberto em `iniciar` (lifespan), então
+    importar o módulo não cria o arquivo SQLite.
+    """
+
+    def __init__(self, caminho_store: str, workers: int, max_por_usuario: int):
+        self.caminho_store = caminho_store
+        self._store: JobStore | None = None
+        self.workers = workers
+        self.max_por_usuario = max_por_usuario
+        self._fila: asyncio.Queue[str] = asyncio.Queue()
+        self._tarefas: list[asyncio.Task] = []
+        self._tipos: dict[str, Callable[[dict, int], dict]] = {}
+        self._validadores: dict[str, Callable[[dict], None]] = {}
+
+    def registrar_tipo(
+        self,
+        tipo: str,
+        pos_processamento: Callable[[dict, int], dict],
+        validar: Callable[[dict], None] | None = None,
+    ) -> None:
+        self._tipos[tipo] = pos_processamento
+        if validar is not None:
+            self._validadores[tipo] = validar
+
+    async def enviar(self, tipo: str, usuario_id: int, prompt: str, chave_cache: str | None = None,
+                     usar_cache: bool = True, callback_url: str | None = None) -> str:
+        if tipo not in self._tipos:
+            raise ValueError(f"Tipo de job desconhecido: {tipo}")
+        if callback_url:
+            try:
+                await resolver_callback(callback_url)
+            except ValueError as exc:
+                raise HTTPException(status_code=400, detail=f"callbackUrl inválida: {exc}") from exc
+        job_id = await asyncio.to_thread(
+            self.store.criar, tipo, usuario_id, prompt, chave_cache, usar_cache, callback_url, self.max_por_usuario,
+        )
+        if job_id is None:
+            raise HTTPException(
+                status_code=429,
+                detail="Limite de gerações simultâneas por usuário atingido",
+            )
+        self._fila.put_nowait(job_id)
+        return job_id
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            raise HTTPException(status_code=503, detail="Fila de jobs não iniciada")
+        return self._store
+
+    async def iniciar(self) -> None:
+        if self._store is None:
+            self._store = await asyncio.to_thread(JobStore, self.caminho_store)
+        await asyncio.to_thread(self.store.limpar, sett_gpt.GPT_JOBS_RETENCAO_SEGUNDOS)
+        for job_id in await asyncio.to_thread(self.store.pendentes, sett_gpt.OPENAI_TIMEOUT * 2):
+            self._fila.put_nowait(job_id)
+        self._tarefas = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def parar(self) -> None:
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        if self._store is not None:
+            await asyncio.to_thread(self._store.fechar)
+            self._store = None
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._fila.get()
+            try:
+                await self._executar(job_id)
+            except Exception:
+                logger.exception("Erro inesperado ao executar job %s", job_id)
+            finally:
+                self._fila.task_done()
+
+    async def _executar(self, job_id: str) -> None:
+        if not await asyncio.to_thread(self.store.reservar, job_id):
+            return
+        job = await asyncio.to_thread(self.store.obter, job_id)
+
+        try:
+            plano = await gpt_response(
+                job["prompt"],
+                chave_cache=job["chave_cache"],
+                usar_cache=bool(job["usar_cache"]),
+                endpoint=f"/gpt/jobs/{job['tipo']}",
+                prioridade=PRIORIDADE_LOTE,
+                validar=self._validadores.get(job["tipo"]),
+            )
+            plano = self._tipos[job["tipo"]](plano, job["usuario_id"])
+        except HTTPException as exc:
+            await asyncio.to_thread(self.store.falhar, job_id, str(exc.detail))
+        except Exception as exc:
+            await asyncio.to_thread(self.store.falhar, job_id, f"Erro ao gerar plano: {exc}")
+        else:
+            await asyncio.to_thread(self.store.concluir, job_id, plano)
+
+        if job["callback_url"]:
+            await self._notificar(job["callback_url"], job_id)
+
+    async def _notificar(self, callback_url: str, job_id: str) -> None:
+        corpo = serializar_job(await asyncio.to_thread(self.store.obter, job_id))
+        try:
+            # resolve de novo no envio e conecta no IP verificado, para que o DNS não
+            # passe a apontar para um endereço interno depois da validação no envio do job
+            url, host = await resolver_callback(callback_url)
+        except (ValueError, OSError) as exc:
+            logger.warning("Callback do job %s recusado (%s): %s", job_id, callback_url, exc)
+            return
+        async with httpx.AsyncClient(timeout=10.0, follow_redirects=False) as client:
+            for tentativa in range(3):
+                try:
+                    resposta = await client.post(
+                        url, json=corpo, headers={"Host": host}, extensions={"sni_hostname": host.split(":")[0]}
+                    )
+                    if resposta.status_code < 500:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(2 ** tentativa)
+        logger.warning("Falha ao notificar callback do job %s em %s", job_id, callback_url)
+
+
+async def resolver_callback(callback_url: str) -> tuple[str, str]:
+    """
+    Valida o `callbackUrl` de um job contra SSRF: só https, e o host precisa estar em
+    `GPT_JOBS_CALLBACK_HOSTS` ou, sem lista configurada, resolver apenas para IPs
+    públicos (nada de rede privada, loopback ou link-local). Retorna a URL com o host
+    trocado pelo IP resolvido e o cabeçalho `Host` original.
+    """
+    partes = urlsplit(callback_url)
+    if partes.scheme != "https" or not partes.hostname:
+        raise ValueError("use uma URL https")
+    if partes.username or partes.password:
+        raise ValueError("credenciais na URL não são aceitas")
+    hosts_permitidos = sett_gpt.GPT_JOBS_CALLBACK_HOSTS
+    if hosts_permitidos and partes.hostname not in hosts_permitidos:
+        raise ValueError("host não permitido")
+
+    porta = partes.port or 443
+    try:
+        enderecos = await asyncio.get_running_loop().getaddrinfo(partes.hostname, porta, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise ValueError("host não encontrado") from exc
+    ips = [ipaddress.ip_address(endereco[4][0]) for endereco in enderecos]
+    if not ips:
+        raise ValueError("host não encontrado")
+    if not hosts_permitidos and any(not ip.is_global or ip.is_multicast for ip in ips):
+        raise ValueError("o host resolve para um endereço interno")
+
+    ip = ips[0]
+    host_ip = f"[{ip}]" if ip.version == 6 else str(ip)
+    host = partes.hostname if partes.port is None else f"{partes.hostname}:{partes.port}"
+    return partes._replace(netloc=f"{host_ip}:{porta}").geturl(), host
+
+
+def serializar_job(job: sqlite3.Row) -> dict:
+    resposta = {
+        "jobId": job["id"],
+        "tipo": job["tipo"],
+        "status": job["status"],
+    }
+    if job["status"] == STATUS_DONE:
+        resposta["plano"] = json.loads(job["resultado"])
+    elif job["status"] == STATUS_FAILED:
+        resposta["erro"] = job["erro"]
+    return resposta
+
+
+def resposta_job_enfileirado(job_id: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={"message": "Geração enfileirada", "jobId": job_id, "status": STATUS_QUEUED},
+        headers={"Location": f"{router.prefix}/gpt/jobs/{job_id}"},
+    )
+
+
+fila_jobs = FilaJobs(
+    sett_gpt.GPT_JOBS_SQLITE_PATH,
+    workers=sett_gpt.GPT_JOBS_WORKERS,
+    max_por_usuario=sett_gpt.GPT_JOBS_MAX_POR_USUARIO,
+)
+
+
+@router.get("/gpt/jobs/{job_id}")
+def consultar_job(job_id: str):
+    """
+    Consulta o estado de um job de geração enviado com `?job=true`.
+    Args:
+        job_id (str): ID retornado no envio do job.
+    Returns:
+        dict: Status do job (`queued`, `running`, `done`, `failed`) e, quando concluído, o plano ou o erro.
+    """
+    job = fila_jobs.store.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return serializar_job(job)
@@ -0,0 +1,131 @@
+import functools
+import json
+import logging
+import random
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import HTTPException
+
+from src.core.gpt_client import sett_gpt
+from src.core.metricas import registro_metricas
+from src.routers.apis.gpt.cache_gpt import cache_planos
+from src.routers.apis.gpt.hedge_gpt import executor_hedge
+from src.routers.apis.gpt.scheduler_gpt import agendador_gpt
+from src.routers.apis.gpt.tokens_gpt import uso_tokens
+
+logger = logging.getLogger(__name__)
+
+chamadas_modelo = registro_metricas.contador(
+    "gpt_chamadas_total", "Gerações de plano por endpoint e resultado (ok, cache, erro)", ("endpoint", "resultado")
+)
+latencia_modelo = registro_metricas.histograma(
+    "gpt_latencia_segundos", "Latência da geração do plano pelo modelo, incluindo hedge e parse", ("endpoint",)
+)
+erros_modelo = registro_metricas.contador(
+    "gpt_erros_total", "Falhas na geração do plano por classe de erro", ("endpoint", "classe")
+)
+fallbacks_json = registro_metricas.contador(
+    "gpt_json_fallback_total", "Respostas que não eram JSON puro e passaram pelo parser tolerante", ("endpoint",)
+)
+reparos_json = registro_metricas.contador(
+    "gpt_json_reparos_total", "Respostas do modelo corrigidas pelo parser tolerante, por tipo de reparo", ("endpoint", "tipo")
+)
+formatos_saida = registro_metricas.contador(
+    "gpt_saida_formato_total", "Origem do texto extraído da resposta do modelo", ("formato",)
+)
+latencia_persistencia = registro_metricas.histograma(
+    "db_persistencia_segundos", "Tempo para gravar um plano confirmado no banco", ("plano",)
+)
+erros_persistencia = registro_metricas.contador(
+    "db_persistencia_erros_total", "Falhas ao gravar planos confirmados", ("plano", "classe")
+)
+
+ESTADOS_BREAKER = {"fechado": 0, "meio-aberto": 1, "aberto": 2}
+
+
+def classe_erro(exc: BaseException) -> str:
+    if isinstance(exc, HTTPException):
+        return f"http_{exc.status_code}"
+    return type(exc).__name__
+
+
+def registrar_reparo_json(endpoint: str, relatorio: Any) -> None:
+    if relatorio.virgulas_removidas:
+        reparos_json.inc(endpoint=endpoint, tipo="virgulas")
+    if relatorio.fechamentos_corrigidos:
+        reparos_json.inc(endpoint=endpoint, tipo="fechamentos")
+    if relatorio.string_fechada:
+        reparos_json.inc(endpoint=endpoint, tipo="string")
+    if relatorio.truncado:
+        reparos_json.inc(endpoint=endpoint, tipo="truncado")
+    if relatorio.caracteres_descartados:
+        reparos_json.inc(endpoint=endpoint, tipo="descarte")
+
+
+def log_plano_amostrado(endpoint: str, plano: dict, usuario_id: int | None = None) -> None:
+    """
+    Registra no log um resumo estruturado de uma fração (`GPT_LOG_AMOSTRAGEM`) dos
+    planos gerados; o plano completo só aparece com o nível DEBUG habilitado.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("plano endpoint=%s usuario=%s plano=%s", endpoint, usuario_id, json.dumps(plano, ensure_ascii=False))
+        return
+    if random.random() >= sett_gpt.GPT_LOG_AMOSTRAGEM:
+        return
+    itens = plano.get("treinos") or plano.get("refeicoes") or []
+    logger.info(
+        "plano endpoint=%s usuario=%s itens=%d bytes=%d",
+        endpoint,
+        usuario_id,
+        len(itens),
+        len(json.dumps(plano, ensure_ascii=False)),
+    )
+
+
+def instrumentar_persistencia(plano: str) -> Callable:
+    """Mede a duração e conta as falhas da função que grava o plano no banco."""
+
+    def decorador(funcao: Callable) -> Callable:
+        @functools.wraps(funcao)
+        def wrapper(*args, **kwargs):
+            try:
+                with latencia_persistencia.cronometrar(plano=plano):
+                    return funcao(*args, **kwargs)
+            except Exception as exc:
+                erros_persistencia.inc(plano=plano, classe=classe_erro(exc))
+                raise
+
+        return wrapper
+
+    return decorador
+
+
+registro_metricas.coletor(
+    "gpt_tokens_total",
+    "Tokens consumidos nas chamadas ao modelo por endpoint",
+    lambda: [
+        ({"endpoint": endpoint, "tipo": tipo}, totais[tipo])
+        for endpoint, totais in list(uso_tokens.items())
+        for tipo in ("prompt", "completion")
+    ],
+    tipo="counter",
+)
+registro_metricas.coletor(
+    "gpt_cache",
+    "Estatísticas do cache de planos gerados",
+    lambda: [({"estatistica": nome}, valor) for nome, valor in cache_planos.stats().items()],
+)
+registro_metricas.coletor(
+    "gpt_agendador",
+    "Estado da fila e esperas do agendador de chamadas ao modelo",
+    lambda: [({"estatistica": nome}, valor) for nome, valor in agendador_gpt.stats().items()],
+)
+registro_metricas.coletor(
+    "gpt_hedge",
+    "Hedges, estouros de prazo e estado do circuit breaker (0 fechado, 1 meio-aberto, 2 aberto)",
+    lambda: [
+        ({"estatistica": nome}, ESTADOS_BREAKER.get(valor, valor) if nome == "breaker_estado" else valor)
+        for nome, valor in executor_hedge.stats().items()
+    ],
+)
@@ -0,0 +1,204 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi import HTTPException
+
+from src.core.gpt_client import sett_gpt
+
+logger = logging.getLogger(__name__)
+
+# classes de prioridade: menor valor é atendido primeiro
+PRIORIDADE_AJUSTE = 0
+PRIORIDADE_NOVO_PLANO = 1
+PRIORIDADE_LOTE = 2
+
+
+class TokenBucket:
+    """Balde de tokens que recarrega `capacidade` unidades por minuto."""
+
+    def __init__(self, capacidade: int, relogio: Callable[[], float] = time.monotonic):
+        self.capacidade = float(capacidade)
+        self.por_segundo = capacidade / 60.0
+        self.disponivel = float(capacidade)
+        self._relogio = relogio
+        self._ultimo = relogio()
+
+    def _recarregar(self) -> None:
+        agora = self._relogio()
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self._ultimo) * self.por_segundo)
+        self._ultimo = agora
+
+    def tempo_ate(self, quantidade: float) -> float:
+        """Segundos até haver `quantidade` disponível (0 se já houver)."""
+        self._recarregar()
+        falta = quantidade - self.disponivel
+        return max(falta, 0.0) / self.por_segundo
+
+    def consumir(self, quantidade: float) -> None:
+        self._recarregar()
+        self.disponivel -= quantidade
+
+
+class AgendadorGPT:
+    """
+    Controla o envio de chamadas ao modelo respeitando os limites de requisições e
+    tokens por minuto do provedor.
+
+    Chamadas que não podem sair imediatamente esperam em uma fila limitada,
+    ordenada por prioridade (ajuste > novo plano > lote). Com a fila cheia, a
+    requisição é recusada na hora com 429 e `Retry-After`. Respostas 429 do
+    provedor são repetidas com backoff exponencial com jitter.
+
+    `relogio` e `dormir` são `time.monotonic` e `asyncio.sleep`; os testes passam
+    um relógio falso para controlar o tempo.
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        max_fila: int,
+        tentativas_429: int,
+        relogio: Callable[[], float] = time.monotonic,
+        dormir: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.rpm = TokenBucket(rpm, relogio)
+        self.tpm = TokenBucket(tpm, relogio)
+        self._relogio = relogio
+        self._dormir = dormir
+        self.max_fila = max_fila
+        self.tentativas_429 = tentativas_429
+        self._fila: list[tuple[int, int, float, asyncio.Future]] = []
+        self._sequencia = itertools.count()
+        self._acordar = asyncio.Event()
+        self._despachante: asyncio.Task | None = None
+        self.esperas = 0
+        self.espera_total_segundos = 0.0
+        self.espera_maxima_segundos = 0.0
+        self.recusadas = 0
+        self.retentativas_429 = 0
+
+    async def executar(
+        self,
+        prioridade: int,
+        tokens_estimados: int,
+        funcao: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        for tentativa in range(self.tentativas_429 + 1):
+            await self._aguardar_vez(prioridade, tokens_estimados)
+            try:
+                return await funcao()
+            except Exception as exc:
+                if isinstance(exc, HTTPException) or getattr(exc, "status_code", None) != 429:
+                    raise
+                espera = self._retry_after(exc, tentativa)
+                if tentativa == self.tentativas_429:
+                    raise HTTPException(
+                        status_code=429,
+                        detail="Limite de requisições do provedor de IA atingido",
+                        headers={"Retry-After": str(max(1, math.ceil(espera)))},
+                    ) from exc
+                self.retentativas_429 += 1
+                logger.warning("429 do provedor; nova tentativa em %.1fs", espera)
+                await self._dormir(espera)
+
+    def profundidade_fila(self) -> int:
+        return len(self._fila)
+
+    def stats(self) -> dict:
+        return {
+            "fila": self.profundidade_fila(),
+            "esperas": self.esperas,
+            "espera_total_segundos": self.espera_total_segundos,
+            "espera_maxima_segundos": self.espera_maxima_segundos,
+            "recusadas": self.recusadas,
+            "retentativas_429": self.retentativas_429,
+        }
+
+    async def _aguardar_vez(self, prioridade: int, tokens: float) -> None:
+        tokens = min(tokens, self.tpm.capacidade)
+        if not self._fila and self.rpm.tempo_ate(1) == 0 and self.tpm.tempo_ate(tokens) == 0:
+            self._liberar(tokens)
+            return
+
+        if len(self._fila) >= self.max_fila:
+            self.recusadas += 1
+            retry_after = (len(self._fila) + 1) / self.rpm.por_segundo
+            raise HTTPException(
+                status_code=429,
+                detail="Muitas gerações em andamento, tente novamente em instantes",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._fila, (prioridade, next(self._sequencia), tokens, futuro))
+        if self._despachante is None or self._despachante.done():
+            self._despachante = asyncio.create_task(self._despachar())
+        self._acordar.set()
+
+        inicio = self._relogio()
+        try:
+            await futuro
+        finally:
+            espera = self._relogio() - inicio
+            self.esperas += 1
+            self.espera_total_segundos += espera
+            self.espera_maxima_segundos = max(self.espera_maxima_segundos, espera)
+
+    async def _despachar(self) -> None:
+        while self._fila:
+            _, _, tokens, futuro = self._fila[0]
+            if futuro.done():
+                # quem esperava foi cancelado (ex.: cliente desconectou)
+                heapq.heappop(self._fila)
+                continue
+
+            espera = max(self.rpm.tempo_ate(1), self.tpm.tempo_ate(tokens))
+            if espera > 0:
+                # acorda antes se chegar alguém de prioridade maior
+                self._acordar.clear()
+                await self._esperar_ou_acordar(espera)
+                continue
+
+            heapq.heappop(self._fila)
+            self._liberar(tokens)
+            futuro.set_result(None)
+
+    async def _esperar_ou_acordar(self, segundos: float) -> None:
+        acordar = asyncio.ensure_future(self._acordar.wait())
+        dormir = asyncio.ensure_future(self._dormir(segundos))
+        try:
+            await asyncio.wait((acordar, dormir), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            acordar.cancel()
+            dormir.cancel()
+
+    def _liberar(self, tokens: float) -> None:
+        self.rpm.consumir(1)
+        self.tpm.consumir(tokens)
+
+    @staticmethod
+    def _retry_after(exc: Exception, tentativa: int) -> float:
+        resposta = getattr(exc, "response", None)
+        cabecalho = resposta.headers.get("retry-after") if resposta is not None else None
+        try:
+            if cabecalho:
+                return float(cabecalho)
+        except ValueError:
+            pass
+        return min(30.0, (2 ** tentativa) * random.uniform(0.5, 1.5))
+
+
+agendador_gpt = AgendadorGPT(
+    rpm=sett_gpt.GPT_LIMITE_RPM,
+    tpm=sett_gpt.GPT_LIMITE_TPM,
+    max_fila=sett_gpt.GPT_FILA_MAX,
+    tentativas_429=sett_gpt.GPT_TENTATIVAS_429,
+)
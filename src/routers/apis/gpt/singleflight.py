@@ -0,0 +1,50 @@
+import asyncio
+import copy
+from collections.abc import Awaitable, Callable
+
+
+class SingleFlight:
+    """
+    Coalesce chamadas concorrentes com a mesma chave em uma única execução.
+
+    A primeira chamada dispara a tarefa; as que chegam enquanto ela está em andamento
+    aguardam o mesmo resultado (ou a mesma exceção). A tarefa roda protegida por
+    `asyncio.shield`, então o cancelamento de quem a iniciou (ex.: cliente que
+    desconectou) não derruba as demais requisições que esperam por ela.
+    """
+
+    def __init__(self):
+        self._em_andamento: dict[str, asyncio.Task] = {}
+        self.execucoes = 0
+        self.coalescidas = 0
+
+    async def executar(self, chave: str, funcao: Callable[[], Awaitable[dict]]) -> dict:
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(funcao())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda t: self._finalizar(chave, t))
+            self.execucoes += 1
+        else:
+            self.coalescidas += 1
+
+        resultado = await asyncio.shield(tarefa)
+        # cada chamador recebe sua própria cópia, pois os handlers alteram o plano
+        return copy.deepcopy(resultado)
+
+    def em_andamento(self) -> int:
+        return len(self._em_andamento)
+
+    def stats(self) -> dict:
+        return {
+            "em_andamento": self.em_andamento(),
+            "execucoes": self.execucoes,
+            "coalescidas": self.coalescidas,
+        }
+
+    def _finalizar(self, chave: str, tarefa: asyncio.Task) -> None:
+        if self._em_andamento.get(chave) is tarefa:
+            del self._em_andamento[chave]
+        if not tarefa.cancelled():
+            # consome a exceção para não gerar aviso quando nenhum chamador restou
+            tarefa.exception()
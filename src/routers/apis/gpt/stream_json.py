@@ -0,0 +1,264 @@
+import json
+from dataclasses import dataclass
+from typing import Any
+
+
+class ExtratorItensJSON:
+    """Lê um JSON em pedaços e devolve cada item de uma lista da raiz assim que ele fecha.
+
+    Ex.: com `campo_lista="treinos"`, cada objeto de `{"treinos": [{...}, {...}]}` é
+    retornado por `feed` no momento em que seu `}` chega, sem esperar o restante do texto.
+    Texto fora do objeto raiz (cercas de código, prosa) é ignorado.
+    """
+
+    def __init__(self, campo_lista: str):
+        self.campo_lista = campo_lista
+        self.buffer = ""
+        self._pos = 0
+        # pilha de contêineres abertos: [tipo, chave_atual, eh_lista_alvo]
+        self._pilha: list[list[Any]] = []
+        self._em_string = False
+        self._escape = False
+        self._inicio_string = -1
+        self._esperando_chave = False
+        self._inicio_item = -1
+        self.itens_emitidos = 0
+
+    def feed(self, pedaco: str) -> list[dict]:
+        self.buffer += pedaco
+        itens: list[dict] = []
+        buffer = self.buffer
+
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._em_string = False
+                    if self._pilha and self._pilha[-1][0] == "{" and self._esperando_chave:
+                        try:
+                            self._pilha[-1][1] = json.loads(buffer[self._inicio_string : i + 1])
+                        except json.JSONDecodeError:
+                            self._pilha[-1][1] = None
+                continue
+
+            if not self._pilha and ch != "{":
+                continue
+
+            if ch == '"':
+                self._em_string = True
+                self._inicio_string = i
+            elif ch == "{":
+                if self._lista_alvo_no_topo():
+                    self._inicio_item = i
+                self._pilha.append(["{", None, False])
+                self._esperando_chave = True
+            elif ch == "[":
+                eh_alvo = (
+                    len(self._pilha) == 1
+                    and self._pilha[0][0] == "{"
+                    and self._pilha[0][1] == self.campo_lista
+                )
+                self._pilha.append(["[", None, eh_alvo])
+            elif ch in "}]":
+                if not self._pilha:
+                    continue
+                self._pilha.pop()
+                if ch == "}" and self._inicio_item != -1 and self._lista_alvo_no_topo():
+                    try:
+                        item = json.loads(buffer[self._inicio_item : i + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        itens.append(item)
+                        self.itens_emitidos += 1
+                    self._inicio_item = -1
+                self._esperando_chave = False
+            elif ch == ":":
+                self._esperando_chave = False
+            elif ch == ",":
+                self._esperando_chave = bool(self._pilha) and self._pilha[-1][0] == "{"
+
+        self._pos = len(buffer)
+        return itens
+
+    def _lista_alvo_no_topo(self) -> bool:
+        return bool(self._pilha) and self._pilha[-1][0] == "[" and self._pilha[-1][2]
+
+
+@dataclass
+class RelatorioReparo:
+    """O que foi corrigido para transformar a saída do modelo em JSON válido."""
+
+    caracteres_ignorados_inicio: int = 0
+    caracteres_ignorados_fim: int = 0
+    virgulas_removidas: int = 0
+    fechamentos_corrigidos: int = 0
+    string_fechada: bool = False
+    estruturas_fechadas: int = 0
+    caracteres_descartados: int = 0
+
+    @property
+    def reparado(self) -> bool:
+        return any(
+            (
+                self.virgulas_removidas,
+                self.fechamentos_corrigidos,
+                self.string_fechada,
+                self.estruturas_fechadas,
+                self.caracteres_descartados,
+            )
+        )
+
+    @property
+    def truncado(self) -> bool:
+        return self.estruturas_fechadas > 0
+
+
+class ParserJSONTolerante:
+    """
+    Parser incremental que recupera JSON malformado gerado pelo modelo.
+
+    Ignora cercas de código e prosa antes/depois do objeto raiz, remove vírgulas
+    finais e repetidas, corrige fechamentos trocados (`]` para `{`) e, se o texto terminar no meio (corte por limite de tokens), fecha as
+    estruturas abertas a partir do último ponto em que o conteúdo estava completo.
+    Com `profundidade_corte`, o corte só acontece entre elementos até essa
+    profundidade: com 2, um treino/refeição incompleto é descartado inteiro em vez
+    de ser mantido pela metade.
+    """
+
+    def __init__(self, profundidade_corte: int | None = None):
+        self.profundidade_corte = profundidade_corte
+        self.relatorio = RelatorioReparo()
+        self._saida: list[str] = []
+        self._pilha: list[str] = []
+        self._em_string = False
+        self._escape = False
+        self._virgula_pendente = False
+        self._concluido = False
+        # (tamanho da saída, pilha) em pontos onde todo o conteúdo emitido está completo
+        self._pontos_corte: list[tuple[int, str]] = []
+
+    def feed(self, pedaco: str) -> None:
+        saida = self._saida
+        pilha = self._pilha
+        relatorio = self.relatorio
+
+        for indice, ch in enumerate(pedaco):
+            if self._concluido:
+                relatorio.caracteres_ignorados_fim += len(pedaco) - indice
+                return
+
+            if self._em_string:
+                saida.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._em_string = False
+                continue
+
+            if not pilha:
+                if ch != "{":
+                    relatorio.caracteres_ignorados_inicio += 1
+                    continue
+
+            if ch in " \t\r\n":
+                continue
+
+            if ch == ",":
+                if self._virgula_pendente:
+                    relatorio.virgulas_removidas += 1
+                else:
+                    self._registrar_ponto_corte()
+                self._virgula_pendente = True
+                continue
+
+            if self._virgula_pendente:
+                self._virgula_pendente = False
+                if ch in "}]":
+                    relatorio.virgulas_removidas += 1
+                else:
+                    saida.append(",")
+
+            if ch in "{[":
+                pilha.append(ch)
+                saida.append(ch)
+                self._registrar_ponto_corte()
+            elif ch in "}]":
+                if not pilha:
+                    continue
+                fechamento = "}" if pilha.pop() == "{" else "]"
+                if ch != fechamento:
+                    relatorio.fechamentos_corrigidos += 1
+                saida.append(fechamento)
+                if not pilha:
+                    self._concluido = True
+                else:
+                    self._registrar_ponto_corte()
+            else:
+                if ch == '"':
+                    self._em_string = True
+                saida.append(ch)
+
+    def finalizar(self) -> tuple[Any, RelatorioReparo]:
+        """Retorna o maior prefixo válido do JSON e o relatório de reparos."""
+        if not self._saida:
+            raise json.JSONDecodeError("Nenhum objeto JSON encontrado", "", 0)
+
+        texto = "".join(self._saida)
+        if self._concluido:
+            return json.loads(texto, strict=False), self.relatorio
+
+        candidatos: list[tuple[int, str]] = []
+        if self.profundidade_corte is None or len(self._pilha) <= self.profundidade_corte:
+            candidatos.append((len(texto), "".join(self._pilha)))
+        candidatos.extend(reversed(self._pontos_corte))
+
+        ultimo_erro: json.JSONDecodeError | None = None
+        for tamanho, pilha in candidatos:
+            parcial = texto[:tamanho]
+            string_fechada = False
+            if tamanho == len(texto) and self._em_string:
+                parcial = parcial[:-1] if self._escape else parcial
+                parcial += '"'
+                string_fechada = True
+            fechamento = "".join("}" if c == "{" else "]" for c in reversed(pilha))
+            try:
+                valor = json.loads(parcial + fechamento, strict=False)
+            except json.JSONDecodeError as exc:
+                ultimo_erro = exc
+                continue
+            if _sem_conteudo(valor):
+                # só as estruturas fechadas pelo reparo (ex.: "{" -> {}): nada foi recuperado
+                break
+            self.relatorio.string_fechada = string_fechada
+            self.relatorio.estruturas_fechadas = len(pilha)
+            self.relatorio.caracteres_descartados = len(texto) - tamanho
+            return valor, self.relatorio
+
+        raise ultimo_erro or json.JSONDecodeError("JSON irrecuperável", texto, 0)
+
+    def _registrar_ponto_corte(self) -> None:
+        if self.profundidade_corte is None or len(self._pilha) <= self.profundidade_corte:
+            self._pontos_corte.append((len(self._saida), "".join(self._pilha)))
+
+
+def _sem_conteudo(valor: Any) -> bool:
+    """Verdadeiro para objetos/listas que contêm apenas outros objetos/listas vazios."""
+    if isinstance(valor, dict):
+        return all(_sem_conteudo(item) for item in valor.values())
+    if isinstance(valor, list):
+        return all(_sem_conteudo(item) for item in valor)
+    return False
+
+
+def parse_json_tolerante(texto: str, profundidade_corte: int | None = None) -> tuple[Any, RelatorioReparo]:
+    parser = ParserJSONTolerante(profundidade_corte)
+    parser.feed(texto)
+    return parser.finalizar()
@@ -0,0 +1,153 @@
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Callable
+from functools import lru_cache
+from typing import Any
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# chaves longas do plano -> chaves curtas usadas ao reenviar o plano no prompt
+MAPA_CHAVES_TREINO = {
+    "programaTreino": "pt",
+    "nomePrograma": "np",
+    "descricaoPrograma": "dp",
+    "treinos": "t",
+    "nome": "n",
+    "descricao": "d",
+    "idUsuario": "u",
+    "duracaoMinutos": "dm",
+    "dificuldade": "df",
+    "exercicios": "e",
+    "nomeExercicio": "ne",
+    "equipamento": "eq",
+    "grupoMuscular": "g",
+    "idExercicio": "ie",
+    "series": "s",
+    "repeticoes": "r",
+    "descansoSegundos": "ds",
+}
+
+MAPA_CHAVES_DIETA = {
+    "nome": "n",
+    "descricao": "d",
+    "usuario": "u",
+    "refeicoes": "rf",
+    "calorias": "c",
+    "alimentos": "a",
+    "tipoRefeicao": "tr",
+}
+
+# campos removidos a cada nível de resumo quando o plano não cabe no orçamento
+NIVEIS_RESUMO_TREINO = [
+    set(),
+    {"descricao", "descricaoPrograma", "idExercicio", "idUsuario"},
+    {"descricao", "descricaoPrograma", "idExercicio", "idUsuario", "equipamento", "descansoSegundos"},
+    {"descricao", "descricaoPrograma", "idExercicio", "idUsuario", "exercicios"},
+]
+
+NIVEIS_RESUMO_DIETA = [
+    set(),
+    {"descricao", "usuario"},
+    {"descricao", "usuario", "alimentos"},
+]
+
+# totais acumulados de tokens por endpoint, a partir do `usage` retornado pela API
+uso_tokens: dict[str, dict[str, int]] = defaultdict(lambda: {"chamadas": 0, "prompt": 0, "completion": 0})
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # importado só na primeira contagem, para não pesar na inicialização
+    try:
+        import tiktoken
+    except ImportError:  # contagem aproximada quando o tokenizer não está instalado
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # o arquivo do encoding é baixado no primeiro uso; sem rede, segue com a aproximação
+        logger.warning("Encoding o200k_base indisponível; usando contagem aproximada de tokens", exc_info=True)
+        return None
+
+
+@lru_cache(maxsize=256)
+def contar_tokens(texto: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(texto) + 3) // 4
+    return len(encoding.encode(texto))
+
+
+def _renomear_chaves(valor: Any, mapa: dict[str, str]) -> Any:
+    if isinstance(valor, dict):
+        return {mapa.get(chave, chave): _renomear_chaves(item, mapa) for chave, item in valor.items()}
+    if isinstance(valor, list):
+        return [_renomear_chaves(item, mapa) for item in valor]
+    return valor
+
+
+def _remover_campos(valor: Any, campos: set[str]) -> Any:
+    if isinstance(valor, dict):
+        return {chave: _remover_campos(item, campos) for chave, item in valor.items() if chave not in campos}
+    if isinstance(valor, list):
+        return [_remover_campos(item, campos) for item in valor]
+    return valor
+
+
+def legenda_chaves(mapa: dict[str, str]) -> str:
+    return ", ".join(f"{curta}={longa}" for longa, curta in mapa.items())
+
+
+def compactar_plano(plano: Any, mapa: dict[str, str]) -> str:
+    """Serializa o plano sem indentação e com as chaves abreviadas de `mapa`."""
+    return json.dumps(_renomear_chaves(plano, mapa), ensure_ascii=False, separators=(",", ":"))
+
+
+def expandir_chaves(plano: Any, mapa: dict[str, str]) -> Any:
+    """Desfaz `compactar_plano` caso o modelo responda com as chaves abreviadas."""
+    inverso = {curta: longa for longa, curta in mapa.items()}
+    return _renomear_chaves(plano, inverso)
+
+
+def compactar_no_orcamento(
+    plano: Any,
+    mapa: dict[str, str],
+    niveis: list[set[str]],
+    renderizar: Callable[[str], str],
+    tokens_maximos: int,
+) -> str:
+    """
+    Serializa o plano de forma compacta, resumindo-o nível a nível (descartando
+    descrições, depois detalhes) até que o prompt completo, montado por
+    `renderizar` com o plano serializado, caiba em `tokens_maximos`.
+    """
+    for nivel, campos in enumerate(niveis):
+        serializado = compactar_plano(_remover_campos(plano, campos), mapa)
+        if contar_tokens(renderizar(serializado)) <= tokens_maximos:
+            if nivel:
+                logger.info("Plano atual resumido (nível %d) para caber no orçamento de tokens", nivel)
+            return serializado
+    raise HTTPException(status_code=413, detail="Plano atual excede o orçamento de tokens do prompt")
+
+
+def registrar_partes_prompt(endpoint: str, partes: dict[str, str]) -> int:
+    """Conta e registra os tokens de cada parte do prompt; retorna o total."""
+    contagem = {parte: contar_tokens(texto) for parte, texto in partes.items()}
+    total = sum(contagem.values())
+    logger.info("prompt endpoint=%s total=%d partes=%s", endpoint, total, contagem)
+    return total
+
+
+def registrar_uso(endpoint: str, usage: Any) -> None:
+    if usage is None:
+        return
+    prompt = getattr(usage, "input_tokens", 0) or 0
+    completion = getattr(usage, "output_tokens", 0) or 0
+    totais = uso_tokens[endpoint]
+    totais["chamadas"] += 1
+    totais["prompt"] += prompt
+    totais["completion"] += completion
+    logger.info("uso endpoint=%s prompt_tokens=%d completion_tokens=%d", endpoint, prompt, completion)
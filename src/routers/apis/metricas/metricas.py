@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.core.metricas import registro_metricas
+
+# exposto fora do prefixo /api, no caminho padrão usado pelo Prometheus
+router_metricas = APIRouter()
+
+
+@router_metricas.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metricas():
+    """
+    Exporta as métricas da aplicação no formato texto do Prometheus.
+    Returns:
+        PlainTextResponse: Latências, contadores de tokens, reparos de JSON e erros por endpoint.
+    """
+    return PlainTextResponse(registro_metricas.exportar(), media_type="text/plain; version=0.0.4")
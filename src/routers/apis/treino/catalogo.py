@@ -0,0 +1,165 @@
+import bisect
+import logging
+import re
+import threading
+
+from fastapi import HTTPException, Query
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from src.routers.router import router
+from src.core.database import engine
+from src.routers.models.consultas import consulta_get, inserir_em_lote
+from src.routers.models.plano_model import ExercicioPlano, GrupoMuscular, normalizar_nome
+
+logger = logging.getLogger(__name__)
+
+# teto de entradas percorridas por busca, para prefixos muito curtos
+MAX_ENTRADAS_BUSCA = 1000
+
+
+class IndicePrefixos:
+    """
+    Índice em memória do catálogo de exercícios para o autocomplete.
+
+    Guarda, em uma lista ordenada, o nome normalizado a partir do início de cada
+    palavra ("supino reto", "reto"), então uma busca por prefixo é um bisect e
+    encontra o termo em qualquer palavra do nome. Também resolve (nome, equipamento)
+    para o id do catálogo ao gravar planos, sem ir ao banco para exercícios conhecidos.
+
+    O índice é por worker: um exercício novo entra só no índice do worker que gravou o
+    plano, e os demais o veem no próximo carregamento (reinício). Para gravar planos
+    isso é seguro, porque quem não acha o exercício no índice recorre ao banco.
+    """
+
+    def __init__(self):
+        self._entradas: list[tuple[str, int]] = []
+        self._exercicios: dict[int, dict] = {}
+        self._nomes: dict[int, str] = {}
+        self._ids: dict[tuple[str, str], int] = {}
+        # leituras no event loop, inclusões a partir das threads do pool (confirmação de planos)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._exercicios)
+
+    def carregar(self, exercicios: list[dict]) -> None:
+        entradas, por_id, nomes, ids = [], {}, {}, {}
+        for exercicio in exercicios:
+            nome = nomes[exercicio["id"]] = normalizar_nome(exercicio["nome"])
+            entradas.extend(self._entradas_exercicio(nome, exercicio["id"]))
+            por_id[exercicio["id"]] = exercicio
+            ids[(nome, normalizar_nome(exercicio["equipamento"]))] = exercicio["id"]
+        entradas.sort()
+        with self._lock:
+            self._entradas, self._exercicios, self._nomes, self._ids = entradas, por_id, nomes, ids
+
+    def adicionar(self, exercicios: list[dict]) -> None:
+        with self._lock:
+            for exercicio in exercicios:
+                if exercicio["id"] in self._exercicios:
+                    continue
+                nome = self._nomes[exercicio["id"]] = normalizar_nome(exercicio["nome"])
+                for entrada in self._entradas_exercicio(nome, exercicio["id"]):
+                    bisect.insort(self._entradas, entrada)
+                self._exercicios[exercicio["id"]] = exercicio
+                self._ids[(nome, normalizar_nome(exercicio["equipamento"]))] = exercicio["id"]
+
+    def id_exercicio(self, nome: str, equipamento: str) -> int | None:
+        with self._lock:
+            return self._ids.get((normalizar_nome(nome), normalizar_nome(equipamento)))
+
+    def buscar(self, termo: str, limite: int, grupo: GrupoMuscular | None = None) -> list[dict]:
+        prefixo = normalizar_nome(termo)
+        if not prefixo:
+            return []
+        encontrados: dict[int, tuple] = {}
+        with self._lock:
+            inicio = bisect.bisect_left(self._entradas, (prefixo,))
+            for chave, id_exercicio in self._entradas[inicio : inicio + MAX_ENTRADAS_BUSCA]:
+                if not chave.startswith(prefixo):
+                    break
+                exercicio = self._exercicios[id_exercicio]
+                if grupo is None or exercicio["grupo_muscular"] == grupo.value:
+                    nome = self._nomes[id_exercicio]
+                    # primeiro os nomes que começam pelo termo, depois os mais curtos
+                    encontrados[id_exercicio] = (not nome.startswith(prefixo), len(nome), nome, exercicio)
+        ordenados = sorted(encontrados.values(), key=lambda item: item[:3])
+        return [dict(item[3]) for item in ordenados[:limite]]
+
+    @staticmethod
+    def _entradas_exercicio(nome: str, id_exercicio: int) -> list[tuple[str, int]]:
+        return [(nome[inicio.start():], id_exercicio) for inicio in re.finditer(r"\w+", nome)]
+
+
+indice_exercicios = IndicePrefixos()
+
+
+def carregar_catalogo() -> None:
+    """Chamado no lifespan, depois das migrações: monta o índice com o catálogo inteiro."""
+    try:
+        with Session(engine) as session:
+            exercicios = consulta_get("SELECT id, nome, equipamento, grupo_muscular FROM TCC.EXERCICIO", session)
+        indice_exercicios.carregar(exercicios)
+        logger.info("Catálogo de exercícios carregado: %d exercícios", len(indice_exercicios))
+    except Exception:
+        logger.exception("Erro ao carregar o catálogo de exercícios; o autocomplete começa vazio")
+
+
+def resolver_exercicios_catalogo(session: Session, exercicios: list[ExercicioPlano]) -> tuple[list[int], list[dict]]:
+    """
+    Retorna o id do catálogo de cada exercício (na mesma ordem) e as linhas do catálogo
+    usadas que ainda não estão no índice. Exercícios novos entram no catálogo na mesma
+    transação do plano; o índice só deve recebê-los depois do commit.
+    """
+    chaves = [(normalizar_nome(e.nome_exercicio), normalizar_nome(e.equipamento)) for e in exercicios]
+    ids = {chave: indice_exercicios.id_exercicio(e.nome_exercicio, e.equipamento) for chave, e in zip(chaves, exercicios)}
+
+    novos: dict[tuple[str, str], ExercicioPlano] = {}
+    for chave, exercicio in zip(chaves, exercicios):
+        if ids[chave] is None:
+            # repetido no plano: vale a grafia (e o grupo) da primeira ocorrência
+            novos.setdefault(chave, exercicio)
+    catalogo_novo = []
+    if novos:
+        # INSERT IGNORE: o mesmo exercício pode ter sido gravado por outro worker ou ter
+        # grafia equivalente pela collation (caixa, acentos) a um já existente
+        inserir_em_lote(session, "TCC.EXERCICIO", [
+            {
+                "nome": " ".join(e.nome_exercicio.split()),
+                "equipamento": " ".join(e.equipamento.split()),
+                "grupo_muscular": e.grupo_muscular.value,
+            }
+            for e in novos.values()
+        ], ignorar_duplicados=True)
+        select_catalogo = text(
+            "SELECT id, nome, equipamento, grupo_muscular FROM TCC.EXERCICIO WHERE nome IN :nomes"
+        ).bindparams(bindparam("nomes", expanding=True))
+        nomes = sorted({" ".join(e.nome_exercicio.split()) for e in novos.values()})
+        for linha in consulta_get(select_catalogo, session, {"nomes": nomes}):
+            chave = (normalizar_nome(linha["nome"]), normalizar_nome(linha["equipamento"]))
+            if chave in novos and ids[chave] is None:
+                ids[chave] = linha["id"]
+                catalogo_novo.append(linha)
+
+    if any(id_exercicio is None for id_exercicio in ids.values()):
+        raise HTTPException(status_code=500, detail="Falha ao registrar exercício no catálogo")
+    return [ids[chave] for chave in chaves], catalogo_novo
+
+
+@router.get("/exercicios/search")
+async def buscar_exercicios(
+    q: str = Query(..., min_length=1, description="Início de qualquer palavra do nome do exercício"),
+    grupo: GrupoMuscular | None = Query(None, description="Filtra por grupo muscular"),
+    limite: int = Query(10, ge=1, le=50),
+):
+    """Autocomplete de exercícios do catálogo, servido pelo índice em memória.
+
+    Args:
+        q (str): Termo digitado; casa com o início de qualquer palavra, sem diferenciar acentos e caixa.
+        grupo (GrupoMuscular | None): Grupo muscular dos exercícios retornados.
+        limite (int): Quantidade máxima de sugestões.
+    Returns:
+        list: Exercícios (id, nome, equipamento, grupo_muscular), os que começam pelo termo primeiro.
+    """
+    return indice_exercicios.buscar(q, limite, grupo)
@@ -1,23 +1,106 @@
-from fastapi import Depends, HTTPException, Query
+import hashlib
+import json
+from datetime import datetime
+
+from fastapi import Depends, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text, bindparam
 from pydantic import BaseModel, Field
 
 from src.routers.router import router
-from src.core.database import get_db_mysql
-from src.routers.models.consultas import consulta_get
+from src.core.database import get_db_leitura, sett
+from src.routers.models.consultas import consulta_get_async, decodificar_cursor, pagina_keyset
+from src.routers.models.cache_leitura import consulta_get_cache
+
+
+# ids por consulta em /exercicios/lote (listas em IN muito longas pesam no parse e no plano)
+TAMANHO_LOTE_IDS = 500
+# teto de ids por requisição, contando os repetidos (validado antes de remover duplicados)
+MAX_IDS_CATALOGO = 5000
+
+
+# página de /programas; `filtro_cursor` vem de `filtro_cursor_programas`
+QUERY_PROGRAMAS = """
+    SELECT
+        pt.id_programa_treino,
+        pt.id_usu,
+        pt.nome,
+        pt.descricao,
+        pt.created_at,
+        pt.updated_at
+    FROM TCC.PROGRAMA_TREINO pt
+    WHERE pt.id_usu = :user_id {filtro_cursor}
+    ORDER BY pt.created_at DESC, pt.id_programa_treino DESC
+    LIMIT :limite
+"""
 
 
 class ExerciseCatalogRequest(BaseModel):
-    exercicios_ids: list[int] = Field(default_factory=list, alias="exerciciosIds")
+    exercicios_ids: list[int] = Field(default_factory=list, alias="exerciciosIds", max_length=MAX_IDS_CATALOGO)
+
+
+# campos que podem ser pedidos em /programas/arvore, por nível (o id de cada nível sempre volta)
+CAMPOS_PROGRAMA = ("id_programa_treino", "nome", "descricao", "created_at", "updated_at")
+CAMPOS_TREINO = ("id", "nome", "descricao", "duracao", "dificuldade", "qtd_exercicios")
+# exercícios: campo -> coluna (nome, grupo e equipamento vêm do catálogo TCC.EXERCICIO)
+CAMPOS_EXERCICIO = {
+    "id_ex_treino": "et.id_ex_treino",
+    "id_exercicio": "et.id_exercicio",
+    "nome_exercicio": "e.nome",
+    "grupo_muscular": "e.grupo_muscular",
+    "equipamento": "e.equipamento",
+    "descanso": "et.descanso",
+    "series": "et.series",
+    "reps": "et.reps",
+}
+
+
+def filtro_cursor_programas(cursor: str | None, params: dict) -> str:
+    """
+    Keyset de /programas em (created_at, id_programa_treino), do mais recente ao mais
+    antigo; o id desempata programas criados no mesmo segundo. Preenche `params` e
+    retorna o trecho do WHERE (vazio na primeira página).
+    """
+    ultimo = decodificar_cursor(cursor, 2)
+    if not ultimo:
+        return ""
+    try:
+        params["ultimo_criado"] = datetime.fromisoformat(ultimo[0])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+    params["ultimo_id"] = ultimo[1]
+    return "AND (pt.created_at, pt.id_programa_treino) < (:ultimo_criado, :ultimo_id)"
+
+
+def selecionar_campos(campos: str | None) -> tuple[list[str], list[str], list[str]]:
+    """
+    Interpreta `campos` (ex.: "nome,treinos.nome,treinos.exercicios.nome_exercicio").
+    Um nível sem nenhum campo pedido volta completo.
+    """
+    niveis = {"": [], "treinos.": [], "treinos.exercicios.": []}
+    permitidos = {"": CAMPOS_PROGRAMA, "treinos.": CAMPOS_TREINO, "treinos.exercicios.": CAMPOS_EXERCICIO}
+    for campo in filter(None, (c.strip() for c in (campos or "").split(","))):
+        prefixo, _, nome = campo.rpartition(".")
+        prefixo = f"{prefixo}." if prefixo else ""
+        if prefixo not in niveis or nome not in permitidos[prefixo]:
+            raise HTTPException(status_code=400, detail=f"Campo desconhecido: {campo}")
+        if nome not in niveis[prefixo]:
+            niveis[prefixo].append(nome)
+    return tuple(niveis[prefixo] or list(permitidos[prefixo]) for prefixo in niveis)
+
+
+def _etags(if_none_match: str | None) -> set[str]:
+    return {etag.strip().removeprefix("W/") for etag in (if_none_match or "").split(",") if etag.strip()}
 
 
 
 @router.get("/exercicios-treinos")
-def listar_ex(
+async def listar_ex(
     user_id: int,
     id_treino: int,
-    session: Session = Depends(get_db_mysql)
+    session: AsyncSession | Session = Depends(get_db_leitura)
 ):
     """Retorna os exercícios associados a um treino específico.
     
@@ -30,50 +113,83 @@ def listar_ex(
     """
 
     query = """
-   SELECT et.id_ex_treino, et.nome_exercicio, et.grupo_muscular, et.equipamento, et.descanso, et.series, et.reps  FROM TCC.TREINO t
+   SELECT et.id_ex_treino, et.id_exercicio, e.nome AS nome_exercicio, e.grupo_muscular, e.equipamento, et.descanso, et.series, et.reps  FROM TCC.TREINO t
 LEFT JOIN TCC.EXERCICIO_TREINO et ON t.ID = et.id_treino
+JOIN TCC.EXERCICIO e ON e.id = et.id_exercicio
 where et.id_treino = :id_treino;
 """
 
-    exercicios = consulta_get(query, session, {"id_treino": id_treino})
+    exercicios = await consulta_get_cache("exercicios_treino", id_treino, query, session, {"id_treino": id_treino})
     return exercicios
 
 
+@router.post("/exercicios/lote")
+async def listar_exercicios_lote(
+    payload: ExerciseCatalogRequest,
+    session: AsyncSession | Session = Depends(get_db_leitura)
+):
+    """Retorna os exercícios (EXERCICIO_TREINO) pedidos, na ordem dos ids enviados.
+
+    Ids repetidos são considerados uma vez e ids inexistentes são ignorados. Listas com
+    mais de `MAX_IDS_CATALOGO` ids são recusadas com 422 na validação do corpo. A busca
+    usa uma consulta com lista em IN por lote de até `TAMANHO_LOTE_IDS` ids.
+
+    Args:
+        payload (ExerciseCatalogRequest): Lista `exerciciosIds`.
+        session (Session): Sessão do banco de dados.
+    Returns:
+        list: Exercícios encontrados, na ordem da requisição.
+    """
+    ids = list(dict.fromkeys(payload.exercicios_ids))
+
+    query = text("""
+        SELECT et.id_ex_treino, et.id_exercicio, e.nome AS nome_exercicio, e.grupo_muscular, e.equipamento,
+               et.descanso, et.series, et.reps, et.id_treino
+        FROM TCC.EXERCICIO_TREINO et
+        JOIN TCC.EXERCICIO e ON e.id = et.id_exercicio
+        WHERE et.id_ex_treino IN :ids
+    """).bindparams(bindparam("ids", expanding=True))
+
+    encontrados = {}
+    for inicio in range(0, len(ids), TAMANHO_LOTE_IDS):
+        lote = ids[inicio : inicio + TAMANHO_LOTE_IDS]
+        for exercicio in await consulta_get_async(query, session, {"ids": lote}):
+            encontrados[exercicio["id_ex_treino"]] = exercicio
+    return [encontrados[id_ex] for id_ex in ids if id_ex in encontrados]
+
+
 @router.get("/programas")
-def listar_programas_treino(
+async def listar_programas_treino(
+    response: Response,
     user_id: int = Query(..., alias="userId", description="ID do usuário"),
-    session: Session = Depends(get_db_mysql)
+    cursor: str | None = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limite: int = Query(sett.PAGINACAO_LIMITE_PADRAO, ge=1, le=sett.PAGINACAO_LIMITE_MAXIMO),
+    session: AsyncSession | Session = Depends(get_db_leitura)
 ):
-    """Retorna os programas de treino associados a um usuário.
+    """Retorna os programas de treino associados a um usuário, do mais recente ao mais antigo.
     
     Args:
         user_id (int): ID do usuário.
+        cursor (str | None): Cursor recebido no cabeçalho `X-Next-Cursor` da página anterior.
+        limite (int): Quantidade máxima de programas na página.
         session (Session): Sessão do banco de dados.
     Returns:
         dict: Dicionário contendo a lista de programas de treino do usuário.
     """
-    query = """
-        SELECT 
-            pt.id_programa_treino,
-            pt.id_usu,
-            pt.nome,
-            pt.descricao,
-            pt.created_at,
-            pt.updated_at
-        FROM TCC.PROGRAMA_TREINO pt
-        WHERE pt.id_usu = :user_id
-        ORDER BY pt.created_at DESC
-    """
+    params = {"user_id": user_id, "limite": limite + 1}
+    filtro_cursor = filtro_cursor_programas(cursor, params)
+
+    query = QUERY_PROGRAMAS.format(filtro_cursor=filtro_cursor)
 
-    programas = consulta_get(query, session, {"user_id": user_id})
-    return programas
+    programas = await consulta_get_cache("programas", user_id, query, session, params)
+    return pagina_keyset(programas, limite, ("created_at", "id_programa_treino"), response)
 
 
 @router.get("/treinos-programa")
-def listar_treinos_programas(
+async def listar_treinos_programas(
     user_id: int,
     id_programa: int,
-    session: Session = Depends(get_db_mysql)
+    session: AsyncSession | Session = Depends(get_db_leitura)
 ):
     
     """Retorna os treinos associados a um programa de treino específico.
@@ -91,5 +207,102 @@ LEFT JOIN TCC.TREINO t ON t.id_programa_treino = pt.id_programa_treino
 where t.id_programa_treino = :id_programa;
 """
 
-    treinos = consulta_get(query, session, {"id_programa": id_programa})
+    treinos = await consulta_get_cache("treinos_programa", id_programa, query, session, {"id_programa": id_programa})
     return treinos
+
+
+@router.get("/programas/arvore")
+async def arvore_programas(
+    response: Response,
+    user_id: int = Query(..., alias="userId", description="ID do usuário"),
+    campos: str | None = Query(None, description="Campos por nível, ex.: nome,treinos.nome,treinos.exercicios.nome_exercicio"),
+    profundidade: int = Query(2, ge=0, le=2, description="0: só programas, 1: com treinos, 2: com exercícios"),
+    cursor: str | None = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limite: int = Query(sett.PAGINACAO_LIMITE_PADRAO, ge=1, le=sett.PAGINACAO_LIMITE_MAXIMO),
+    if_none_match: str | None = Header(None),
+    session: AsyncSession | Session = Depends(get_db_leitura)
+):
+    """Retorna os programas do usuário com os treinos e exercícios aninhados.
+
+    Substitui a sequência /programas → /treinos-programa → /exercicios-treinos: são no
+    máximo três consultas (uma por nível, com listas em IN), montadas em uma passada.
+    A resposta traz um ETag; com `If-None-Match` igual, volta 304 sem corpo.
+
+    Args:
+        user_id (int): ID do usuário.
+        campos (str | None): Campos a retornar em cada nível; o id de cada nível sempre volta.
+        profundidade (int): Até qual nível aninhar.
+        cursor (str | None): Cursor recebido no cabeçalho `X-Next-Cursor` da página anterior (mesmo de /programas).
+        limite (int): Quantidade máxima de programas na página.
+        session (Session): Sessão do banco de dados.
+    Returns:
+        list: Programas de treino, cada um com `treinos` e, dentro deles, `exercicios`.
+    """
+    campos_programa, campos_treino, campos_exercicio = selecionar_campos(campos)
+
+    params = {"user_id": user_id, "limite": limite + 1}
+    filtro_cursor = filtro_cursor_programas(cursor, params)
+    # created_at e id entram sempre: são a chave do cursor
+    colunas = dict.fromkeys(["id_programa_treino", "created_at", *campos_programa])
+    query_programas = f"""
+        SELECT {", ".join(f"pt.{coluna}" for coluna in colunas)}
+        FROM TCC.PROGRAMA_TREINO pt
+        WHERE pt.id_usu = :user_id {filtro_cursor}
+        ORDER BY pt.created_at DESC, pt.id_programa_treino DESC
+        LIMIT :limite
+    """
+    programas = await consulta_get_cache("arvore_programas", user_id, query_programas, session, params)
+    programas = pagina_keyset(programas, limite, ("created_at", "id_programa_treino"), response)
+
+    arvore = []
+    treinos_por_programa: dict[int, list] = {}
+    for programa in programas:
+        no = {"id_programa_treino": programa["id_programa_treino"], **{c: programa[c] for c in campos_programa}}
+        if profundidade >= 1:
+            no["treinos"] = treinos_por_programa[programa["id_programa_treino"]] = []
+        arvore.append(no)
+
+    exercicios_por_treino: dict[int, list] = {}
+    if treinos_por_programa:
+        colunas = dict.fromkeys(["id", "id_programa_treino", *campos_treino])
+        query_treinos = text(f"""
+            SELECT {", ".join(f"t.{coluna}" for coluna in colunas)}
+            FROM TCC.TREINO t
+            WHERE t.id_programa_treino IN :ids
+            ORDER BY t.id_programa_treino, t.id
+        """).bindparams(bindparam("ids", expanding=True))
+        treinos = await consulta_get_cache(
+            "arvore_programas", user_id, query_treinos, session, {"ids": list(treinos_por_programa)}
+        )
+        for treino in treinos:
+            no = {"id": treino["id"], **{c: treino[c] for c in campos_treino}}
+            if profundidade >= 2:
+                no["exercicios"] = exercicios_por_treino[treino["id"]] = []
+            treinos_por_programa[treino["id_programa_treino"]].append(no)
+
+    if exercicios_por_treino:
+        colunas = dict.fromkeys(["id_ex_treino", *campos_exercicio])
+        query_exercicios = text(f"""
+            SELECT et.id_treino, {", ".join(f"{CAMPOS_EXERCICIO[campo]} AS {campo}" for campo in colunas)}
+            FROM TCC.EXERCICIO_TREINO et
+            JOIN TCC.EXERCICIO e ON e.id = et.id_exercicio
+            WHERE et.id_treino IN :ids
+            ORDER BY et.id_treino, et.id_ex_treino
+        """).bindparams(bindparam("ids", expanding=True))
+        exercicios = await consulta_get_cache(
+            "arvore_programas", user_id, query_exercicios, session, {"ids": list(exercicios_por_treino)}
+        )
+        for exercicio in exercicios:
+            exercicios_por_treino[exercicio["id_treino"]].append(
+                {"id_ex_treino": exercicio["id_ex_treino"], **{c: exercicio[c] for c in campos_exercicio}}
+            )
+
+    corpo = json.dumps(jsonable_encoder(arvore), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = f'"{hashlib.blake2b(corpo, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if "X-Next-Cursor" in response.headers:
+        headers["X-Next-Cursor"] = response.headers["X-Next-Cursor"]
+    etags_cliente = _etags(if_none_match)
+    if etag in etags_cliente or "*" in etags_cliente:
+        return Response(status_code=304, headers=headers)
+    return Response(content=corpo, media_type="application/json", headers=headers)
@@ -1,72 +1,93 @@
 # ...existing code...
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from pydantic import BaseModel, Field
 from typing import List
 
 from src.routers.router import router
-from src.core.database import get_db_mysql
+from src.core.database import get_db_leitura, get_db_mysql, sett
+from src.routers.models.consultas import consulta_get_async, decodificar_cursor, inserir_em_lote, pagina_keyset
+
+# séries por INSERT ao gravar uma sessão
+TAMANHO_LOTE_SERIES = 200
+
+# página de /sessoes/perfil, a partir do último id_sessao da página anterior
+QUERY_SESSOES_PERFIL = """
+SELECT
+  st.id_sessao,
+  st.duracao_sessao,
+  st.descricao,
+  t.id AS id_treino,
+  t.nome AS treino_nome,
+  t.qtd_exercicios
+FROM TCC.SESSAO_TREINO st
+JOIN TCC.TREINO t ON st.id_treino = t.id
+WHERE t.id_usuario = :id_usuario AND st.id_sessao > :ultimo_id
+ORDER BY st.id_sessao
+LIMIT :limite;
+"""
+
+# séries de /sessoes/exercicios; a ordenação usa as colunas de SERIES (iguais às do JOIN)
+# para sair do índice (id_sessao, id_ex_treino, numero_serie) sem ordenação extra
+QUERY_EXERCICIOS_SESSAO = """
+SELECT
+  et.id_ex_treino,
+  et.id_exercicio,
+  e.nome AS nome_exercicio,
+  e.equipamento,
+  s.id_serie,
+  s.numero_serie,
+  s.repeticoes,
+  s.carga
+FROM TCC.SERIES s
+JOIN TCC.EXERCICIO_TREINO et ON s.id_ex_treino = et.id_ex_treino
+JOIN TCC.EXERCICIO e ON e.id = et.id_exercicio
+WHERE s.id_sessao = :id_sessao
+ORDER BY s.id_ex_treino, s.numero_serie;
+"""
 
 @router.get("/sessoes/perfil")
-def get_treinos_usuario(id_usuario: int, db: Session = Depends(get_db_mysql)):
+async def get_treinos_usuario(
+    id_usuario: int,
+    response: Response,
+    cursor: str | None = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limite: int = Query(sett.PAGINACAO_LIMITE_PADRAO, ge=1, le=sett.PAGINACAO_LIMITE_MAXIMO),
+    db: AsyncSession | Session = Depends(get_db_leitura),
+):
     """
-    Retorna as sessões de treino do usuário com:
+    Retorna as sessões de treino do usuário, paginadas por `id_sessao`, com:
     - id_sessao
     - duracao_sessao
     - descricao (da sessão)
     - id_treino
     - treino_nome
     - qtd_exercicios (quantos exercícios estão associados ao treino naquela sessão)
+    Se houver mais sessões, o cabeçalho `X-Next-Cursor` traz o cursor da próxima página.
     """
-    query = """
-    SELECT
-      st.id_sessao,
-      st.duracao_sessao,
-      st.descricao,
-      t.id AS id_treino,
-      t.nome AS treino_nome,
-      COUNT(DISTINCT et.id_ex_treino) AS qtd_exercicios
-    FROM TCC.SESSAO_TREINO st
-    JOIN TCC.TREINO t ON st.id_treino = t.id
-    LEFT JOIN TCC.EXERCICIO_TREINO et ON et.id_treino = t.id
-    WHERE t.id_usuario = :id_usuario
-    GROUP BY st.id_sessao, st.duracao_sessao, st.descricao, t.id, t.nome
-    ORDER BY st.id_sessao;
-    """
+    ultimo = decodificar_cursor(cursor, 1)
+    params = {"id_usuario": id_usuario, "ultimo_id": ultimo[0] if ultimo else 0, "limite": limite + 1}
     try:
-        rows = db.execute(text(query), {"id_usuario": id_usuario}).mappings().all()
-        return [dict(r) for r in rows]
+        linhas = await consulta_get_async(QUERY_SESSOES_PERFIL, db, params)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar sessões: {exc}")
+    return pagina_keyset(linhas, limite, ("id_sessao",), response)
 
 # ...existing code...
 @router.get("/sessoes/exercicios")
-def get_exercicios_por_sessao(id_sessao: int, db: Session = Depends(get_db_mysql)):
+async def get_exercicios_por_sessao(id_sessao: int, db: AsyncSession | Session = Depends(get_db_leitura)):
     """
     Retorna todos os exercícios realizados em uma sessão específica,
     incluindo as séries com repetições e cargas:
     - id_ex_treino
     - nome_exercicio
     - equipamento (opcional)
+    - id_exercicio (catálogo)
     - series: [{id_serie, numero_serie, repeticoes, carga}, ...]
     """
-    query = """
-    SELECT
-      et.id_ex_treino,
-      et.nome_exercicio,
-      et.equipamento,
-      s.id_serie,
-      s.numero_serie,
-      s.repeticoes,
-      s.carga
-    FROM TCC.SERIES s
-    JOIN TCC.EXERCICIO_TREINO et ON s.id_ex_treino = et.id_ex_treino
-    WHERE s.id_sessao = :id_sessao
-    ORDER BY et.id_ex_treino, s.numero_serie;
-    """
     try:
-        rows = db.execute(text(query), {"id_sessao": id_sessao}).mappings().all()
+        rows = await consulta_get_async(QUERY_EXERCICIOS_SESSAO, db, {"id_sessao": id_sessao})
         # agrupa por exercício para retornar estrutura aninhada
         exercicios = {}
         for r in rows:
@@ -74,6 +95,7 @@ def get_exercicios_por_sessao(id_sessao: int, db: Session = Depends(get_db_mysql
             if ex_id not in exercicios:
                 exercicios[ex_id] = {
                     "id_ex_treino": ex_id,
+                    "id_exercicio": r.get("id_exercicio"),
                     "nome_exercicio": r.get("nome_exercicio"),
                     "equipamento": r.get("equipamento"),
                     "series": []
@@ -124,47 +146,46 @@ def criar_sessao_treino(payload: SessaoInsert, db: Session = Depends(get_db_mysq
         INSERT INTO TCC.SESSAO_TREINO (duracao_sessao, descricao, id_treino)
         VALUES (:duracao, :descricao, :id_treino)
     """)
-    insert_serie_q = text("""
-        INSERT INTO TCC.SERIES (numero_serie, repeticoes, carga, id_ex_treino, id_sessao)
-        VALUES (:numero_serie, :repeticoes, :carga, :id_ex_treino, :id_sessao)
+    select_series_q = text("""
+        SELECT id_serie FROM TCC.SERIES WHERE id_sessao = :id_sessao ORDER BY id_serie
     """)
     try:
-        # validações básicas
+        # validações básicas, antes de qualquer escrita
         if not payload.exercicios:
             raise HTTPException(status_code=400, detail="Lista de exercícios vazia.")
+        for exerc in payload.exercicios:
+            if len(exerc.repeticoes) != len(exerc.cargas):
+                raise HTTPException(status_code=400, detail=f"Listas de repetições e cargas com tamanhos diferentes para exercício {exerc.id_exercicio}.")
 
-        # inserir sessão
-        db.execute(insert_sessao_q, {
+        # inserir sessão; o id gerado vem do próprio resultado do INSERT
+        id_sessao = db.execute(insert_sessao_q, {
             "duracao": payload.duracao,
             "descricao": payload.descricao,
             "id_treino": payload.id_treino
-        })
-        # obter id gerado da sessão
-        id_sessao = db.execute(text("SELECT LAST_INSERT_ID()")).scalar()
+        }).lastrowid
         if not id_sessao:
             raise HTTPException(status_code=500, detail="Não conseguiu recuperar id da sessão inserida.")
 
-        series_inseridas = []
-        for exerc in payload.exercicios:
-            if len(exerc.repeticoes) != len(exerc.cargas):
-                raise HTTPException(status_code=400, detail=f"Listas de repetições e cargas com tamanhos diferentes para exercício {exerc.id_exercicio}.")
+        series_inseridas = [
+            {
+                "id_sessao": id_sessao,
+                "id_ex_treino": exerc.id_exercicio,
+                "numero_serie": idx,
+                "repeticoes": rep,
+                "carga": carga
+            }
+            for exerc in payload.exercicios
+            for idx, (rep, carga) in enumerate(zip(exerc.repeticoes, exerc.cargas), start=1)
+        ]
+        # todas as séries em INSERTs de várias linhas (em lotes, para sessões muito grandes)
+        inserir_em_lote(db, "TCC.SERIES", series_inseridas, tamanho_lote=TAMANHO_LOTE_SERIES)
 
-            for idx, (rep, carga) in enumerate(zip(exerc.repeticoes, exerc.cargas), start=1):
-                db.execute(insert_serie_q, {
-                    "numero_serie": idx,
-                    "repeticoes": rep,
-                    "carga": carga,
-                    "id_ex_treino": exerc.id_exercicio,
-                    "id_sessao": id_sessao
-                })
-                # montar registro retornado (id_serie não obtido aqui; pode ser recuperado se necessário)
-                series_inseridas.append({
-                    "id_sessao": id_sessao,
-                    "id_ex_treino": exerc.id_exercicio,
-                    "numero_serie": idx,
-                    "repeticoes": rep,
-                    "carga": carga
-                })
+        # os ids são gerados em ordem crescente, na ordem das linhas inseridas
+        ids_series = db.execute(select_series_q, {"id_sessao": id_sessao}).scalars().all()
+        if len(ids_series) != len(series_inseridas):
+            raise HTTPException(status_code=500, detail="Falha ao inserir séries da sessão.")
+        for serie, id_serie in zip(series_inseridas, ids_series):
+            serie["id_serie"] = id_serie
 
         db.commit()
         return {"id_sessao": id_sessao, "series": series_inseridas}
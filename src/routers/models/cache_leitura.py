@@ -0,0 +1,190 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import TextClause
+
+from src.core.database import sett
+from src.core.metricas import registro_metricas
+from src.routers.models.consultas import consulta_get_async
+
+# idade (segundos) das respostas servidas pelo cache, até o TTL padrão
+BUCKETS_IDADE = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class BackendCacheLeitura(ABC):
+    """
+    Armazenamento do cache de leitura. As entradas pertencem a um grupo
+    (`recurso:id`), que é a unidade de invalidação; cada grupo tem uma geração
+    que avança a cada invalidação, e `set` só grava se a geração lida antes da
+    consulta ainda for a atual (assim uma leitura que começou antes de um commit
+    não guarda o resultado antigo depois da invalidação).
+
+    A implementação padrão é em memória, por processo: a invalidação só alcança o
+    worker que fez a escrita, então ela exige um único worker (por isso o cache
+    vem desligado). Com vários workers, um backend compartilhado (ex.: Redis)
+    implementa esta mesma interface.
+    """
+
+    @abstractmethod
+    def get(self, chave: str) -> tuple[float, list[dict]] | None: ...
+
+    @abstractmethod
+    def set(self, chave: str, grupo: str, linhas: list[dict], geracao: int) -> bool: ...
+
+    @abstractmethod
+    def geracao(self, grupo: str) -> int: ...
+
+    @abstractmethod
+    def invalidar(self, grupos: list[str]) -> int: ...
+
+    @abstractmethod
+    def stats(self) -> dict: ...
+
+
+class CacheLRULeitura(BackendCacheLeitura):
+    """LRU em memória com TTL; as linhas são copiadas na saída para que o valor guardado não mude."""
+
+    def __init__(self, max_itens: int, ttl_segundos: int):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._itens: OrderedDict[str, tuple[float, str, tuple[dict, ...]]] = OrderedDict()
+        self._chaves_grupo: dict[str, set[str]] = defaultdict(set)
+        self._geracoes: dict[str, int] = defaultdict(int)
+        # as escritas invalidam a partir das threads do pool; as leituras rodam no event loop
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirados = 0
+        self.invalidados = 0
+        self.descartados = 0
+
+    def get(self, chave: str) -> tuple[float, list[dict]] | None:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                criado_em, _, linhas = item
+                if time.time() - criado_em <= self.ttl_segundos:
+                    self._itens.move_to_end(chave)
+                    self.hits += 1
+                    return criado_em, [dict(linha) for linha in linhas]
+                self._remover(chave)
+                self.expirados += 1
+            self.misses += 1
+            return None
+
+    def set(self, chave: str, grupo: str, linhas: list[dict], geracao: int) -> bool:
+        with self._lock:
+            if self._geracoes.get(grupo, 0) != geracao:
+                self.descartados += 1
+                return False
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (time.time(), grupo, tuple(dict(linha) for linha in linhas))
+            self._chaves_grupo[grupo].add(chave)
+            while len(self._itens) > self.max_itens:
+                self._remover(next(iter(self._itens)))
+                self.evictions += 1
+            return True
+
+    def geracao(self, grupo: str) -> int:
+        with self._lock:
+            return self._geracoes.get(grupo, 0)
+
+    def invalidar(self, grupos: list[str]) -> int:
+        removidos = 0
+        with self._lock:
+            for grupo in grupos:
+                self._geracoes[grupo] += 1
+                for chave in self._chaves_grupo.pop(grupo, ()):
+                    self._itens.pop(chave, None)
+                    removidos += 1
+            self.invalidados += removidos
+        return removidos
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "itens": len(self._itens),
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / consultas if consultas else 0.0,
+                "evictions": self.evictions,
+                "expirados": self.expirados,
+                "invalidados": self.invalidados,
+                "descartados": self.descartados,
+            }
+
+    def _remover(self, chave: str) -> None:
+        _, grupo, _ = self._itens.pop(chave)
+        chaves = self._chaves_grupo.get(grupo)
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._chaves_grupo[grupo]
+
+
+cache_leitura: BackendCacheLeitura = CacheLRULeitura(
+    max_itens=sett.CACHE_LEITURA_MAX_ITENS,
+    ttl_segundos=sett.CACHE_LEITURA_TTL_SEGUNDOS,
+)
+
+consultas_cache = registro_metricas.contador(
+    "cache_leitura_consultas_total", "Leituras dos endpoints de listagem por recurso e resultado (hit, miss)",
+    ("recurso", "resultado"),
+)
+idade_cache = registro_metricas.histograma(
+    "cache_leitura_idade_segundos", "Idade das respostas servidas pelo cache de leitura", ("recurso",), BUCKETS_IDADE
+)
+registro_metricas.coletor(
+    "cache_leitura",
+    "Estatísticas do cache de leitura de treinos e dietas",
+    lambda: [({"estatistica": nome}, valor) for nome, valor in cache_leitura.stats().items()],
+)
+
+
+def grupo_cache(recurso: str, id_dono: int) -> str:
+    return f"{recurso}:{id_dono}"
+
+
+async def consulta_get_cache(
+    recurso: str,
+    id_dono: int,
+    query: str | TextClause,
+    session: AsyncSession | Session,
+    params: dict,
+) -> list[dict]:
+    """
+    `consulta_get_async` com cache read-through. `id_dono` é o dono dos dados
+    (usuário, programa, treino ou dieta) e forma o grupo invalidado pelas escritas;
+    a própria consulta e os parâmetros (cursor, limite...) completam a chave.
+    """
+    if not sett.CACHE_LEITURA_ATIVO:
+        return await consulta_get_async(query, session, params)
+
+    grupo = grupo_cache(recurso, id_dono)
+    consulta = hashlib.blake2b(str(query).encode("utf-8"), digest_size=8).hexdigest()
+    chave = f"{grupo}:{consulta}:{json.dumps(params, sort_keys=True, default=str)}"
+    item = cache_leitura.get(chave)
+    if item is not None:
+        criado_em, linhas = item
+        consultas_cache.inc(recurso=recurso, resultado="hit")
+        idade_cache.observar(time.time() - criado_em, recurso=recurso)
+        return linhas
+
+    consultas_cache.inc(recurso=recurso, resultado="miss")
+    geracao = cache_leitura.geracao(grupo)
+    linhas = await consulta_get_async(query, session, params)
+    cache_leitura.set(chave, grupo, linhas, geracao)
+    return linhas
+
+
+def invalidar_cache_leitura(*grupos: tuple[str, int]) -> None:
+    """Chamado pelas escritas depois do commit, com os grupos `(recurso, id_dono)` que mudaram."""
+    cache_leitura.invalidar([grupo_cache(recurso, id_dono) for recurso, id_dono in grupos])
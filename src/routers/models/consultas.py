@@ -1,11 +1,15 @@
+from datetime import datetime
+from fastapi import HTTPException, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import text
-import pandas as pd
+from sqlalchemy.sql.elements import TextClause
+from starlette.concurrency import run_in_threadpool
 import base64
+import json
 
 
-def consulta_get(query: str, session: Session, params: dict | None = None) -> list[dict]:
-    result = session.execute(text(query), params).mappings().all()
+def _normalizar_linhas(result) -> list[dict]:
     return [
             {
                 key.lower() : value.rstrip() if isinstance(value, str) else value
@@ -14,6 +18,24 @@ def consulta_get(query: str, session: Session, params: dict | None = None) -> li
             for row in result
         ]
 
+
+def _clausula(query: str | TextClause) -> TextClause:
+    # aceita SQL pronto com parâmetros declarados (ex.: bindparam expanding para listas em IN)
+    return text(query) if isinstance(query, str) else query
+
+
+def consulta_get(query: str | TextClause, session: Session, params: dict | None = None) -> list[dict]:
+    result = session.execute(_clausula(query), params).mappings().all()
+    return _normalizar_linhas(result)
+
+
+async def consulta_get_async(query: str | TextClause, session: AsyncSession | Session, params: dict | None = None) -> list[dict]:
+    """Versão assíncrona de `consulta_get`; com sessão síncrona, executa no pool de threads."""
+    if isinstance(session, AsyncSession):
+        result = (await session.execute(_clausula(query), params)).mappings().all()
+        return _normalizar_linhas(result)
+    return await run_in_threadpool(consulta_get, query, session, params)
+
 def serialize_data(value):
     # Trata dados binários (como imagens)
     if isinstance(value, memoryview):
@@ -30,4 +52,59 @@ def consulta_get_img(query: str, session: Session, params: dict | None = None) -
             for key, value in dict(row).items()
         }
         for row in result
-    ]
\ No newline at end of file
+    ]
+
+def inserir_em_lote(
+    session: Session, tabela: str, linhas: list[dict], tamanho_lote: int = 500, ignorar_duplicados: bool = False
+) -> int:
+    """
+    Insere as linhas com INSERTs de várias linhas (uma instrução por lote de até
+    `tamanho_lote`), em vez de uma ida ao banco por linha. Todas as linhas devem
+    ter as mesmas colunas. Com `ignorar_duplicados`, usa INSERT IGNORE (linhas que
+    violam uma chave única ficam de fora). Retorna o total de linhas inseridas.
+    """
+    if not linhas:
+        return 0
+
+    colunas = list(linhas[0])
+    comando = "INSERT IGNORE" if ignorar_duplicados else "INSERT"
+    inseridas = 0
+    for inicio in range(0, len(linhas), tamanho_lote):
+        lote = linhas[inicio : inicio + tamanho_lote]
+        valores = ", ".join(
+            "(" + ", ".join(f":{coluna}_{i}" for coluna in colunas) + ")" for i in range(len(lote))
+        )
+        params = {f"{coluna}_{i}": linha[coluna] for i, linha in enumerate(lote) for coluna in colunas}
+        result = session.execute(text(f"{comando} INTO {tabela} ({', '.join(colunas)}) VALUES {valores}"), params)
+        inseridas += result.rowcount
+    return inseridas
+
+
+def codificar_cursor(valores: list) -> str:
+    """Cursor opaco com os valores da chave de ordenação da última linha da página."""
+    valores = [valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str | None, tamanho: int) -> list | None:
+    if not cursor:
+        return None
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+    return valores
+
+
+def pagina_keyset(linhas: list[dict], limite: int, colunas_cursor: tuple[str, ...], response: Response) -> list[dict]:
+    """
+    Recebe até `limite + 1` linhas já ordenadas pela chave do cursor; se a linha extra
+    veio, há próxima página e o cursor dela é enviado no cabeçalho `X-Next-Cursor`.
+    """
+    if len(linhas) <= limite:
+        return linhas
+    pagina = linhas[:limite]
+    response.headers["X-Next-Cursor"] = codificar_cursor([pagina[-1][coluna] for coluna in colunas_cursor])
+    return pagina
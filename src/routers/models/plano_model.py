@@ -0,0 +1,187 @@
+import unicodedata
+from enum import Enum
+from typing import Annotated
+
+from fastapi import HTTPException
+from pydantic import (
+    BaseModel,
+    BeforeValidator,
+    ConfigDict,
+    Field,
+    StringConstraints,
+    TypeAdapter,
+    ValidationError,
+    model_validator,
+)
+
+TextoObrigatorio = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+
+class GrupoMuscular(str, Enum):
+    """Grupos musculares do catálogo (ENUM em TCC.EXERCICIO)."""
+
+    PEITO = "Peito"
+    COSTAS = "Costas"
+    OMBRO = "Ombro"
+    BRACO = "Braço"
+    PERNA = "Perna"
+    GLUTEO = "Glúteo"
+    ABDOMEN = "Abdômen"
+    OUTRO = "Outro"
+
+
+class Dificuldade(str, Enum):
+    """Dificuldade do treino, nos valores que o prompt pede ao modelo."""
+
+    INICIANTE = "iniciante"
+    INTERMEDIARIO = "intermediario"
+    AVANCADO = "avancado"
+
+
+# variações que o modelo costuma devolver, por prefixo do texto sem acentos e em
+# minúsculas; a ordem importa (a primeira que casar vence) e também gera o CASE da migração
+PREFIXOS_GRUPO_MUSCULAR: tuple[tuple[str, GrupoMuscular], ...] = (
+    ("peit", GrupoMuscular.PEITO),
+    ("cost", GrupoMuscular.COSTAS),
+    ("dors", GrupoMuscular.COSTAS),
+    ("ombr", GrupoMuscular.OMBRO),
+    ("delt", GrupoMuscular.OMBRO),
+    ("bra", GrupoMuscular.BRACO),
+    ("bicep", GrupoMuscular.BRACO),
+    ("tricep", GrupoMuscular.BRACO),
+    ("antebra", GrupoMuscular.BRACO),
+    ("pern", GrupoMuscular.PERNA),
+    ("quadr", GrupoMuscular.PERNA),
+    ("posterior", GrupoMuscular.PERNA),
+    ("panturr", GrupoMuscular.PERNA),
+    ("glut", GrupoMuscular.GLUTEO),
+    ("abd", GrupoMuscular.ABDOMEN),
+    ("core", GrupoMuscular.ABDOMEN),
+    ("outr", GrupoMuscular.OUTRO),
+)
+
+
+def normalizar_nome(texto: str) -> str:
+    """Sem acentos, em minúsculas e com espaços simples (aproxima a collation *_ai_ci do MySQL)."""
+    sem_acento = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return " ".join(sem_acento.casefold().split())
+
+
+def normalizar_grupo_muscular(valor):
+    """Grupo do catálogo para o texto do modelo ("peitoral", "Quadríceps"); None se nenhum casar."""
+    if isinstance(valor, GrupoMuscular) or not isinstance(valor, str):
+        return valor
+    texto = normalizar_nome(valor)
+    for prefixo, grupo in PREFIXOS_GRUPO_MUSCULAR:
+        if texto.startswith(prefixo):
+            return grupo
+    return None
+
+
+def _grupo_muscular_plano(valor):
+    grupo = normalizar_grupo_muscular(valor)
+    if grupo is None:
+        permitidos = ", ".join(grupo.value for grupo in GrupoMuscular)
+        raise ValueError(f"grupo muscular desconhecido {valor!r}; use um de: {permitidos}")
+    return grupo
+
+
+def _dificuldade_plano(valor):
+    # o modelo às vezes acentua ou capitaliza ("Intermediário"); o resto falha no modo estrito
+    if isinstance(valor, str):
+        try:
+            return Dificuldade(normalizar_nome(valor))
+        except ValueError:
+            pass
+    return valor
+
+
+# únicas conversões explícitas: o JSON do modelo traz os enums como texto
+GrupoMuscularPlano = Annotated[GrupoMuscular, BeforeValidator(_grupo_muscular_plano)]
+DificuldadePlano = Annotated[Dificuldade, BeforeValidator(_dificuldade_plano)]
+
+
+class ModeloPlano(BaseModel):
+    """
+    Base dos planos gerados pela IA: campos em snake_case, JSON em camelCase como no
+    prompt. Modo estrito: "4" não vira 4 nem 4 vira "4".
+    """
+
+    model_config = ConfigDict(strict=True, populate_by_name=True)
+
+
+class ProgramaTreinoPlano(ModeloPlano):
+    nome_programa: TextoObrigatorio = Field(..., alias="nomePrograma")
+    descricao_programa: TextoObrigatorio = Field(..., alias="descricaoPrograma")
+
+
+class ExercicioPlano(ModeloPlano):
+    nome_exercicio: TextoObrigatorio = Field(..., alias="nomeExercicio")
+    equipamento: TextoObrigatorio
+    grupo_muscular: GrupoMuscularPlano = Field(..., alias="grupoMuscular")
+    id_exercicio: int | None = Field(None, alias="idExercicio")
+    series: int = Field(..., ge=1)
+    repeticoes: int = Field(..., ge=1)
+    descanso_segundos: int = Field(..., alias="descansoSegundos", ge=15)
+
+
+class TreinoPlano(ModeloPlano):
+    nome: TextoObrigatorio
+    descricao: TextoObrigatorio
+    id_usuario: int = Field(..., alias="idUsuario", ge=1)
+    duracao_minutos: int = Field(..., alias="duracaoMinutos", ge=10)
+    dificuldade: DificuldadePlano
+    exercicios: list[ExercicioPlano] = Field(..., min_length=1)
+
+
+class PlanoTreino(ModeloPlano):
+    programa_treino: ProgramaTreinoPlano = Field(..., alias="programaTreino")
+    treinos: list[TreinoPlano] = Field(..., min_length=1)
+
+    @model_validator(mode="after")
+    def mesmo_usuario(self):
+        if len({treino.id_usuario for treino in self.treinos}) > 1:
+            raise ValueError("Todos os treinos do programa devem pertencer ao mesmo usuário")
+        return self
+
+
+class RefeicaoPlano(ModeloPlano):
+    calorias: int = Field(..., ge=0)
+    alimentos: TextoObrigatorio
+    tipo_refeicao: TextoObrigatorio = Field(..., alias="tipoRefeicao")
+
+
+class PlanoDieta(ModeloPlano):
+    nome: TextoObrigatorio
+    descricao: TextoObrigatorio
+    usuario: int = Field(..., ge=1)
+    refeicoes: list[RefeicaoPlano] = Field(..., min_length=1)
+
+
+# validadores compilados uma única vez, reutilizados em cada requisição
+adaptador_plano_treino = TypeAdapter(PlanoTreino)
+adaptador_plano_dieta = TypeAdapter(PlanoDieta)
+
+
+def _resumir_erros(exc: ValidationError, limite: int = 5) -> str:
+    erros = exc.errors(include_url=False, include_input=False)
+    partes = [f"{'.'.join(str(p) for p in erro['loc']) or 'plano'}: {erro['msg']}" for erro in erros[:limite]]
+    if len(erros) > limite:
+        partes.append(f"... e mais {len(erros) - limite} erro(s)")
+    return "; ".join(partes)
+
+
+def validar_plano_treino(plano: dict) -> PlanoTreino:
+    """Valida o plano de treino inteiro de uma vez; erros viram HTTP 400."""
+    try:
+        return adaptador_plano_treino.validate_python(plano)
+    except ValidationError as exc:
+        raise HTTPException(status_code=400, detail=f"Plano de treino inválido: {_resumir_erros(exc)}") from exc
+
+
+def validar_plano_dieta(plano: dict) -> PlanoDieta:
+    """Valida o plano de dieta inteiro de uma vez; erros viram HTTP 400."""
+    try:
+        return adaptador_plano_dieta.validate_python(plano)
+    except ValidationError as exc:
+        raise HTTPException(status_code=400, detail=f"Plano de dieta inválido: {_resumir_erros(exc)}") from exc
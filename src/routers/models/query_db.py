@@ -1,4 +1,7 @@
 import bcrypt
+
+from src.routers.models.plano_model import PREFIXOS_GRUPO_MUSCULAR, GrupoMuscular
+
 def gerar_senha(senha):
     hashed = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt())
     hashed_senha = hashed.decode('utf-8')
@@ -131,15 +134,125 @@ queries_db = {
         ON DELETE CASCADE
         ON UPDATE CASCADE
 );
-""",
-"usuario_primario": f"""
+"""
+}
+
+# senha calculada só ao aplicar a migração (bcrypt é lento de propósito)
+query_usuario_primario = """
 INSERT INTO TCC.USUARIO (nome, email, username, senha)
-SELECT 'Admin', 'tcc@gmail.com', 'tcc', '{gerar_senha('tcc1234')}'
+SELECT 'Admin', 'tcc@gmail.com', 'tcc', :senha
 WHERE NOT EXISTS (
     SELECT 1
     FROM TCC.USUARIO
     WHERE username = 'tcc' OR email = 'tcc@gmail.com'
 );
-
 """
+
+# índices compostos para os caminhos de leitura mais usados (InnoDB já inclui a
+# chave primária no fim de todo índice secundário); a chave é o nome do índice
+queries_indices_leitura = {
+    # /programas: filtra por usuário e ordena por data sem filesort
+    "idx_programa_treino_usu_criacao": """
+        CREATE INDEX idx_programa_treino_usu_criacao ON TCC.PROGRAMA_TREINO (id_usu, created_at)
+    """,
+    # /sessoes/perfil: treinos do usuário com o nome, sem ler a linha inteira
+    "idx_treino_usuario_nome": """
+        CREATE INDEX idx_treino_usuario_nome ON TCC.TREINO (id_usuario, nome)
+    """,
+    # /sessoes/exercicios: séries da sessão já na ordem de exibição, cobrindo as colunas lidas
+    "idx_series_sessao_ex_numero": """
+        CREATE INDEX idx_series_sessao_ex_numero
+        ON TCC.SERIES (id_sessao, id_ex_treino, numero_serie, repeticoes, carga)
+    """,
+}
+
+# total de calorias mantido na própria DIETA (gravado junto com as refeições)
+queries_calorias_dieta = {
+    "coluna": """
+        ALTER TABLE TCC.DIETA ADD COLUMN calorias_total INT NULL
+    """,
+    "preenchimento": """
+        UPDATE TCC.DIETA d
+        JOIN (SELECT id_dieta, SUM(calorias) AS calorias FROM TCC.REFEICOES GROUP BY id_dieta) c
+            ON c.id_dieta = d.id_dieta
+        SET d.calorias_total = c.calorias
+    """,
+}
+
+# quantidade de exercícios mantida no próprio TREINO (gravada junto com os exercícios)
+queries_qtd_exercicios_treino = {
+    "coluna": """
+        ALTER TABLE TCC.TREINO ADD COLUMN qtd_exercicios INT NOT NULL DEFAULT 0
+    """,
+    "preenchimento": """
+        UPDATE TCC.TREINO t
+        JOIN (SELECT id_treino, COUNT(*) AS qtd FROM TCC.EXERCICIO_TREINO GROUP BY id_treino) c
+            ON c.id_treino = t.id
+        SET t.qtd_exercicios = c.qtd
+    """,
+}
+
+
+def _case_grupo_muscular(coluna: str) -> str:
+    # mesmas regras de `normalizar_grupo_muscular` (a collation *_ai_ci ignora acento e caixa no LIKE);
+    # linhas antigas sem grupo reconhecido ficam como Outro em vez de barrar a migração
+    ramos = " ".join(f"WHEN {coluna} LIKE '{prefixo}%' THEN '{grupo.value}'" for prefixo, grupo in PREFIXOS_GRUPO_MUSCULAR)
+    return f"CASE {ramos} ELSE '{GrupoMuscular.OUTRO.value}' END"
+
+
+# catálogo de exercícios: EXERCICIO_TREINO passa a referenciar TCC.EXERCICIO em vez de
+# repetir nome, equipamento e grupo muscular em cada plano gerado. Expansão: as colunas
+# de texto continuam existindo até a contração, e id_exercicio fica opcional para que as
+# instâncias antigas (que gravam só o texto) sigam funcionando
+queries_catalogo_exercicios = {
+    "tabela": f"""
+        CREATE TABLE IF NOT EXISTS TCC.EXERCICIO (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nome VARCHAR(100) NOT NULL,
+            equipamento VARCHAR(100) NOT NULL,
+            grupo_muscular ENUM({", ".join(f"'{grupo.value}'" for grupo in GrupoMuscular)}) NOT NULL,
+            UNIQUE KEY uq_exercicio_nome_equipamento (nome, equipamento),
+            KEY idx_exercicio_grupo (grupo_muscular)
+        )
+    """,
+    "coluna": """
+        ALTER TABLE TCC.EXERCICIO_TREINO ADD COLUMN id_exercicio INT NULL
+    """,
+    # para a API poder deixar de gravar o texto antes da contração
+    "textos_opcionais": """
+        ALTER TABLE TCC.EXERCICIO_TREINO
+            MODIFY nome_exercicio VARCHAR(100) NULL,
+            MODIFY equipamento VARCHAR(100) NULL,
+            MODIFY grupo_muscular VARCHAR(100) NULL
+    """,
+    "preenchimento_catalogo": f"""
+        INSERT IGNORE INTO TCC.EXERCICIO (nome, equipamento, grupo_muscular)
+        SELECT DISTINCT TRIM(nome_exercicio), TRIM(equipamento), {_case_grupo_muscular("grupo_muscular")}
+        FROM TCC.EXERCICIO_TREINO
+        WHERE id_exercicio IS NULL
+    """,
+    "vinculo": """
+        UPDATE TCC.EXERCICIO_TREINO et
+        JOIN TCC.EXERCICIO e ON e.nome = TRIM(et.nome_exercicio) AND e.equipamento = TRIM(et.equipamento)
+        SET et.id_exercicio = e.id
+        WHERE et.id_exercicio IS NULL
+    """,
+}
+
+# contração do catálogo (destrutiva): depois de vincular as linhas gravadas só com texto
+# durante a expansão, o vínculo passa a ser obrigatório e as colunas de texto saem, uma
+# instrução por coluna
+queries_contracao_catalogo = {
+    "chave_estrangeira": """
+        ALTER TABLE TCC.EXERCICIO_TREINO
+            MODIFY id_exercicio INT NOT NULL,
+            ADD CONSTRAINT fk_exercicio_treino_catalogo
+                FOREIGN KEY (id_exercicio)
+                REFERENCES TCC.EXERCICIO(id)
+                ON UPDATE CASCADE
+    """,
+    "remocao_textos": {
+        coluna: f"ALTER TABLE TCC.EXERCICIO_TREINO DROP COLUMN {coluna}"
+        for coluna in ("nome_exercicio", "equipamento", "grupo_muscular")
+    },
 }
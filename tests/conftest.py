@@ -0,0 +1,123 @@
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+
+import pytest
+
+# Settings exige as variáveis do MySQL; nos testes nenhuma conexão é aberta com elas
+os.environ.setdefault("MYSQL_HOST", "localhost")
+os.environ.setdefault("MYSQL_DB", "TCC")
+os.environ.setdefault("MYSQL_PORT", "3306")
+os.environ.setdefault("MYSQL_USER", "teste")
+os.environ.setdefault("MYSQL_PASSWORD", "teste")
+
+# tabelas do schema TCC em sintaxe SQLite, com as colunas que a API grava e lê
+SCHEMA_TCC_SQLITE = """
+    CREATE TABLE IF NOT EXISTS TCC.PROGRAMA_TREINO (
+        id_programa_treino INTEGER PRIMARY KEY AUTOINCREMENT, id_usu INT NOT NULL, nome TEXT NOT NULL,
+        descricao TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS TCC.TREINO (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL, descricao TEXT, id_usuario INT NOT NULL,
+        id_programa_treino INT, duracao INT, dificuldade TEXT, qtd_exercicios INT NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS TCC.EXERCICIO (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL, equipamento TEXT NOT NULL,
+        grupo_muscular TEXT NOT NULL, UNIQUE (nome, equipamento)
+    );
+    CREATE TABLE IF NOT EXISTS TCC.EXERCICIO_TREINO (
+        id_ex_treino INTEGER PRIMARY KEY AUTOINCREMENT, nome_exercicio TEXT, equipamento TEXT,
+        grupo_muscular TEXT, id_treino INT NOT NULL, series INT, descanso INT, reps INT, id_exercicio INT
+    );
+    CREATE TABLE IF NOT EXISTS TCC.SESSAO_TREINO (
+        id_sessao INTEGER PRIMARY KEY AUTOINCREMENT, duracao_sessao INT, descricao TEXT, id_treino INT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS TCC.SERIES (
+        id_serie INTEGER PRIMARY KEY AUTOINCREMENT, numero_serie INT NOT NULL, repeticoes INT NOT NULL,
+        carga REAL, id_ex_treino INT NOT NULL, id_sessao INT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS TCC.DIETA (
+        id_dieta INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL, descricao TEXT,
+        id_usuario INT NOT NULL, calorias_total INT
+    );
+    CREATE TABLE IF NOT EXISTS TCC.REFEICOES (
+        id_refeicao INTEGER PRIMARY KEY AUTOINCREMENT, calorias INT, alimentos TEXT NOT NULL,
+        tipo_refeicao TEXT NOT NULL, id_dieta INT NOT NULL
+    );
+"""
+
+
+def anexar_tcc_sqlite(caminho_tcc):
+    """Listener de `connect` que anexa o arquivo do schema `TCC` a cada conexão nova."""
+
+    def anexar(conexao, _):
+        cursor = conexao.cursor()
+        cursor.execute(f"ATTACH DATABASE '{caminho_tcc}' AS TCC")
+        cursor.close()
+
+    return anexar
+
+
+@pytest.fixture
+def banco_sync(tmp_path):
+    """
+    Engine síncrono em SQLite com o schema `TCC` anexado e as tabelas já criadas, no
+    lugar do MySQL usado por `get_db_mysql` (INSERT IGNORE e DDL do MySQL ficam de fora).
+    """
+    from sqlalchemy import create_engine, event
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.sqlite3'}")
+    event.listen(engine, "connect", anexar_tcc_sqlite(tmp_path / "tcc.sqlite3"))
+    with engine.connect() as conexao:
+        conexao.connection.executescript(SCHEMA_TCC_SQLITE)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def banco_async(tmp_path, monkeypatch):
+    """
+    Aponta o engine assíncrono para um SQLite (aiosqlite) com o schema `TCC` anexado e
+    devolve um app com o router da API cujo lifespan descarta o engine no fim, junto
+    com uma conexão sqlite3 ao mesmo arquivo para preparar os dados. As escritas
+    (`get_db_mysql`) usam um engine síncrono sobre os mesmos arquivos.
+    O engine só é criado na primeira requisição, dentro do event loop do TestClient.
+    """
+    from fastapi import FastAPI
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Session
+
+    from src.core import database
+    from src.routers.apis.dieta import dieta  # noqa: F401 (registra as rotas no router)
+    from src.routers.apis.gpt import gpt_dieta  # noqa: F401
+    from src.routers.router import router
+
+    caminho_tcc = tmp_path / "tcc.sqlite3"
+    monkeypatch.setattr(database, "url_async", f"sqlite+aiosqlite:///{tmp_path / 'main.sqlite3'}")
+    monkeypatch.setattr(database, "_async_engine", None)
+
+    anexar_tcc = anexar_tcc_sqlite(caminho_tcc)
+
+    @asynccontextmanager
+    async def lifespan(_):
+        yield
+        await database.close_db_async()
+
+    engine_escrita = create_engine(f"sqlite:///{tmp_path / 'main.sqlite3'}")
+
+    def get_db_escrita():
+        with Session(engine_escrita) as session:
+            yield session
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    app.dependency_overrides[database.get_db_leitura] = database.get_db_async
+    app.dependency_overrides[database.get_db_mysql] = get_db_escrita
+
+    conexao = sqlite3.connect(caminho_tcc)
+    event.listen(Engine, "connect", anexar_tcc)
+    yield app, conexao
+    event.remove(Engine, "connect", anexar_tcc)
+    engine_escrita.dispose()
+    conexao.close()
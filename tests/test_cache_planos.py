@@ -0,0 +1,92 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.routers.apis.gpt import funcs_gpt
+from src.routers.apis.gpt.cache_gpt import CachePlanos
+from src.routers.apis.gpt.gpt import validar_plano_gerado
+
+PLANO_VALIDO = {
+    "programaTreino": {"nomePrograma": "Hipertrofia", "descricaoPrograma": "Divisão AB"},
+    "treinos": [
+        {
+            "nome": "Treino A",
+            "descricao": "Superiores",
+            "duracaoMinutos": 50,
+            "dificuldade": "Intermediário",
+            "exercicios": [
+                {
+                    "nomeExercicio": "Supino reto",
+                    "equipamento": "Barra",
+                    "grupoMuscular": "Peito",
+                    "series": 4,
+                    "repeticoes": 10,
+                    "descansoSegundos": 90,
+                }
+            ],
+        },
+        {
+            "nome": "Treino B",
+            "descricao": "Inferiores",
+            "duracaoMinutos": 50,
+            "dificuldade": "Intermediário",
+            "exercicios": [
+                {
+                    "nomeExercicio": "Agachamento livre",
+                    "equipamento": "Barra",
+                    "grupoMuscular": "Perna",
+                    "series": 4,
+                    "repeticoes": 8,
+                    "descansoSegundos": 120,
+                }
+            ],
+        },
+    ],
+}
+
+
+@pytest.fixture
+def modelo_fake(monkeypatch):
+    cache = CachePlanos(max_itens=10, ttl_segundos=60)
+    monkeypatch.setattr(funcs_gpt, "cache_planos", cache)
+
+    def configurar(texto: str):
+        async def create(**_):
+            return SimpleNamespace(output_text=texto, usage=None)
+
+        cliente = SimpleNamespace(responses=SimpleNamespace(create=create))
+        monkeypatch.setattr(funcs_gpt, "get_gpt_client", lambda: cliente)
+        return cache
+
+    return configurar
+
+
+def _gerar(prompt: str, chave: str) -> dict:
+    return asyncio.run(funcs_gpt.gpt_response(prompt, chave_cache=chave, validar=validar_plano_gerado))
+
+
+def test_plano_valido_e_integro_vai_para_o_cache(modelo_fake):
+    cache = modelo_fake(json.dumps(PLANO_VALIDO))
+
+    assert _gerar("prompt valido", "chave-valida") == PLANO_VALIDO
+    assert cache.get("chave-valida") == PLANO_VALIDO
+
+
+def test_plano_invalido_nao_vai_para_o_cache(modelo_fake):
+    invalido = {**PLANO_VALIDO, "treinos": [{**PLANO_VALIDO["treinos"][0], "exercicios": []}]}
+    cache = modelo_fake(json.dumps(invalido))
+
+    assert _gerar("prompt invalido", "chave-invalida") == invalido
+    assert cache.get("chave-invalida") is None
+
+
+def test_plano_truncado_reparado_nao_vai_para_o_cache(modelo_fake):
+    # o segundo treino foi cortado pelo limite de tokens; o parser tolerante recupera só o primeiro
+    texto = json.dumps(PLANO_VALIDO)
+    cache = modelo_fake(texto[: texto.index("Agachamento")])
+
+    plano = _gerar("prompt truncado", "chave-truncada")
+    assert [treino["nome"] for treino in plano["treinos"]] == ["Treino A"]
+    assert cache.get("chave-truncada") is None
@@ -0,0 +1,107 @@
+import sqlite3
+import time
+
+from src.routers.apis.treino.catalogo import MAX_ENTRADAS_BUSCA, IndicePrefixos
+from src.routers.models.plano_model import GrupoMuscular
+
+
+def _exercicio(id_exercicio: int, nome: str, grupo: GrupoMuscular = GrupoMuscular.PEITO, equipamento: str = "Barra"):
+    return {"id": id_exercicio, "nome": nome, "equipamento": equipamento, "grupo_muscular": grupo.value}
+
+
+def _indice() -> IndicePrefixos:
+    indice = IndicePrefixos()
+    indice.carregar([
+        _exercicio(1, "Supino Reto"),
+        _exercicio(2, "Supino Inclinado"),
+        _exercicio(3, "Remada Curvada", GrupoMuscular.COSTAS),
+        _exercicio(4, "Elevação Pélvica", GrupoMuscular.GLUTEO, "Máquina"),
+    ])
+    return indice
+
+
+def test_busca_casa_o_inicio_de_qualquer_palavra_sem_acento_e_caixa():
+    indice = _indice()
+
+    assert [e["id"] for e in indice.buscar("SUP", 10)] == [1, 2]
+    assert [e["id"] for e in indice.buscar("reto", 10)] == [1]
+    assert [e["id"] for e in indice.buscar("pelv", 10)] == [4]
+    assert indice.buscar("eto", 10) == []
+
+
+def test_nomes_que_comecam_pelo_termo_vem_primeiro():
+    indice = _indice()
+    indice.adicionar([_exercicio(5, "Crucifixo Reto"), _exercicio(6, "Reto Abdominal", GrupoMuscular.ABDOMEN)])
+
+    assert [e["id"] for e in indice.buscar("reto", 10)] == [6, 1, 5]
+    assert [e["id"] for e in indice.buscar("reto", 10, GrupoMuscular.PEITO)] == [1, 5]
+    assert indice.id_exercicio("crucifixo  RETO", "barra") == 5
+
+
+def test_busca_em_catalogo_grande_percorre_no_maximo_o_teto_de_entradas():
+    indice = IndicePrefixos()
+    indice.carregar([_exercicio(i, f"Exercicio {i:05d}", equipamento=f"Equipamento {i}") for i in range(50_000)])
+
+    inicio = time.perf_counter()
+    for _ in range(100):
+        resultado = indice.buscar("exe", 10)
+    por_busca = (time.perf_counter() - inicio) / 100
+
+    assert len(resultado) == 10
+    # bisect + no máximo MAX_ENTRADAS_BUSCA entradas: longe de percorrer as 50 mil
+    assert por_busca < 0.05, f"{por_busca * 1000:.1f} ms por busca ({MAX_ENTRADAS_BUSCA} entradas no teto)"
+
+
+def test_carregar_catalogo_grande_dentro_do_orcamento():
+    exercicios = [_exercicio(i, f"Exercicio {i:05d} Variacao", equipamento=f"Equipamento {i}") for i in range(20_000)]
+
+    inicio = time.perf_counter()
+    IndicePrefixos().carregar(exercicios)
+    segundos = time.perf_counter() - inicio
+
+    # roda uma vez por worker, no lifespan
+    assert segundos < 1.0, f"{segundos:.2f}s para carregar 20 mil exercícios"
+
+
+def _paginas(ddl: str, inserts: list[tuple[str, object]]) -> int:
+    conexao = sqlite3.connect(":memory:")
+    conexao.executescript(ddl)
+    for insert, linhas in inserts:
+        conexao.executemany(insert, linhas)
+    conexao.commit()
+    conexao.execute("VACUUM")
+    paginas = conexao.execute("PRAGMA page_count").fetchone()[0]
+    conexao.close()
+    return paginas
+
+
+def test_exercicios_do_treino_ocupam_menos_referenciando_o_catalogo():
+    # 200 mil exercícios de planos gerados, repetindo 300 exercícios distintos
+    distintos = [(f"Supino Inclinado com Halteres {i}", "Halteres e Banco Inclinado", "Peito") for i in range(300)]
+    linhas = [(i % 300, i // 8) for i in range(200_000)]
+
+    com_texto = _paginas(
+        "CREATE TABLE EXERCICIO_TREINO (id_ex_treino INTEGER PRIMARY KEY, nome_exercicio TEXT, equipamento TEXT,"
+        " grupo_muscular TEXT, id_treino INT, series INT, descanso INT, reps INT)",
+        [(
+            "INSERT INTO EXERCICIO_TREINO (nome_exercicio, equipamento, grupo_muscular, id_treino, series, descanso, reps)"
+            " VALUES (?, ?, ?, ?, 4, 60, 10)",
+            (distintos[exercicio] + (treino,) for exercicio, treino in linhas),
+        )],
+    )
+    com_catalogo = _paginas(
+        "CREATE TABLE EXERCICIO (id INTEGER PRIMARY KEY, nome TEXT, equipamento TEXT, grupo_muscular TEXT,"
+        " UNIQUE (nome, equipamento));"
+        "CREATE TABLE EXERCICIO_TREINO (id_ex_treino INTEGER PRIMARY KEY, id_exercicio INT, id_treino INT,"
+        " series INT, descanso INT, reps INT)",
+        [
+            ("INSERT INTO EXERCICIO (nome, equipamento, grupo_muscular) VALUES (?, ?, ?)", distintos),
+            (
+                "INSERT INTO EXERCICIO_TREINO (id_exercicio, id_treino, series, descanso, reps) VALUES (?, ?, 4, 60, 10)",
+                ((exercicio + 1, treino) for exercicio, treino in linhas),
+            ),
+        ],
+    )
+
+    # depois da contração, cada linha guarda só o id do catálogo no lugar dos três textos
+    assert com_catalogo < 0.4 * com_texto, f"catálogo {com_catalogo} páginas, texto {com_texto} páginas"
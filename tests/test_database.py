@@ -0,0 +1,269 @@
+import asyncio
+import sqlite3
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.core import database
+from src.core.config import Settings
+from src.routers.models import cache_leitura
+from src.routers.models.cache_leitura import CacheLRULeitura
+
+
+def _criar_dietas(conexao, id_usuario: int, quantidade: int) -> None:
+    conexao.execute(
+        "CREATE TABLE IF NOT EXISTS DIETA (id_dieta INTEGER PRIMARY KEY, nome TEXT, descricao TEXT,"
+        " id_usuario INT, calorias_total INT)"
+    )
+    conexao.executemany(
+        "INSERT INTO DIETA (nome, descricao, id_usuario, calorias_total) VALUES (?, ?, ?, ?)",
+        [(f"Dieta {i}", "", id_usuario, 2000 + i) for i in range(quantidade)],
+    )
+    conexao.commit()
+
+
+def test_engine_assincrono_criado_so_no_primeiro_uso(banco_async, monkeypatch):
+    app, conexao = banco_async
+    monkeypatch.setattr(database.sett, "CACHE_LEITURA_ATIVO", False)
+    _criar_dietas(conexao, id_usuario=1, quantidade=3)
+
+    assert database._async_engine is None
+    with TestClient(app) as cliente:
+        assert database._async_engine is None
+        resposta = cliente.get("/api/dietas_usuario", params={"idUsuario": 1, "limite": 2})
+        assert database._async_engine is not None
+    assert database._async_engine is None
+
+    assert resposta.status_code == 200
+    assert [dieta["nome"] for dieta in resposta.json()] == ["Dieta 0", "Dieta 1"]
+    assert resposta.headers["X-Next-Cursor"]
+
+
+def test_sessao_assincrona_le_pagina_seguinte_pelo_cursor(banco_async, monkeypatch):
+    app, conexao = banco_async
+    monkeypatch.setattr(database.sett, "CACHE_LEITURA_ATIVO", False)
+    _criar_dietas(conexao, id_usuario=2, quantidade=3)
+
+    with TestClient(app) as cliente:
+        primeira = cliente.get("/api/dietas_usuario", params={"idUsuario": 2, "limite": 2})
+        segunda = cliente.get(
+            "/api/dietas_usuario",
+            params={"idUsuario": 2, "limite": 2, "cursor": primeira.headers["X-Next-Cursor"]},
+        )
+
+    assert [dieta["calorias"] for dieta in segunda.json()] == [2002]
+    assert "X-Next-Cursor" not in segunda.headers
+
+
+ATRASO_CONSULTA = 0.05
+
+
+def test_leituras_simultaneas_nao_esperam_umas_pelas_outras(banco_async, monkeypatch):
+    """
+    Cada leitura de DIETA leva ATRASO_CONSULTA na thread da conexão aiosqlite (a view chama
+    `atraso`), como uma consulta lenta no MySQL; o event loop segue atendendo as demais.
+    """
+    app, conexao = banco_async
+    monkeypatch.setattr(database.sett, "CACHE_LEITURA_ATIVO", False)
+    conexao.executescript(
+        """
+        CREATE TABLE DIETA_DADOS (id_dieta INTEGER PRIMARY KEY, nome TEXT, descricao TEXT,
+            id_usuario INT, calorias_total INT);
+        CREATE VIEW DIETA AS SELECT * FROM DIETA_DADOS WHERE (SELECT atraso());
+        """
+    )
+    conexao.executemany(
+        "INSERT INTO DIETA_DADOS (nome, descricao, id_usuario, calorias_total) VALUES (?, '', ?, 2000)",
+        [(f"Dieta {i}", i) for i in range(1, 21)],
+    )
+    conexao.commit()
+
+    def registrar_atraso(conexao_dbapi, _):
+        conexao_dbapi.create_function("atraso", 0, lambda: time.sleep(ATRASO_CONSULTA) or 1)
+
+    async def ler_em_paralelo(usuarios: range) -> tuple[list[httpx.Response], float]:
+        transporte = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+                # aquece o pool: o engine e as conexões são criados na primeira leitura
+                await asyncio.gather(*(cliente.get("/api/dietas_usuario", params={"idUsuario": 1}) for _ in usuarios))
+                inicio = time.perf_counter()
+                respostas = await asyncio.gather(
+                    *(cliente.get("/api/dietas_usuario", params={"idUsuario": usuario}) for usuario in usuarios)
+                )
+                return respostas, time.perf_counter() - inicio
+        finally:
+            await database.close_db_async()
+
+    event.listen(Engine, "connect", registrar_atraso)
+    try:
+        respostas, total = asyncio.run(ler_em_paralelo(range(1, 21)))
+    finally:
+        event.remove(Engine, "connect", registrar_atraso)
+
+    assert [resposta.json()[0]["nome"] for resposta in respostas] == [f"Dieta {i}" for i in range(1, 21)]
+    # 20 leituras de 50 ms: ~1 s uma após a outra, perto de uma leitura em paralelo
+    assert ATRASO_CONSULTA <= total < 0.4, f"{total:.2f}s para 20 leituras"
+
+
+def test_escrita_confirmada_aparece_na_leitura_seguinte_com_cache(banco_async, monkeypatch):
+    app, conexao = banco_async
+    monkeypatch.setattr(database.sett, "CACHE_LEITURA_ATIVO", True)
+    monkeypatch.setattr(cache_leitura, "cache_leitura", CacheLRULeitura(max_itens=100, ttl_segundos=600))
+    _criar_dietas(conexao, id_usuario=3, quantidade=1)
+    params = {"idUsuario": 3}
+
+    conexao.execute(
+        "CREATE TABLE REFEICOES (id_refeicao INTEGER PRIMARY KEY, calorias INT, alimentos TEXT,"
+        " tipo_refeicao TEXT, id_dieta INT)"
+    )
+    conexao.commit()
+    plano = {
+        "nome": "Dieta nova", "descricao": "Cutting", "usuario": 3,
+        "refeicoes": [{"tipoRefeicao": "Almoço", "alimentos": "Arroz e frango", "calorias": 700}],
+    }
+
+    with TestClient(app) as cliente:
+        antes = cliente.get("/api/dietas_usuario", params=params).json()
+        confirmacao = cliente.post("/api/gpt/dieta/confirm", json={"plano": plano})
+        depois = cliente.get("/api/dietas_usuario", params=params).json()
+        refeicoes = cliente.get("/api/refeicoes_dieta", params={"idDieta": confirmacao.json()["dietaId"]}).json()
+
+    assert confirmacao.status_code == 200, confirmacao.text
+    assert len(antes) == 1
+    # a confirmação invalidou a página guardada: a dieta nova já aparece, com o total gravado
+    assert [(dieta["id_dieta"], dieta["calorias"]) for dieta in depois[1:]] == [(confirmacao.json()["dietaId"], 700)]
+    assert [refeicao["alimentos"] for refeicao in refeicoes] == ["Arroz e frango"]
+    assert cache_leitura.cache_leitura.stats()["invalidados"] == 1
+
+
+def test_cache_desligado_por_padrao_le_sempre_do_banco(banco_async, monkeypatch):
+    app, conexao = banco_async
+    monkeypatch.setattr(database.sett, "CACHE_LEITURA_ATIVO", Settings().CACHE_LEITURA_ATIVO)
+    _criar_dietas(conexao, id_usuario=4, quantidade=1)
+    params = {"idUsuario": 4}
+
+    with TestClient(app) as cliente:
+        cliente.get("/api/dietas_usuario", params=params)
+        # escrita feita por outro worker: nenhuma invalidação chega a este processo
+        _criar_dietas(conexao, id_usuario=4, quantidade=1)
+        depois = cliente.get("/api/dietas_usuario", params=params).json()
+
+    assert len(depois) == 2
+
+
+def test_lote_de_exercicios_recusa_lista_acima_do_limite_mesmo_com_repetidos(banco_async):
+    from src.routers.apis.treino import listagem
+
+    app, _ = banco_async
+    ids = [1] * (listagem.MAX_IDS_CATALOGO + 1)
+
+    with TestClient(app) as cliente:
+        resposta = cliente.post("/api/exercicios/lote", json={"exerciciosIds": ids})
+
+    assert resposta.status_code == 422
+    # a validação do corpo recusa antes de qualquer consulta
+    assert database._async_engine is None
+
+
+RTT_SIMULADO = 0.005
+
+
+def test_lote_de_exercicios_faz_uma_consulta_por_lote_de_ids(banco_async):
+    """Cada ida ao banco custa um RTT simulado; o custo cresce com o número de lotes, não de ids."""
+    from src.routers.apis.treino import listagem
+
+    app, conexao = banco_async
+    conexao.executescript(
+        """
+        CREATE TABLE EXERCICIO (id INTEGER PRIMARY KEY, nome TEXT, equipamento TEXT, grupo_muscular TEXT);
+        CREATE TABLE EXERCICIO_TREINO (id_ex_treino INTEGER PRIMARY KEY, id_exercicio INT, id_treino INT,
+            series INT, descanso INT, reps INT);
+        INSERT INTO EXERCICIO (id, nome, equipamento, grupo_muscular) VALUES (1, 'Supino Reto', 'Barra', 'Peito');
+        """
+    )
+    conexao.executemany(
+        "INSERT INTO EXERCICIO_TREINO (id_ex_treino, id_exercicio, id_treino, series, descanso, reps)"
+        " VALUES (?, 1, 1, 4, 60, 10)",
+        ((i,) for i in range(1, 6001)),
+    )
+    conexao.commit()
+    consultas: list[str] = []
+
+    def ida_ao_banco(conn, cursor, sql, params, context, executemany):
+        if "EXERCICIO_TREINO" in sql:
+            consultas.append(sql)
+            time.sleep(RTT_SIMULADO)
+
+    tempos, idas = {}, {}
+    event.listen(Engine, "before_cursor_execute", ida_ao_banco)
+    try:
+        with TestClient(app) as cliente:
+            cliente.post("/api/exercicios/lote", json={"exerciciosIds": [1]})
+            for quantidade in (1, listagem.TAMANHO_LOTE_IDS, listagem.MAX_IDS_CATALOGO):
+                # do fim para o começo, com um id inexistente: a resposta segue a ordem pedida
+                ids = [9999, *range(quantidade, 1, -1)] if quantidade > 1 else [1]
+                consultas.clear()
+                inicio = time.perf_counter()
+                resposta = cliente.post("/api/exercicios/lote", json={"exerciciosIds": ids})
+                tempos[quantidade] = time.perf_counter() - inicio
+                idas[quantidade] = len(consultas)
+                assert [exercicio["id_ex_treino"] for exercicio in resposta.json()] == [i for i in ids if i != 9999]
+    finally:
+        event.remove(Engine, "before_cursor_execute", ida_ao_banco)
+
+    assert idas == {1: 1, 500: 1, 5000: 10}
+    # 5000 ids em 10 consultas; uma consulta por id seriam 5000 RTTs (~25 s)
+    assert tempos[5000] < 1.5, tempos
+
+
+def _tempo_medio(conexao, query: str, params: dict, repeticoes: int = 20) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        linhas = conexao.execute(query, params).fetchall()
+    assert linhas
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def test_pagina_profunda_de_dietas_custa_o_mesmo_que_a_primeira():
+    from src.routers.apis.dieta.dieta import QUERY_DIETAS_USUARIO
+
+    conexao = sqlite3.connect(":memory:")
+    conexao.executescript(
+        """
+        ATTACH DATABASE ':memory:' AS TCC;
+        CREATE TABLE TCC.DIETA (id_dieta INTEGER PRIMARY KEY, nome TEXT, descricao TEXT,
+            id_usuario INT, calorias_total INT);
+        CREATE INDEX TCC.fk_dieta_usuario ON DIETA (id_usuario);
+        """
+    )
+    # 200 mil dietas do usuário 1 intercaladas com as de outros usuários
+    conexao.executemany(
+        "INSERT INTO TCC.DIETA (nome, descricao, id_usuario, calorias_total) VALUES (?, '', ?, 2000)",
+        ((f"Dieta {i}", 1 if i % 2 else 2) for i in range(400_000)),
+    )
+    limite = 21
+    ultimo_id = conexao.execute("SELECT MAX(id_dieta) FROM TCC.DIETA WHERE id_usuario = 1").fetchone()[0] - 4 * limite
+    por_offset = QUERY_DIETAS_USUARIO.replace("AND d.id_dieta > :ultimo_id", "").replace(
+        "LIMIT :limite", "LIMIT :limite OFFSET :deslocamento"
+    )
+
+    plano = " | ".join(linha[-1] for linha in conexao.execute(
+        f"EXPLAIN QUERY PLAN {QUERY_DIETAS_USUARIO}", {"id_usuario": 1, "ultimo_id": ultimo_id, "limite": limite}
+    ))
+    primeira = _tempo_medio(conexao, QUERY_DIETAS_USUARIO, {"id_usuario": 1, "ultimo_id": 0, "limite": limite})
+    profunda = _tempo_medio(conexao, QUERY_DIETAS_USUARIO, {"id_usuario": 1, "ultimo_id": ultimo_id, "limite": limite})
+    offset = _tempo_medio(
+        conexao, por_offset, {"id_usuario": 1, "limite": limite, "deslocamento": 200_000 - 2 * limite}, repeticoes=3
+    )
+    conexao.close()
+
+    # o cursor vira uma busca no índice a partir do último id, sem pular linhas
+    assert "(id_usuario=? AND rowid>?)" in plano, plano
+    assert "TEMP B-TREE" not in plano
+    assert profunda < 3 * primeira + 0.001, f"primeira {primeira * 1000:.2f} ms, profunda {profunda * 1000:.2f} ms"
+    # a mesma página com OFFSET percorre as 200 mil entradas antes dela
+    assert offset > 20 * profunda, f"keyset {profunda * 1000:.2f} ms, OFFSET {offset * 1000:.2f} ms"
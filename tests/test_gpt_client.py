@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+
+import anyio
+import httpx
+import openai
+import pytest
+
+from src.core import gpt_client
+
+
+def _resposta_chat(conteudo: str) -> dict:
+    return {
+        "id": "chatcmpl-teste",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "teste",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": conteudo}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+@pytest.fixture
+def cliente_fake(monkeypatch):
+    monkeypatch.setattr(gpt_client.sett_gpt, "OPENAI_API_KEY", "chave-teste")
+    monkeypatch.setattr(gpt_client.sett_gpt, "OPENAI_BASE_URL", "http://fake.local/v1")
+    monkeypatch.setattr(gpt_client, "_client", None)
+    chamadas = []
+
+    def criar(handler):
+        def registrar(request: httpx.Request) -> httpx.Response:
+            chamadas.append(request)
+            return handler(request)
+
+        return gpt_client.init_gpt_client(transport=httpx.MockTransport(registrar))
+
+    yield criar, chamadas
+    asyncio.run(gpt_client.close_gpt_client())
+
+
+def test_chamadas_concorrentes_compartilham_cliente_e_pool(cliente_fake):
+    criar, chamadas = cliente_fake
+    cliente = criar(lambda request: httpx.Response(200, json=_resposta_chat("ok")))
+
+    async def chamar():
+        atual = gpt_client.get_gpt_client()
+        resposta = await atual.chat.completions.create(model="teste", messages=[{"role": "user", "content": "oi"}])
+        return atual, resposta.choices[0].message.content
+
+    async def main():
+        return await asyncio.gather(*(chamar() for _ in range(20)))
+
+    resultados = asyncio.run(main())
+    assert len(chamadas) == 20
+    # todas as chamadas saem do mesmo cliente e, portanto, do mesmo pool httpx
+    assert {id(atual) for atual, _ in resultados} == {id(cliente)}
+    assert all(conteudo == "ok" for _, conteudo in resultados)
+
+
+def test_sdk_nao_repete_429_por_conta_propria(cliente_fake):
+    criar, chamadas = cliente_fake
+    criar(lambda request: httpx.Response(429, headers={"retry-after": "0"}, json={"error": {"message": "limite"}}))
+
+    async def main():
+        await gpt_client.get_gpt_client().chat.completions.create(model="teste", messages=[{"role": "user", "content": "oi"}])
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(main())
+    # max_retries=0: uma única ida ao provedor; quem repete é o agendador
+    assert len(chamadas) == 1
+    assert json.loads(chamadas[0].content)["model"] == "teste"
+
+
+def _resposta_responses() -> dict:
+    return {
+        "id": "resp-teste", "object": "response", "created_at": 0, "model": "teste", "output": [],
+        "status": "completed", "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+    }
+
+
+def test_cliente_compartilhado_supera_o_modelo_de_threads_anterior(cliente_fake):
+    """
+    Antes, cada geração era um handler síncrono segurando uma thread do AnyIO (40 por
+    padrão) durante toda a chamada; agora as chamadas esperam no event loop, no mesmo pool.
+    """
+    criar, _ = cliente_fake
+    latencia, chamadas = 0.2, 200
+
+    async def responder(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latencia)
+        return httpx.Response(200, json=_resposta_responses())
+
+    criar(responder)
+
+    async def compartilhado():
+        cliente = gpt_client.get_gpt_client()
+        await cliente.responses.create(model="teste", input="aquecimento")
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente.responses.create(model="teste", input="oi") for _ in range(chamadas)))
+        return time.perf_counter() - inicio
+
+    async def threads():
+        inicio = time.perf_counter()
+        async with anyio.create_task_group() as grupo:
+            for _ in range(chamadas):
+                grupo.start_soon(anyio.to_thread.run_sync, time.sleep, latencia)
+        return time.perf_counter() - inicio
+
+    depois = asyncio.run(compartilhado())
+    antes = asyncio.run(threads())
+
+    # 200 chamadas de 200 ms: ~1 s em lotes de 40 threads, perto de uma chamada no event loop
+    assert depois < 0.7 * antes, f"compartilhado {depois:.2f}s, threads {antes:.2f}s"
@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.routers.apis.gpt.gpt_dieta import DietPlanPayload, confirmar_dieta
+
+
+def _payload(indice: int) -> DietPlanPayload:
+    return DietPlanPayload.model_validate({
+        "plano": {
+            "nome": f"Dieta {indice}",
+            "descricao": "Dieta",
+            "usuario": 7,
+            "refeicoes": [
+                {"tipoRefeicao": tipo, "alimentos": f"Dieta {indice}", "calorias": 500}
+                for tipo in ("Café da manhã", "Almoço", "Jantar")
+            ],
+        }
+    })
+
+
+def test_confirmacoes_simultaneas_do_mesmo_usuario_nao_trocam_refeicoes(banco_sync):
+    """
+    Em autocommit, todas as dietas são inseridas antes de qualquer refeição: quem lesse o
+    id de volta (ex.: MAX(id_dieta) do usuário) gravaria as refeições na dieta de outro.
+    """
+    confirmacoes = 8
+    engine = banco_sync.execution_options(isolation_level="AUTOCOMMIT")
+    barreira = threading.Barrier(confirmacoes, timeout=5)
+
+    @event.listens_for(banco_sync, "after_cursor_execute")
+    def esperar_as_demais(conn, cursor, sql, params, context, executemany):
+        if sql.lstrip().startswith("INSERT INTO TCC.DIETA"):
+            barreira.wait()
+
+    def confirmar(indice: int) -> dict:
+        with Session(engine) as session:
+            return confirmar_dieta(_payload(indice), session)
+
+    with ThreadPoolExecutor(max_workers=confirmacoes) as executor:
+        respostas = list(executor.map(confirmar, range(confirmacoes)))
+
+    with banco_sync.connect() as conexao:
+        dietas = dict(conexao.exec_driver_sql("SELECT id_dieta, nome FROM TCC.DIETA").all())
+        refeicoes = conexao.exec_driver_sql("SELECT id_dieta, alimentos FROM TCC.REFEICOES").all()
+
+    assert sorted(resposta["dietaId"] for resposta in respostas) == sorted(dietas)
+    assert all(dietas[resposta["dietaId"]] == resposta["programa"] for resposta in respostas)
+    assert len(refeicoes) == 3 * confirmacoes
+    # cada refeição aponta para a dieta que a gravou
+    assert all(dietas[id_dieta] == alimentos for id_dieta, alimentos in refeicoes)
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from src.core.database import sett
+from src.routers.apis.gpt import funcs_gpt
+from src.routers.apis.gpt.gpt import (
+    dias_por_semana,
+    dias_selecionados,
+    gerar_plano_por_dia,
+    persist_workout_plan,
+    planejar_programa,
+    treinos_afetados,
+    verificar_equilibrio,
+)
+from src.routers.apis.gpt.singleflight import SingleFlight
+from src.routers.apis.treino import catalogo
+from src.routers.models.anamnesemodel import PostAnamnese
+from src.routers.models.plano_model import validar_plano_treino
+
+
+def _treino(*grupos: str) -> dict:
+    return {"exercicios": [{"nomeExercicio": f"Exercício {grupo}", "grupoMuscular": grupo} for grupo in grupos]}
+
+
+def test_equilibrio_aceita_grupos_como_o_modelo_escreve():
+    verificar_equilibrio([_treino("peitoral", "Bíceps"), _treino("Quadríceps", "gluteos")])
+
+
+def test_equilibrio_recusa_semana_so_de_superiores():
+    with pytest.raises(HTTPException) as erro:
+        verificar_equilibrio([_treino("Peitoral"), _treino("dorsal", "Tríceps")])
+    assert erro.value.status_code == 502
+
+
+def _anamnese(dias_semana: str) -> PostAnamnese:
+    return PostAnamnese(
+        usuario_id=1, idade=30, sexo="F", peso=60.0, experiencia="iniciante", tempo_treino="nenhum",
+        dias_semana=dias_semana, tempo_treino_por_dia="1h", objetivos=["hipertrofia"],
+        objetivo_especifico="", lesao="", condicao_medica="", exercicio_nao_gosta="",
+    )
+
+
+@pytest.mark.parametrize(
+    ("dias_semana", "esperado"),
+    [
+        ("Segunda, Quarta e Sexta", ["segunda", "quarta", "sexta"]),
+        ("ter/qui/sáb", ["terca", "quinta", "sabado"]),
+        ("quatro dias", []),
+        ("4", []),
+    ],
+)
+def test_dias_selecionados_na_ordem_da_semana(dias_semana, esperado):
+    assert dias_selecionados(_anamnese(dias_semana)) == esperado
+
+
+def test_dia_da_semana_aponta_para_o_treino_daquele_dia():
+    anamnese = _anamnese("terça, quinta e sábado")
+    treinos = [{"nome": foco} for foco, _ in planejar_programa(anamnese)["divisao"]]
+    plano = {"treinos": treinos}
+    dias = dias_selecionados(anamnese)
+
+    assert dias_por_semana(anamnese) == 3
+    assert treinos_afetados(plano, "Na quinta quero mais exercícios", dias) == [1]
+    assert treinos_afetados(plano, "troque o treino de sábado", dias) == [2]
+    # segunda não é dia de treino deste usuário: nenhum treino é apontado
+    assert treinos_afetados(plano, "na segunda não posso ir", dias) == []
+    assert treinos_afetados(plano, "na quinta quero mais exercícios", None) == []
+
+
+SEGUNDOS_POR_TOKEN = 0.0005
+
+
+@pytest.fixture
+def modelo_com_atraso_por_token(monkeypatch):
+    """Modelo fake que demora proporcionalmente ao tamanho da resposta, como um stream de tokens."""
+    atrasos: list[float] = []
+
+    async def create(**kwargs):
+        exercicios = 6 + len(atrasos) % 5
+        treino = {
+            "nome": f"Treino {len(atrasos) + 1}",
+            "exercicios": [
+                {"nomeExercicio": f"Exercício {i}", "grupoMuscular": "Peito" if i % 2 else "Quadríceps",
+                 "equipamento": "Barra", "series": 4, "repeticoes": "10-12", "descansoSegundos": 60}
+                for i in range(exercicios)
+            ],
+        }
+        texto = json.dumps({"treinos": [treino]}, ensure_ascii=False)
+        atraso = len(texto) / 4 * SEGUNDOS_POR_TOKEN
+        atrasos.append(atraso)
+        await asyncio.sleep(atraso)
+        return SimpleNamespace(output_text=texto, usage=None)
+
+    cliente = SimpleNamespace(responses=SimpleNamespace(create=create))
+    monkeypatch.setattr(funcs_gpt, "get_gpt_client", lambda: cliente)
+    monkeypatch.setattr(funcs_gpt, "chamadas_gpt", SingleFlight())
+    return atrasos
+
+
+def test_fan_out_leva_o_tempo_do_dia_mais_lento(modelo_com_atraso_por_token):
+    atrasos = modelo_com_atraso_por_token
+    anamnese = _anamnese("segunda, terça, quarta, quinta e sexta")
+
+    inicio = time.perf_counter()
+    plano = asyncio.run(gerar_plano_por_dia(anamnese, usar_cache=False))
+    total = time.perf_counter() - inicio
+
+    assert len(plano["treinos"]) == len(atrasos) == 5
+    # uma chamada por dia em paralelo: perto do dia mais lento, longe da soma dos cinco
+    assert max(atrasos) <= total < max(atrasos) + 0.1, f"{total:.2f}s, dias {atrasos}"
+    assert total < 0.5 * sum(atrasos)
+
+
+RTT_SIMULADO = 0.01
+
+
+def _plano_treino(treinos: int, exercicios: int) -> dict:
+    return {
+        "programaTreino": {"nomePrograma": "Programa", "descricaoPrograma": "Hipertrofia"},
+        "treinos": [
+            {
+                "nome": f"Treino {t}", "descricao": "Treino", "idUsuario": 1, "duracaoMinutos": 60,
+                "dificuldade": "intermediario",
+                "exercicios": [
+                    {"nomeExercicio": f"Exercício {e}", "equipamento": "Barra", "grupoMuscular": "Peito",
+                     "series": 4, "repeticoes": 10, "descansoSegundos": 60}
+                    for e in range(exercicios)
+                ],
+            }
+            for t in range(treinos)
+        ],
+    }
+
+
+def test_confirmacao_do_plano_nao_cresce_com_o_tamanho_do_plano(banco_sync, monkeypatch):
+    """Cada ida ao banco custa um RTT simulado; o plano é gravado em lotes, não linha a linha."""
+    indice = catalogo.IndicePrefixos()
+    indice.carregar([
+        {"id": e + 1, "nome": f"Exercício {e}", "equipamento": "Barra", "grupo_muscular": "Peito"} for e in range(8)
+    ])
+    monkeypatch.setattr(catalogo, "indice_exercicios", indice)
+    comandos: list[str] = []
+
+    @event.listens_for(banco_sync, "before_cursor_execute")
+    def ida_ao_banco(conn, cursor, sql, params, context, executemany):
+        comandos.append(sql)
+        time.sleep(RTT_SIMULADO)
+
+    tempos, idas = {}, {}
+    for treinos, exercicios in [(1, 4), (3, 6), (6, 8)]:
+        plano = validar_plano_treino(_plano_treino(treinos, exercicios))
+        comandos.clear()
+        inicio = time.perf_counter()
+        with Session(banco_sync) as session:
+            resultado = persist_workout_plan(plano, session)
+            session.commit()
+        tempos[treinos * exercicios] = time.perf_counter() - inicio
+        idas[treinos * exercicios] = len(comandos)
+        assert len(resultado["treinos_inseridos"]) == treinos
+
+    # programa, treinos, ids dos treinos e exercícios: 4 idas para 4 ou 48 exercícios
+    assert set(idas.values()) == {4}, idas
+    # linha a linha, o plano de 48 exercícios levaria 1 + 6 + 48 RTTs (~0,55 s)
+    assert max(tempos.values()) < 8 * RTT_SIMULADO, tempos
+    with banco_sync.connect() as conexao:
+        assert conexao.exec_driver_sql("SELECT COUNT(*) FROM TCC.EXERCICIO_TREINO").scalar() == 4 + 18 + 48
+
+
+@pytest.mark.parametrize("gravar_textos", [True, False])
+def test_exercicios_gravam_o_texto_ate_a_contracao(banco_sync, monkeypatch, gravar_textos):
+    exercicios = [
+        {"id": e + 1, "nome": f"Exercício {e}", "equipamento": "Barra", "grupo_muscular": "Peito"} for e in range(2)
+    ]
+    indice = catalogo.IndicePrefixos()
+    indice.carregar(exercicios)
+    monkeypatch.setattr(catalogo, "indice_exercicios", indice)
+    monkeypatch.setattr(sett, "DB_GRAVAR_TEXTOS_EXERCICIO_TREINO", gravar_textos)
+
+    with Session(banco_sync) as session:
+        session.execute(
+            text(
+                "INSERT INTO TCC.EXERCICIO (id, nome, equipamento, grupo_muscular)"
+                " VALUES (:id, :nome, :equipamento, :grupo_muscular)"
+            ),
+            exercicios,
+        )
+        persist_workout_plan(validar_plano_treino(_plano_treino(1, 2)), session)
+        session.commit()
+        linhas = session.execute(text(
+            "SELECT e.nome, et.nome_exercicio, et.equipamento, et.grupo_muscular"
+            " FROM TCC.EXERCICIO_TREINO et JOIN TCC.EXERCICIO e ON e.id = et.id_exercicio ORDER BY et.id_ex_treino"
+        )).all()
+
+    assert [linha.nome for linha in linhas] == ["Exercício 0", "Exercício 1"]
+    # as instâncias anteriores ao catálogo leem só estas colunas
+    textos = [("Exercício 0", "Barra", "Peito"), ("Exercício 1", "Barra", "Peito")]
+    esperado = textos if gravar_textos else [(None, None, None)] * 2
+    assert [tuple(linha[1:]) for linha in linhas] == esperado
@@ -0,0 +1,164 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from src.routers.apis.gpt import funcs_gpt
+from src.routers.apis.gpt.hedge_gpt import CircuitBreaker, ExecutorHedge
+
+
+def _executor(fila_ocupada: bool = False, limiar_falhas: int = 5) -> ExecutorHedge:
+    executor = ExecutorHedge(
+        CircuitBreaker(limiar_falhas, tempo_aberto=30.0),
+        percentil=0.95,
+        amostras_minimas=1,
+        fila_ocupada=lambda: fila_ocupada,
+    )
+    # latência típica de 50ms: o hedge dispara quando a tentativa passa disso
+    executor.histogramas["/gpt"].registrar(0.05)
+    return executor
+
+
+def _tentativa(espera_fila: float, latencias: list[float]):
+    """Cada tentativa espera `espera_fila` na fila e responde na próxima latência da lista."""
+    disparos = []
+
+    async def tentativa(ao_admitir):
+        indice = len(disparos)
+        disparos.append(indice)
+        await asyncio.sleep(espera_fila if indice == 0 else 0)
+        ao_admitir()
+        await asyncio.sleep(latencias[indice])
+        return f"tentativa {indice}"
+
+    return tentativa, disparos
+
+
+def test_espera_na_fila_do_agendador_nao_dispara_hedge():
+    executor = _executor()
+    tentativa, disparos = _tentativa(espera_fila=0.2, latencias=[0.01])
+
+    assert asyncio.run(executor.executar("/gpt", tentativa)) == "tentativa 0"
+    assert disparos == [0]
+    assert executor.hedges == 0
+
+
+def test_resposta_lenta_depois_de_admitida_dispara_hedge():
+    executor = _executor()
+    tentativa, disparos = _tentativa(espera_fila=0, latencias=[1.0, 0.01])
+
+    assert asyncio.run(executor.executar("/gpt", tentativa)) == "tentativa 1"
+    assert disparos == [0, 1]
+    assert (executor.hedges, executor.hedges_vencedores) == (1, 1)
+
+
+def test_hedge_suprimido_com_a_fila_do_agendador_ocupada():
+    executor = _executor(fila_ocupada=True)
+    tentativa, disparos = _tentativa(espera_fila=0, latencias=[0.2])
+
+    assert asyncio.run(executor.executar("/gpt", tentativa)) == "tentativa 0"
+    assert disparos == [0]
+    assert (executor.hedges, executor.hedges_suprimidos) == (0, 1)
+
+
+class ErroProvedor(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"erro {status_code}")
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize(
+    ("erro", "conta_falha"),
+    [
+        (HTTPException(status_code=502, detail="Falha ao decodificar JSON da IA"), False),
+        (HTTPException(status_code=429, detail="Muitas gerações em andamento"), False),
+        (ErroProvedor(400), False),
+        (ErroProvedor(503), True),
+        (httpx.ConnectError("recusada"), True),
+        (httpx.ReadTimeout("lento"), True),
+    ],
+)
+def test_breaker_conta_apenas_falhas_do_provedor(erro, conta_falha):
+    executor = _executor(limiar_falhas=1)
+
+    async def tentativa(ao_admitir):
+        ao_admitir()
+        raise erro
+
+    with pytest.raises(type(erro)):
+        asyncio.run(executor.executar("/gpt", tentativa))
+    assert executor.breaker.estado == ("aberto" if conta_falha else "fechado")
+
+
+def _breaker_meio_aberto() -> ExecutorHedge:
+    executor = _executor(limiar_falhas=1)
+    executor.breaker.falha()
+    executor.breaker.aberto_ate = 0.0
+    assert executor.breaker.estado == "meio-aberto"
+    return executor
+
+
+class StreamFalso:
+    """Imita o AsyncStream do SDK: iterável assíncrono que precisa ser fechado."""
+
+    def __init__(self, pedacos: tuple[str, ...]):
+        self._eventos = iter([SimpleNamespace(type="response.output_text.delta", delta=p) for p in pedacos])
+        self.fechado = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._eventos)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def close(self):
+        self.fechado = True
+
+
+@pytest.fixture
+def stream_fake(monkeypatch):
+    streams = []
+
+    async def create(**_):
+        streams.append(StreamFalso(('{"a"', ": 1}")))
+        return streams[-1]
+
+    cliente = SimpleNamespace(responses=SimpleNamespace(create=create))
+    monkeypatch.setattr(funcs_gpt, "get_gpt_client", lambda: cliente)
+    executor = _breaker_meio_aberto()
+    monkeypatch.setattr(funcs_gpt, "executor_hedge", executor)
+    return SimpleNamespace(breaker=executor.breaker, streams=streams)
+
+
+def test_stream_concluido_fecha_o_breaker(stream_fake):
+    async def consumir():
+        return [pedaco async for pedaco in funcs_gpt.gpt_stream("prompt")]
+
+    assert asyncio.run(consumir()) == ['{"a"', ": 1}"]
+    assert stream_fake.breaker.estado == "fechado"
+    assert stream_fake.streams[0].fechado
+
+
+def test_stream_interrompido_libera_a_chamada_de_teste(stream_fake):
+    async def primeiro_pedaco():
+        stream = funcs_gpt.gpt_stream("prompt")
+        pedaco = await anext(stream)
+        await stream.aclose()
+        return pedaco
+
+    assert asyncio.run(primeiro_pedaco()) == '{"a"'
+    # cliente SSE desconectou: a resposta do provedor é fechada na hora e libera a conexão
+    assert stream_fake.streams[0].fechado
+    # sem desfecho do provedor: continua meio-aberto, mas aceita uma nova chamada de teste
+    stream_fake.breaker.verificar()
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+# importar o app não abre conexão nem calcula hash; sobra o custo de FastAPI, SQLAlchemy e Pydantic
+ORCAMENTO_IMPORTACAO_SEGUNDOS = 3.0
+
+
+def test_importacao_a_frio_do_app_dentro_do_orcamento():
+    pytest.importorskip("jose")
+    script = (
+        "import sys, time\n"
+        "inicio = time.perf_counter()\n"
+        "import main\n"
+        "print(time.perf_counter() - inicio)\n"
+        "print(','.join(m for m in ('openai', 'tiktoken', 'pandas') if m in sys.modules))\n"
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-c", script], cwd=RAIZ, env=dict(os.environ), capture_output=True, text=True, timeout=60,
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    segundos, carregados = resultado.stdout.splitlines()
+
+    assert float(segundos) < ORCAMENTO_IMPORTACAO_SEGUNDOS, f"import main levou {float(segundos):.2f}s"
+    # SDK do modelo e tokenizador só são importados no primeiro uso
+    assert carregados == ""
@@ -0,0 +1,291 @@
+import re
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import migrations
+from src.core.config import Settings
+from src.routers.apis.treino.listagem import QUERY_PROGRAMAS, filtro_cursor_programas
+from src.routers.apis.treino.treino_usuario import QUERY_EXERCICIOS_SESSAO, QUERY_SESSOES_PERFIL
+from src.routers.models.consultas import codificar_cursor
+from src.routers.models.query_db import queries_db, queries_indices_leitura
+
+
+class SessaoFalsa:
+    """Responde às consultas ao information_schema e registra os demais comandos."""
+
+    def __init__(
+        self,
+        colunas: set[tuple[str, str]] = frozenset(),
+        indices: set[str] = frozenset(),
+        tabelas: set[str] = frozenset(),
+        constraints: set[str] = frozenset(),
+    ):
+        self.colunas = set(colunas)
+        self.indices = set(indices)
+        self.tabelas = set(tabelas)
+        self.constraints = set(constraints)
+        self.comandos: list[str] = []
+
+    def execute(self, clausula, params=None):
+        sql = " ".join(str(clausula).split())
+        params = params or {}
+        if "information_schema.COLUMNS" in sql:
+            existe = (params["tabela"], params["coluna"]) in self.colunas
+        elif "information_schema.STATISTICS" in sql:
+            existe = params["indice"] in self.indices
+        elif "information_schema.TABLES" in sql:
+            existe = params["tabela"] in self.tabelas
+        elif "information_schema.TABLE_CONSTRAINTS" in sql:
+            existe = params["constraint"] in self.constraints
+        else:
+            self.comandos.append(sql)
+            return SimpleNamespace(scalar=lambda: None)
+        assert params["schema"] == "TCC"
+        return SimpleNamespace(scalar=lambda: int(existe))
+
+
+def test_indices_existentes_nao_sao_recriados():
+    sessao = SessaoFalsa(indices={"idx_treino_usuario_nome"})
+    migrations._indices_leitura(sessao)
+
+    assert len(sessao.comandos) == len(queries_indices_leitura) - 1
+    assert not any("idx_treino_usuario_nome" in comando for comando in sessao.comandos)
+
+
+@pytest.mark.parametrize(
+    ("migracao", "tabela", "coluna"),
+    [
+        (migrations._calorias_dieta, "DIETA", "calorias_total"),
+        (migrations._qtd_exercicios_treino, "TREINO", "qtd_exercicios"),
+    ],
+)
+def test_coluna_existente_so_refaz_o_preenchimento(migracao, tabela, coluna):
+    nova = SessaoFalsa()
+    migracao(nova)
+    assert [comando.startswith("ALTER TABLE") for comando in nova.comandos] == [True, False]
+
+    # migração interrompida depois do ALTER: rodar de novo não repete a coluna
+    parcial = SessaoFalsa(colunas={(tabela, coluna)})
+    migracao(parcial)
+    assert len(parcial.comandos) == 1
+    assert parcial.comandos[0].startswith("UPDATE")
+
+
+TEXTOS_EXERCICIO_TREINO = {
+    ("EXERCICIO_TREINO", "nome_exercicio"),
+    ("EXERCICIO_TREINO", "equipamento"),
+    ("EXERCICIO_TREINO", "grupo_muscular"),
+}
+
+
+def test_expansao_do_catalogo_nao_apaga_colunas_nem_exige_o_vinculo():
+    sessao = SessaoFalsa(colunas=TEXTOS_EXERCICIO_TREINO)
+    migrations._catalogo_exercicios(sessao)
+
+    assert sessao.comandos[0].startswith("CREATE TABLE IF NOT EXISTS TCC.EXERCICIO")
+    assert "ADD COLUMN id_exercicio INT NULL" in sessao.comandos[1]
+    assert not any("DROP" in comando for comando in sessao.comandos)
+    # NOT NULL e chave estrangeira em id_exercicio barrariam o INSERT das instâncias antigas
+    assert not any("FOREIGN KEY" in comando or "id_exercicio INT NOT NULL" in comando for comando in sessao.comandos)
+
+
+def test_expansao_do_catalogo_repetida_pula_o_ddl_ja_aplicado():
+    sessao = SessaoFalsa(
+        colunas=TEXTOS_EXERCICIO_TREINO | {("EXERCICIO_TREINO", "id_exercicio")},
+        tabelas={"EXERCICIO"},
+    )
+    migrations._catalogo_exercicios(sessao)
+
+    # só o que pode ser repetido: tornar os textos opcionais e copiar/vincular o que faltou
+    assert not any("CREATE TABLE" in comando or "ADD" in comando for comando in sessao.comandos)
+    assert all("IS NULL" in comando for comando in sessao.comandos if comando.startswith(("INSERT", "UPDATE")))
+
+
+def test_insert_so_com_texto_continua_valido_depois_da_expansao():
+    """O INSERT das instâncias anteriores ao catálogo, no schema deixado pela migração 5."""
+    sessao = SessaoFalsa(colunas=TEXTOS_EXERCICIO_TREINO)
+    migrations._catalogo_exercicios(sessao)
+    conexao = sqlite3.connect(":memory:")
+    conexao.execute("ATTACH DATABASE ':memory:' AS TCC")
+    # tabela como criada pela migração 1 (a chave estrangeira do SQLite não aceita o schema)
+    conexao.execute(queries_db["exercicio_treino"].replace("TCC.TREINO(id)", "TREINO(id)"))
+    # o que a expansão muda em EXERCICIO_TREINO, tirando o MODIFY ... NULL (sintaxe só do MySQL),
+    # que só relaxa as colunas de texto
+    alteracoes = [c for c in sessao.comandos if c.startswith("ALTER TABLE TCC.EXERCICIO_TREINO")]
+    assert not any("NOT NULL" in comando for comando in alteracoes)
+    for comando in alteracoes:
+        if "MODIFY" not in comando:
+            conexao.execute(comando)
+
+    conexao.execute(
+        "INSERT INTO TCC.EXERCICIO_TREINO (nome_exercicio, equipamento, grupo_muscular, id_treino, descanso, series, reps)"
+        " VALUES ('Supino Reto', 'Barra', 'Peito', 1, 60, 4, 10)"
+    )
+    assert conexao.execute("SELECT nome_exercicio, id_exercicio FROM TCC.EXERCICIO_TREINO").fetchall() == [
+        ("Supino Reto", None)
+    ]
+    conexao.close()
+
+
+def test_contracao_vincula_o_que_faltou_antes_de_exigir_o_vinculo():
+    sessao = SessaoFalsa(colunas=TEXTOS_EXERCICIO_TREINO | {("EXERCICIO_TREINO", "id_exercicio")})
+    migrations._contracao_catalogo(sessao)
+
+    tipos = [comando.split(" TCC.")[0] for comando in sessao.comandos]
+    assert tipos == ["INSERT IGNORE INTO", "UPDATE", "ALTER TABLE", "ALTER TABLE", "ALTER TABLE", "ALTER TABLE"]
+    assert "MODIFY id_exercicio INT NOT NULL" in sessao.comandos[2]
+    assert "FOREIGN KEY (id_exercicio)" in sessao.comandos[2]
+    assert all("DROP COLUMN" in comando for comando in sessao.comandos[3:])
+
+
+def test_contracao_repetida_remove_so_as_colunas_que_restam():
+    sessao = SessaoFalsa(
+        colunas={("EXERCICIO_TREINO", "grupo_muscular")}, constraints={"fk_exercicio_treino_catalogo"}
+    )
+    migrations._contracao_catalogo(sessao)
+
+    assert sessao.comandos == ["ALTER TABLE TCC.EXERCICIO_TREINO DROP COLUMN grupo_muscular"]
+
+
+def _migracoes_registradas(monkeypatch, versao_aplicada: int) -> list[int]:
+    aplicadas = []
+    monkeypatch.setattr(migrations, "versao_schema", lambda session: versao_aplicada)
+    monkeypatch.setattr(migrations, "MIGRACOES", [
+        migrations.Migracao(m.versao, m.descricao, lambda session, v=m.versao: aplicadas.append(v), m.destrutiva)
+        for m in migrations.MIGRACOES
+    ])
+    return aplicadas
+
+
+def test_migracao_destrutiva_so_roda_ao_contrair(monkeypatch):
+    aplicadas = _migracoes_registradas(monkeypatch, versao_aplicada=4)
+    sessao = SimpleNamespace(execute=lambda *args: None, commit=lambda: None)
+
+    assert migrations._aplicar_pendentes(sessao, contrair=False) == [5]
+    assert migrations._aplicar_pendentes(sessao, contrair=True) == [5, 6]
+    assert aplicadas == [5, 5, 6]
+    assert migrations.VERSAO_EXIGIDA == 5
+
+
+def test_inicializacao_nao_migra_por_padrao_e_recusa_schema_atrasado(monkeypatch):
+    monkeypatch.setattr(migrations.sett, "DB_MIGRAR_NA_INICIALIZACAO", Settings().DB_MIGRAR_NA_INICIALIZACAO)
+    monkeypatch.setattr(migrations, "versao_schema", lambda session: migrations.VERSAO_EXIGIDA - 1)
+    monkeypatch.setattr(migrations, "aplicar_migracoes", lambda session: pytest.fail("migrou na inicialização"))
+
+    with pytest.raises(RuntimeError, match="python -m src.core.migrations"):
+        migrations.garantir_schema()
+
+
+def test_schema_na_versao_exigida_sobe_sem_migrar(monkeypatch):
+    monkeypatch.setattr(migrations.sett, "DB_MIGRAR_NA_INICIALIZACAO", True)
+    monkeypatch.setattr(migrations, "versao_schema", lambda session: migrations.VERSAO_EXIGIDA)
+    monkeypatch.setattr(migrations, "aplicar_migracoes", lambda session: pytest.fail("migrou na inicialização"))
+
+    migrations.garantir_schema()
+
+
+def test_erro_na_migracao_interrompe_a_inicializacao(monkeypatch):
+    monkeypatch.setattr(migrations.sett, "DB_MIGRAR_NA_INICIALIZACAO", True)
+    monkeypatch.setattr(migrations, "versao_schema", lambda session: 0)
+
+    def falhar(session):
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(migrations, "aplicar_migracoes", falhar)
+    with pytest.raises(RuntimeError):
+        migrations.garantir_schema()
+
+
+def _colunas_do_indice(ddl: str) -> tuple[str, str, list[str]]:
+    correspondencia = re.search(r"CREATE INDEX (\w+)\s+ON TCC\.(\w+) \(([^)]*)\)", ddl)
+    assert correspondencia, ddl
+    indice, tabela, colunas = correspondencia.groups()
+    return indice, tabela, [coluna.strip() for coluna in colunas.split(",")]
+
+
+def test_ddl_dos_indices_de_leitura():
+    indices = {nome: _colunas_do_indice(ddl) for nome, ddl in queries_indices_leitura.items()}
+
+    # a chave do dicionário é o nome consultado no information_schema
+    assert all(nome == indice for nome, (indice, _, _) in indices.items())
+    # a ordem das colunas é o que permite filtrar e ordenar pelo índice
+    assert indices["idx_programa_treino_usu_criacao"][1:] == ("PROGRAMA_TREINO", ["id_usu", "created_at"])
+    assert indices["idx_treino_usuario_nome"][1:] == ("TREINO", ["id_usuario", "nome"])
+    assert indices["idx_series_sessao_ex_numero"][1:] == (
+        "SERIES", ["id_sessao", "id_ex_treino", "numero_serie", "repeticoes", "carga"]
+    )
+
+
+@pytest.fixture
+def banco_indices():
+    """
+    SQLite com as tabelas lidas pelos endpoints, os índices implícitos das chaves
+    estrangeiras do MySQL e os índices da migração 2 (sintaxe adaptada).
+    """
+    conexao = sqlite3.connect(":memory:")
+    conexao.executescript(
+        """
+        ATTACH DATABASE ':memory:' AS TCC;
+        CREATE TABLE TCC.PROGRAMA_TREINO (
+            id_programa_treino INTEGER PRIMARY KEY, id_usu INT, nome TEXT, descricao TEXT,
+            created_at TIMESTAMP, updated_at TIMESTAMP
+        );
+        CREATE TABLE TCC.TREINO (id INTEGER PRIMARY KEY, id_usuario INT, nome TEXT, qtd_exercicios INT);
+        CREATE TABLE TCC.EXERCICIO (id INTEGER PRIMARY KEY, nome TEXT, equipamento TEXT);
+        CREATE TABLE TCC.EXERCICIO_TREINO (id_ex_treino INTEGER PRIMARY KEY, id_treino INT, id_exercicio INT);
+        CREATE TABLE TCC.SESSAO_TREINO (
+            id_sessao INTEGER PRIMARY KEY, id_treino INT, duracao_sessao INT, descricao TEXT
+        );
+        CREATE TABLE TCC.SERIES (
+            id_serie INTEGER PRIMARY KEY, id_sessao INT, id_ex_treino INT,
+            numero_serie INT, repeticoes INT, carga REAL
+        );
+        CREATE INDEX TCC.fk_programa_treino_usu ON PROGRAMA_TREINO (id_usu);
+        CREATE INDEX TCC.fk_treino_usuario ON TREINO (id_usuario);
+        CREATE INDEX TCC.fk_exercicio_treino_treino ON EXERCICIO_TREINO (id_treino);
+        CREATE INDEX TCC.fk_sessao_treino_treino ON SESSAO_TREINO (id_treino);
+        CREATE INDEX TCC.fk_series_ex_treino ON SERIES (id_ex_treino);
+        CREATE INDEX TCC.fk_series_sessao ON SERIES (id_sessao);
+        """
+    )
+    for ddl in queries_indices_leitura.values():
+        indice, tabela, colunas = _colunas_do_indice(ddl)
+        conexao.execute(f"CREATE INDEX TCC.{indice} ON {tabela} ({', '.join(colunas)})")
+    yield conexao
+    conexao.close()
+
+
+def _plano(conexao: sqlite3.Connection, query: str, params: dict) -> str:
+    return " | ".join(linha[-1] for linha in conexao.execute(f"EXPLAIN QUERY PLAN {query}", params))
+
+
+@pytest.mark.parametrize("cursor", [None, codificar_cursor(["2025-01-01T00:00:00", 10])])
+def test_explain_programas_usa_o_indice_sem_ordenacao_extra(banco_indices, cursor):
+    params = {"user_id": 1, "limite": 21}
+    query = QUERY_PROGRAMAS.format(filtro_cursor=filtro_cursor_programas(cursor, params))
+    if "ultimo_criado" in params:
+        params["ultimo_criado"] = params["ultimo_criado"].isoformat(" ")
+    plano = _plano(banco_indices, query, params)
+
+    assert "idx_programa_treino_usu_criacao" in plano
+    assert "TEMP B-TREE" not in plano
+
+
+def test_explain_sessoes_do_perfil_parte_dos_treinos_do_usuario(banco_indices):
+    plano = _plano(banco_indices, QUERY_SESSOES_PERFIL, {"id_usuario": 1, "ultimo_id": 0, "limite": 21})
+
+    # treinos do usuário por um índice em id_usuario (que, como no InnoDB, termina no id), e as
+    # sessões de cada treino pelo índice da chave estrangeira, já a partir do cursor
+    assert re.search(r"SEARCH t USING (COVERING )?INDEX \w+ \(id_usuario=\?\)", plano), plano
+    assert "SEARCH st USING INDEX fk_sessao_treino_treino (id_treino=? AND rowid>?)" in plano
+    assert "SCAN" not in plano
+
+
+def test_explain_exercicios_da_sessao_usa_o_indice_de_cobertura(banco_indices):
+    plano = _plano(banco_indices, QUERY_EXERCICIOS_SESSAO, {"id_sessao": 1})
+
+    assert "COVERING INDEX idx_series_sessao_ex_numero" in plano
+    assert "SCAN" not in plano
+    assert "TEMP B-TREE" not in plano
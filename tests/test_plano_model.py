@@ -0,0 +1,68 @@
+import copy
+
+import pytest
+from fastapi import HTTPException
+
+from src.routers.models.plano_model import Dificuldade, GrupoMuscular, validar_plano_dieta, validar_plano_treino
+
+PLANO_TREINO = {
+    "programaTreino": {"nomePrograma": "Força", "descricaoPrograma": "ABC"},
+    "treinos": [
+        {
+            "nome": "Treino 01 - Peito",
+            "descricao": "Hipertrofia",
+            "idUsuario": 1,
+            "duracaoMinutos": 60,
+            "dificuldade": "Intermediário",
+            "exercicios": [
+                {"nomeExercicio": "Supino Reto", "equipamento": "Barra", "grupoMuscular": "peitoral",
+                 "series": 4, "repeticoes": 10, "descansoSegundos": 60},
+            ],
+        }
+    ],
+}
+
+
+def _com(caminho: tuple, valor) -> dict:
+    plano = copy.deepcopy(PLANO_TREINO)
+    alvo = plano
+    for chave in caminho[:-1]:
+        alvo = alvo[chave]
+    alvo[caminho[-1]] = valor
+    return plano
+
+
+def test_enums_do_modelo_sao_convertidos_explicitamente():
+    treino = validar_plano_treino(PLANO_TREINO).treinos[0]
+
+    assert treino.dificuldade is Dificuldade.INTERMEDIARIO
+    assert treino.exercicios[0].grupo_muscular is GrupoMuscular.PEITO
+
+
+@pytest.mark.parametrize(
+    ("caminho", "valor"),
+    [
+        (("treinos", 0, "exercicios", 0, "series"), "4"),
+        (("treinos", 0, "exercicios", 0, "descansoSegundos"), 60.5),
+        (("treinos", 0, "idUsuario"), "1"),
+        (("treinos", 0, "exercicios", 0, "equipamento"), 3),
+        (("treinos", 0, "dificuldade"), "moderado"),
+        (("treinos", 0, "exercicios", 0, "grupoMuscular"), "Cardio"),
+    ],
+)
+def test_modo_estrito_recusa_tipos_e_valores_fora_do_esquema(caminho, valor):
+    with pytest.raises(HTTPException) as erro:
+        validar_plano_treino(_com(caminho, valor))
+    assert erro.value.status_code == 400
+    assert caminho[-1] in erro.value.detail
+
+
+def test_plano_de_dieta_recusa_calorias_em_texto():
+    plano = {
+        "nome": "Dieta", "descricao": "Cutting", "usuario": 1,
+        "refeicoes": [{"calorias": "500", "alimentos": "Arroz", "tipoRefeicao": "Almoço"}],
+    }
+    with pytest.raises(HTTPException):
+        validar_plano_dieta(plano)
+    plano["refeicoes"][0]["calorias"] = 500
+    assert validar_plano_dieta(plano).refeicoes[0].calorias == 500
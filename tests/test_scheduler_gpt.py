@@ -0,0 +1,161 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from src.routers.apis.gpt.scheduler_gpt import (
+    PRIORIDADE_AJUSTE,
+    PRIORIDADE_LOTE,
+    PRIORIDADE_NOVO_PLANO,
+    AgendadorGPT,
+)
+
+
+class RelogioFalso:
+    """Relógio controlado pelo teste: `dormir` avança o tempo na hora, sem esperar."""
+
+    def __init__(self):
+        self.agora = 0.0
+        self.esperas: list[float] = []
+
+    def __call__(self) -> float:
+        return self.agora
+
+    async def dormir(self, segundos: float) -> None:
+        self.esperas.append(segundos)
+        self.agora += segundos
+        await asyncio.sleep(0)
+
+
+class ErroProvedor(Exception):
+    def __init__(self, status_code: int, retry_after: str | None = None):
+        super().__init__(f"erro {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+
+def _agendador(relogio: RelogioFalso, rpm: int = 60, tpm: int = 1_000_000, max_fila: int = 10, tentativas_429: int = 3):
+    return AgendadorGPT(rpm, tpm, max_fila, tentativas_429, relogio=relogio, dormir=relogio.dormir)
+
+
+def test_token_bucket_espaca_as_chamadas_alem_do_limite():
+    relogio = RelogioFalso()
+    agendador = _agendador(relogio, rpm=2)
+    enviadas: list[float] = []
+
+    async def chamada():
+        enviadas.append(relogio())
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(*(agendador.executar(PRIORIDADE_NOVO_PLANO, 100, chamada) for _ in range(4)))
+
+    assert asyncio.run(main()) == ["ok"] * 4
+    # 2 por minuto: duas saem na hora e as seguintes a cada 30s
+    assert enviadas == pytest.approx([0.0, 0.0, 30.0, 60.0])
+    assert agendador.stats()["esperas"] == 2
+
+
+def test_limite_de_tokens_por_minuto_tambem_segura_a_fila():
+    relogio = RelogioFalso()
+    agendador = _agendador(relogio, rpm=1000, tpm=6000)
+    enviadas: list[float] = []
+
+    async def chamada():
+        enviadas.append(relogio())
+
+    async def main():
+        await asyncio.gather(*(agendador.executar(PRIORIDADE_NOVO_PLANO, 3000, chamada) for _ in range(3)))
+
+    asyncio.run(main())
+    # 6000 tokens/min = 100/s: a terceira chamada de 3000 tokens espera 30s
+    assert enviadas == pytest.approx([0.0, 0.0, 30.0])
+
+
+def test_fila_atende_por_prioridade():
+    relogio = RelogioFalso()
+    agendador = _agendador(relogio, rpm=1)
+    ordem: list[str] = []
+
+    def chamada(nome: str):
+        async def registrar():
+            ordem.append(nome)
+        return registrar
+
+    async def main():
+        await asyncio.gather(
+            agendador.executar(PRIORIDADE_LOTE, 10, chamada("primeira")),
+            agendador.executar(PRIORIDADE_LOTE, 10, chamada("lote")),
+            agendador.executar(PRIORIDADE_NOVO_PLANO, 10, chamada("novo")),
+            agendador.executar(PRIORIDADE_AJUSTE, 10, chamada("ajuste")),
+        )
+
+    asyncio.run(main())
+    assert ordem == ["primeira", "ajuste", "novo", "lote"]
+
+
+def test_fila_cheia_recusa_com_429_e_retry_after():
+    relogio = RelogioFalso()
+    agendador = _agendador(relogio, rpm=1, max_fila=1)
+
+    async def chamada():
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(
+            *(agendador.executar(PRIORIDADE_NOVO_PLANO, 10, chamada) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    primeira, segunda, terceira = asyncio.run(main())
+    assert (primeira, segunda) == ("ok", "ok")
+    assert isinstance(terceira, HTTPException)
+    assert terceira.status_code == 429
+    # uma na fila + a recusada, a 1 por minuto
+    assert terceira.headers["Retry-After"] == "120"
+    assert agendador.stats()["recusadas"] == 1
+
+
+def test_429_do_provedor_e_repetido_com_backoff_com_jitter():
+    relogio = RelogioFalso()
+    agendador = _agendador(relogio)
+    tentativas = []
+
+    async def chamada():
+        tentativas.append(relogio())
+        if len(tentativas) <= 3:
+            raise ErroProvedor(429)
+        return "ok"
+
+    assert asyncio.run(agendador.executar(PRIORIDADE_NOVO_PLANO, 10, chamada)) == "ok"
+    assert len(tentativas) == 4
+    for tentativa, espera in enumerate(relogio.esperas):
+        assert 0.5 * 2 ** tentativa <= espera <= 1.5 * 2 ** tentativa
+    assert agendador.stats()["retentativas_429"] == 3
+
+
+def test_429_do_provedor_respeita_retry_after_e_desiste_no_limite():
+    relogio = RelogioFalso()
+    agendador = _agendador(relogio, tentativas_429=2)
+
+    async def chamada():
+        raise ErroProvedor(429, retry_after="7")
+
+    with pytest.raises(HTTPException) as erro:
+        asyncio.run(agendador.executar(PRIORIDADE_NOVO_PLANO, 10, chamada))
+    assert erro.value.status_code == 429
+    assert erro.value.headers["Retry-After"] == "7"
+    assert relogio.esperas == [7.0, 7.0]
+
+
+def test_outros_erros_do_provedor_nao_sao_repetidos():
+    relogio = RelogioFalso()
+    agendador = _agendador(relogio)
+
+    async def chamada():
+        raise ErroProvedor(500)
+
+    with pytest.raises(ErroProvedor):
+        asyncio.run(agendador.executar(PRIORIDADE_NOVO_PLANO, 10, chamada))
+    assert relogio.esperas == []
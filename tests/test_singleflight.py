@@ -0,0 +1,95 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.routers.apis.gpt import funcs_gpt
+from src.routers.apis.gpt.singleflight import SingleFlight
+
+
+@pytest.fixture
+def provedor_lento(monkeypatch):
+    """Modelo fake que demora a responder e conta quantas vezes foi chamado."""
+    chamadas = []
+    liberar = asyncio.Event()
+
+    async def create(**kwargs):
+        chamadas.append(kwargs["input"])
+        await liberar.wait()
+        return SimpleNamespace(output_text=json.dumps({"treinos": [{"nome": "Treino A"}]}), usage=None)
+
+    cliente = SimpleNamespace(responses=SimpleNamespace(create=create))
+    monkeypatch.setattr(funcs_gpt, "get_gpt_client", lambda: cliente)
+    monkeypatch.setattr(funcs_gpt, "chamadas_gpt", SingleFlight())
+    return chamadas, liberar
+
+
+def test_requisicoes_identicas_simultaneas_fazem_uma_chamada(provedor_lento):
+    chamadas, liberar = provedor_lento
+
+    async def main():
+        tarefas = [asyncio.create_task(funcs_gpt.gpt_response("mesmo prompt")) for _ in range(20)]
+        await asyncio.sleep(0.05)
+        liberar.set()
+        return await asyncio.gather(*tarefas)
+
+    planos = asyncio.run(main())
+    assert chamadas == ["mesmo prompt"]
+    assert all(plano == {"treinos": [{"nome": "Treino A"}]} for plano in planos)
+    # cada chamador recebe sua cópia
+    planos[0]["treinos"].clear()
+    assert planos[1]["treinos"] == [{"nome": "Treino A"}]
+    assert funcs_gpt.chamadas_gpt.stats() == {"em_andamento": 0, "execucoes": 1, "coalescidas": 19}
+
+
+def test_cancelar_um_chamador_nao_cancela_os_demais(provedor_lento):
+    chamadas, liberar = provedor_lento
+
+    async def main():
+        iniciador = asyncio.create_task(funcs_gpt.gpt_response("mesmo prompt"))
+        outros = [asyncio.create_task(funcs_gpt.gpt_response("mesmo prompt")) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        # quem disparou a chamada desconecta antes da resposta
+        iniciador.cancel()
+        await asyncio.sleep(0)
+        liberar.set()
+        resultados = await asyncio.gather(*outros)
+        return iniciador, resultados
+
+    iniciador, resultados = asyncio.run(main())
+    assert iniciador.cancelled()
+    assert len(chamadas) == 1
+    assert resultados == [{"treinos": [{"nome": "Treino A"}]}] * 5
+
+
+def test_prompts_diferentes_nao_sao_coalescidos(provedor_lento):
+    chamadas, liberar = provedor_lento
+
+    async def main():
+        tarefas = [asyncio.create_task(funcs_gpt.gpt_response(f"prompt {i}")) for i in range(3)]
+        await asyncio.sleep(0.05)
+        liberar.set()
+        return await asyncio.gather(*tarefas)
+
+    asyncio.run(main())
+    assert sorted(chamadas) == ["prompt 0", "prompt 1", "prompt 2"]
+
+
+def test_erro_e_compartilhado_e_a_chave_e_liberada():
+    voo = SingleFlight()
+    execucoes = []
+
+    async def falhar():
+        execucoes.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provedor fora")
+
+    async def main():
+        resultados = await asyncio.gather(*(voo.executar("k", falhar) for _ in range(3)), return_exceptions=True)
+        return resultados, voo.em_andamento()
+
+    resultados, em_andamento = asyncio.run(main())
+    assert len(execucoes) == 1
+    assert all(isinstance(resultado, RuntimeError) for resultado in resultados)
+    assert em_andamento == 0
@@ -0,0 +1,138 @@
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.routers.apis.gpt.funcs_gpt import parse_plan_text
+from src.routers.apis.gpt.stream_json import ExtratorItensJSON, parse_json_tolerante
+
+PLANO = {
+    "programaTreino": {"nomePrograma": "Força", "descricaoPrograma": "ABC"},
+    "treinos": [
+        {"nome": "Treino A", "exercicios": [{"nomeExercicio": "Supino", "series": 4}]},
+        {"nome": "Treino B", "exercicios": [{"nomeExercicio": "Agachamento", "series": 4}]},
+    ],
+}
+TEXTO = json.dumps(PLANO, ensure_ascii=False, indent=2)
+
+
+def test_json_integro_nao_e_reparado():
+    plano, relatorio = parse_plan_text(TEXTO)
+    assert plano == PLANO
+    assert not relatorio.reparado
+
+
+@pytest.mark.parametrize(
+    "texto",
+    [
+        f"```json\n{TEXTO}\n```",
+        f"Aqui está o seu plano:\n{TEXTO}\nBons treinos!",
+    ],
+)
+def test_cercas_e_prosa_sao_ignoradas(texto):
+    plano, relatorio = parse_json_tolerante(texto, profundidade_corte=2)
+    assert plano == PLANO
+    assert not relatorio.reparado
+    assert relatorio.caracteres_ignorados_inicio > 0
+
+
+@pytest.mark.parametrize(
+    "texto",
+    [
+        TEXTO.replace('"series": 4\n', '"series": 4,\n'),
+        TEXTO.replace("}\n  ]", "},\n  ]"),
+        TEXTO.replace('"Treino A",', '"Treino A",,'),
+    ],
+)
+def test_virgulas_finais_e_repetidas_sao_removidas(texto):
+    plano, relatorio = parse_json_tolerante(texto, profundidade_corte=2)
+    assert plano == PLANO
+    assert relatorio.reparado
+    assert relatorio.virgulas_removidas > 0
+
+
+def test_fechamento_trocado_e_corrigido():
+    texto = TEXTO.replace('"series": 4\n        }', '"series": 4\n        ]', 1)
+    plano, relatorio = parse_json_tolerante(texto, profundidade_corte=2)
+    assert plano == PLANO
+    assert relatorio.reparado
+    assert relatorio.fechamentos_corrigidos == 1
+
+
+@pytest.mark.parametrize("corte", ["Agachamento", '"series": 4\n        }\n      ]\n    }\n  ]'])
+def test_plano_truncado_mantem_apenas_treinos_completos(corte):
+    texto = TEXTO[: TEXTO.rindex(corte)]
+    plano, relatorio = parse_json_tolerante(texto, profundidade_corte=2)
+    assert plano["treinos"] == PLANO["treinos"][:1]
+    assert relatorio.reparado
+    assert relatorio.truncado
+
+
+@pytest.mark.parametrize("texto", ["{", "```json\n{", '{"treinos": [', "sem json"])
+def test_resultado_degenerado_e_falha(texto):
+    with pytest.raises(json.JSONDecodeError):
+        parse_json_tolerante(texto, profundidade_corte=2)
+    with pytest.raises(HTTPException) as erro:
+        parse_plan_text(texto)
+    assert erro.value.status_code == 502
+
+
+def test_parse_plan_text_retorna_relatorio_do_reparo():
+    plano, relatorio = parse_plan_text(TEXTO[: TEXTO.rindex("Agachamento")])
+    assert len(plano["treinos"]) == 1
+    assert relatorio.truncado
+
+
+def test_extrator_emite_itens_conforme_fecham():
+    extrator = ExtratorItensJSON("treinos")
+    emitidos = []
+    for inicio in range(0, len(TEXTO), 7):
+        emitidos.extend(extrator.feed(TEXTO[inicio : inicio + 7]))
+    assert emitidos == PLANO["treinos"]
+
+
+def _plano_grande(treinos: int = 7, exercicios: int = 8) -> str:
+    plano = {
+        "programaTreino": {"nomePrograma": "Força", "descricaoPrograma": "ABCDEFG"},
+        "treinos": [
+            {
+                "nome": f"Treino {i}",
+                "exercicios": [
+                    {"nomeExercicio": f"Exercício {j}", "series": 4, "repeticoes": "10-12", "descanso": 60,
+                     "equipamento": "Barra", "grupoMuscular": "Peito"}
+                    for j in range(exercicios)
+                ],
+            }
+            for i in range(treinos)
+        ],
+    }
+    return json.dumps(plano, ensure_ascii=False, indent=2)
+
+
+def test_vazao_do_parser_tolerante_em_plano_truncado():
+    texto = _plano_grande()
+    truncado = texto[: int(len(texto) * 0.8)]
+
+    inicio = time.perf_counter()
+    for _ in range(50):
+        plano, relatorio = parse_json_tolerante(truncado, profundidade_corte=2)
+    por_plano = (time.perf_counter() - inicio) / 50
+
+    assert relatorio.truncado and len(plano["treinos"]) == 5
+    # ~1 ms por plano de 12 KB localmente; uma regeneração custa dezenas de segundos
+    assert por_plano < 0.02, f"{por_plano * 1000:.1f} ms por plano"
+
+
+def test_vazao_do_extrator_incremental_em_pedacos_pequenos():
+    texto = _plano_grande()
+
+    inicio = time.perf_counter()
+    for _ in range(20):
+        extrator = ExtratorItensJSON("treinos")
+        itens = [item for i in range(0, len(texto), 20) for item in extrator.feed(texto[i : i + 20])]
+    por_plano = (time.perf_counter() - inicio) / 20
+
+    assert len(itens) == 7
+    # pedaços de 20 caracteres, como os deltas do stream do modelo
+    assert por_plano < 0.05, f"{por_plano * 1000:.1f} ms por plano"
@@ -0,0 +1,54 @@
+import pytest
+from fastapi import HTTPException
+
+from src.routers.apis.gpt import gpt
+from src.routers.apis.gpt.tokens_gpt import contar_tokens
+from src.routers.models.anamnesemodel import PostAnamnese
+
+ANAMNESE = PostAnamnese(
+    usuario_id=1, idade=30, sexo="M", peso=80.0, experiencia="intermediário", tempo_treino="2 anos",
+    dias_semana="4", tempo_treino_por_dia="1h", objetivos=["hipertrofia"],
+    objetivo_especifico="ganhar massa", lesao="", condicao_medica="", exercicio_nao_gosta="",
+)
+
+PLANO = {
+    "programaTreino": {"nomePrograma": "Hipertrofia", "descricaoPrograma": "Programa de quatro dias " * 10},
+    "treinos": [
+        {
+            "nome": f"Treino {letra}",
+            "descricao": "Descrição detalhada do treino com orientações de execução " * 5,
+            "idUsuario": 1,
+            "duracaoMinutos": 60,
+            "dificuldade": "Intermediário",
+            "exercicios": [
+                {
+                    "nomeExercicio": f"Exercício {letra}{numero}",
+                    "equipamento": "Halteres",
+                    "grupoMuscular": "Peito",
+                    "series": 4,
+                    "repeticoes": 10,
+                    "descansoSegundos": 90,
+                }
+                for numero in range(8)
+            ],
+        }
+        for letra in "ABCD"
+    ],
+}
+
+
+def test_orcamento_conta_o_prompt_completo(monkeypatch):
+    completo = gpt.build_adjustment_prompt(ANAMNESE, PLANO, "troque o supino")
+    orcamento = contar_tokens(completo) - 1
+    monkeypatch.setattr(gpt.sett_gpt, "GPT_MAX_TOKENS_ENTRADA", orcamento)
+
+    resumido = gpt.build_adjustment_prompt(ANAMNESE, PLANO, "troque o supino")
+    assert contar_tokens(resumido) <= orcamento
+    assert "Descrição detalhada" not in resumido
+
+
+def test_prompt_que_nao_cabe_no_orcamento_e_recusado(monkeypatch):
+    monkeypatch.setattr(gpt.sett_gpt, "GPT_MAX_TOKENS_ENTRADA", contar_tokens(gpt.build_prompt(ANAMNESE)))
+    with pytest.raises(HTTPException) as erro:
+        gpt.build_adjustment_prompt(ANAMNESE, PLANO, "troque o supino")
+    assert erro.value.status_code == 413
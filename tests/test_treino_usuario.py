@@ -0,0 +1,47 @@
+import math
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.routers.apis.treino.treino_usuario import TAMANHO_LOTE_SERIES, SessaoInsert, criar_sessao_treino
+
+RTT_SIMULADO = 0.01
+
+
+def _sessao(exercicios: int, series: int) -> SessaoInsert:
+    return SessaoInsert(
+        duracao=60,
+        id_treino=1,
+        exercicios=[
+            {"id_exercicio": e + 1, "repeticoes": [10] * series, "cargas": [20.0] * series} for e in range(exercicios)
+        ],
+    )
+
+
+def test_series_da_sessao_gravadas_em_lotes(banco_sync):
+    """Cada ida ao banco custa um RTT simulado; as séries saem em INSERTs de até TAMANHO_LOTE_SERIES linhas."""
+    comandos: list[str] = []
+
+    @event.listens_for(banco_sync, "before_cursor_execute")
+    def ida_ao_banco(conn, cursor, sql, params, context, executemany):
+        comandos.append(sql)
+        time.sleep(RTT_SIMULADO)
+
+    tempos, idas = {}, {}
+    for exercicios, series in [(1, 3), (8, 4), (12, 50)]:
+        comandos.clear()
+        inicio = time.perf_counter()
+        with Session(banco_sync) as session:
+            resultado = criar_sessao_treino(_sessao(exercicios, series), session)
+        total = exercicios * series
+        tempos[total] = time.perf_counter() - inicio
+        idas[total] = len(comandos)
+        assert len(resultado["series"]) == total
+        assert [serie["numero_serie"] for serie in resultado["series"][:series]] == list(range(1, series + 1))
+
+    # sessão, lotes de séries e ids das séries, em vez de uma ida por série
+    assert idas == {total: 2 + math.ceil(total / TAMANHO_LOTE_SERIES) for total in idas}
+    # 600 séries em 3 lotes: 5 RTTs, contra 602 gravando série a série (~6 s)
+    assert tempos[600] < 25 * RTT_SIMULADO, tempos
+    assert tempos[32] < 8 * RTT_SIMULADO, tempos